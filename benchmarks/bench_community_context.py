@@ -0,0 +1,88 @@
+"""
+Per-query cost of global search community batches: the community weight
+computation moved to load time, an uncached batch build, and a hit in the
+GlobalContextBuilder batch cache.
+
+    python -m benchmarks.bench_community_context [--entities 50000] [--reports 2000]
+
+Uses cl100k_base when its BPE ranks can be loaded, and a byte-level encoding
+otherwise (offline), which only changes the absolute tokenization cost.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+import typing
+
+import tiktoken
+
+from graphrag_query._search import _model
+from graphrag_query._search._context._builders import _community_context
+from graphrag_query._search._context._builders._context_builders import GlobalContextBuilder
+
+
+def _encoder() -> tiktoken.Encoding:
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:  # noqa
+        return tiktoken.Encoding(
+            name="bytes", pat_str=r"\S+|\s+", mergeable_ranks={bytes([i]): i for i in range(256)}, special_tokens={}
+        )
+
+
+def _timed(func: typing.Callable[[], typing.Any], repeat: int) -> float:
+    """Median wall time of `func` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e3
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entities", type=int, default=50000)
+    parser.add_argument("--reports", type=int, default=2000)
+    parser.add_argument("--data-max-tokens", type=int, default=8000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    entities = [
+        _model.Entity(
+            id=f"e{i}", title=f"E{i}",
+            community_ids=[str(rng.randrange(args.reports)) for _ in range(3)],
+            text_unit_ids=[str(rng.randrange(args.entities // 2)) for _ in range(5)],
+        ) for i in range(args.entities)
+    ]
+    reports = [
+        _model.CommunityReport(
+            id=str(i), short_id=str(i), title=f"Community {i}", community_id=str(i),
+            summary=" ".join(rng.choice(("alpha", "beta", "gamma", "delta")) for _ in range(60)), rank=float(i % 10),
+        ) for i in range(args.reports)
+    ]
+    token_encoder = _encoder()
+
+    weights_ms = _timed(lambda: _community_context.compute_community_weights(entities), 5)
+    print(f"community weights (now at load, once)      {weights_ms:>10.2f} ms")
+
+    builder = GlobalContextBuilder(community_reports=reports, entities=entities, token_encoder=token_encoder)
+    kwargs = dict(data_max_tokens=args.data_max_tokens)
+    first_ms = _timed(lambda: builder.build_context(**kwargs), 1)
+    print(f"first build (tokenizes every report)       {first_ms:>10.2f} ms")
+
+    def _uncached() -> None:
+        builder.clear_cache()
+        builder.build_context(**kwargs)
+
+    uncached_ms = _timed(_uncached, 5)
+    print(f"uncached build (tokenizes every report)    {uncached_ms:>10.2f} ms")
+    hit_ms = _timed(lambda: builder.build_context(**kwargs), 200)
+    print(f"batch cache hit                            {hit_ms:>10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
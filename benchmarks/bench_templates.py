@@ -0,0 +1,79 @@
+"""
+Per-call cost of rendering the default prompts: compiling a jinja2.Template on
+every call (as before the shared registry), a cached jinja2.Template, and the
+registry's compiled PromptTemplate.
+
+    python -m benchmarks.bench_templates [--context-chars 32000] [--batches 50]
+
+Every variable of a prompt is filled with `--context-chars` characters of
+context data, about the size of a map batch at the default data_max_tokens.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+import typing
+
+import jinja2
+import jinja2.meta
+
+from graphrag_query import _utils
+from graphrag_query._search import _defaults
+
+PROMPTS = {
+    "global map":          _defaults.GLOBAL_SEARCH__MAP__SYS_PROMPT,
+    "global reduce":       _defaults.GLOBAL_SEARCH__REDUCE__SYS_PROMPT,
+    "intermediate reduce": _defaults.GLOBAL_SEARCH__REDUCE__INTERMEDIATE_SYS_PROMPT,
+    "local search":        _defaults.LOCAL_SEARCH__SYS_PROMPT,
+}
+
+
+def _timed(func: typing.Callable[[], typing.Any], repeat: int) -> float:
+    """Median wall time of `func` in microseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--context-chars", type=int, default=32000)
+    parser.add_argument("--batches", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    context = ("id|title|content\n" + "1|Community|" + "lorem ipsum " * (args.context_chars // 12))[:args.context_chars]
+    print(f"{'prompt':<22}{'compile+render':>16}{'cached jinja':>16}{'registry':>12}{'fast path':>11}")
+    compile_total = registry_total = 0.0
+    for name, source in PROMPTS.items():
+        variables = {
+            variable: context for variable in jinja2.meta.find_undeclared_variables(jinja2.Environment().parse(source))
+        }
+        compiled = jinja2.Template(source)
+        template = _utils.get_prompt_template(source)
+        assert template.render(**variables) == compiled.render(**variables)
+
+        per_call_us = _timed(lambda: jinja2.Template(source).render(**variables), args.repeat)
+        cached_us = _timed(lambda: compiled.render(**variables), args.repeat)
+        registry_us = _timed(lambda: _utils.get_prompt_template(source).render(**variables), args.repeat)
+        print(f"{name:<22}{per_call_us:>13.1f} us{cached_us:>13.1f} us{registry_us:>9.1f} us{template.is_simple!s:>11}")
+        if name == "global map":
+            compile_total += per_call_us * args.batches
+            registry_total += registry_us * args.batches
+        elif name == "global reduce":
+            compile_total += per_call_us
+            registry_total += registry_us
+
+    print(
+        f"\nglobal search prompts ({args.batches} map batches + reduce): "
+        f"{compile_total / 1e3:.2f} ms compiling per call, {registry_total / 1e3:.2f} ms through the registry"
+    )
+
+
+if __name__ == "__main__":
+    main()
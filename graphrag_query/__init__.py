@@ -21,6 +21,7 @@ from ._config import (
     LoggingConfig,
 )
 from ._search import (
+    AsyncCachedEmbedding,
     AsyncChatLLM,
     AsyncEmbedding,
     AsyncGlobalSearchEngine,
@@ -31,6 +32,7 @@ from ._search import (
     BaseChatLLM,
     BaseContextBuilder,
     BaseEmbedding,
+    CachedEmbedding,
     ChatLLM,
     Embedding,
     GlobalContextBuilder,
@@ -40,6 +42,8 @@ from ._search import (
     LocalContextLoader,
     LocalSearchEngine,
     QueryEngine,
+    SQLiteEmbeddingCache,
+    SQLiteMapResultCache,
     SearchResult,
     SearchResultChunk,
     SearchResultChunkVerbose,
@@ -65,6 +69,7 @@ __all__ = [
     "LocalSearchConfig",
     "LoggingConfig",
 
+    "AsyncCachedEmbedding",
     "AsyncChatLLM",
     "AsyncEmbedding",
     "AsyncGlobalSearchEngine",
@@ -75,6 +80,7 @@ __all__ = [
     "BaseChatLLM",
     "BaseContextBuilder",
     "BaseEmbedding",
+    "CachedEmbedding",
     "ChatLLM",
     "Embedding",
     "GlobalContextBuilder",
@@ -84,6 +90,8 @@ __all__ = [
     "LocalContextLoader",
     "LocalSearchEngine",
     "QueryEngine",
+    "SQLiteEmbeddingCache",
+    "SQLiteMapResultCache",
     "SearchResult",
     "SearchResultChunk",
     "SearchResultChunkVerbose",
@@ -13,9 +13,11 @@ from . import (
     _config as _cfg,  # alias for _config attribute of Client class
     _defaults,
     _search,
+    _utils,
     errors as _errors,
     types as _types,
 )
+from ._search import _defaults as _search_defaults
 from ._search._engine import _base_engine
 
 __all__ = [
@@ -24,6 +26,79 @@ __all__ = [
 ]
 
 
+def _get_embedding_cache(
+    config: _cfg.EmbeddingConfig,
+) -> typing.Optional[_utils.BaseCache[typing.List[float]]]:
+    """Build the query embedding cache described by the embedding config, if enabled."""
+    if not config.cache_enabled:
+        return None
+    if config.cache_backend == 'disk':
+        return _search.SQLiteEmbeddingCache(
+            config.cache_path or _search_defaults.DEFAULT__EMBEDDING_CACHE__PATH,
+            max_size=config.cache_max_size or _search_defaults.DEFAULT__EMBEDDING_CACHE__DISK_MAX_SIZE,
+            ttl=config.cache_ttl,
+        )
+    return _utils.LRUCache(
+        max_size=config.cache_max_size or _search_defaults.DEFAULT__EMBEDDING_CACHE__MAX_SIZE,
+        ttl=config.cache_ttl,
+    )
+
+
+def _get_rate_limiter(
+    config: typing.Union[_cfg.ChatLLMConfig, _cfg.EmbeddingConfig],
+) -> typing.Optional[_utils.RateLimiter]:
+    """Get the process-wide RPM/TPM limiter of the configured model, if any quota is set."""
+    if not config.requests_per_minute and not config.tokens_per_minute:
+        return None
+    return _utils.get_rate_limiter(
+        f"{config.base_url or 'openai'}|{config.model}",
+        requests_per_minute=config.requests_per_minute,
+        tokens_per_minute=config.tokens_per_minute,
+    )
+
+
+def _get_chat_token_encoder(config: _cfg.GraphRAGConfig) -> typing.Optional[tiktoken.Encoding]:
+    """Get the token encoder the chat LLM estimates its requests with, if a TPM quota is set."""
+    if not config.chat_llm.tokens_per_minute:
+        return None
+    return tiktoken.get_encoding(
+        config.global_search.encoding_model
+        or config.local_search.encoding_model
+        or _search_defaults.DEFAULT__ENCODING_MODEL
+    )
+
+
+def _get_concurrency_limiter(
+    config: _cfg.ChatLLMConfig,
+) -> typing.Optional[_utils.AdaptiveConcurrencyLimiter]:
+    """Build the adaptive concurrency limiter of the async chat LLM, if enabled."""
+    if not config.adaptive_concurrency:
+        return None
+    max_limit = config.max_concurrency or _search_defaults.DEFAULT__ADAPTIVE_CONCURRENCY__MAX_LIMIT
+    return _utils.AdaptiveConcurrencyLimiter(
+        initial_limit=min(_search_defaults.DEFAULT__ADAPTIVE_CONCURRENCY__INITIAL_LIMIT, max_limit),
+        max_limit=max_limit,
+    )
+
+
+def _get_map_cache(
+    config: _cfg.GlobalSearchConfig,
+) -> typing.Optional[_utils.BaseCache[_search.SearchResult]]:
+    """Build the map result cache described by the global search config, if enabled."""
+    if not config.map_cache_enabled:
+        return None
+    if config.map_cache_backend == 'disk':
+        return _search.SQLiteMapResultCache(
+            config.map_cache_path or _search_defaults.DEFAULT__MAP_CACHE__PATH,
+            max_size=config.map_cache_max_size or _search_defaults.DEFAULT__MAP_CACHE__DISK_MAX_SIZE,
+            ttl=config.map_cache_ttl,
+        )
+    return _utils.LRUCache(
+        max_size=config.map_cache_max_size or _search_defaults.DEFAULT__MAP_CACHE__MAX_SIZE,
+        ttl=config.map_cache_ttl,
+    )
+
+
 class GraphRAGClient(
     _base_client.BaseClient[typing.Union[_types.Response_T, _types.StreamResponse_T]],
     _base_client.ContextManager,
@@ -127,6 +202,9 @@ class GraphRAGClient(
                 base_url=self._config.chat_llm.base_url,
                 timeout=self._config.chat_llm.timeout,
                 max_retries=self._config.chat_llm.max_retries,
+                rate_limiter=_get_rate_limiter(self._config.chat_llm),
+                token_encoder=_get_chat_token_encoder(self._config),
+                stream_usage=self._config.chat_llm.stream_usage is not False,
                 **(self._config.chat_llm.kwargs or {}),
             )
 
@@ -144,6 +222,7 @@ class GraphRAGClient(
                 base_url=self._config.embedding.base_url,
                 timeout=self._config.embedding.timeout,
                 max_retries=self._config.embedding.max_retries,
+                rate_limiter=_get_rate_limiter(self._config.embedding),
                 max_tokens=self._config.embedding.max_tokens,
                 token_encoder=tiktoken.get_encoding(
                     self._config.embedding.token_encoder
@@ -152,6 +231,11 @@ class GraphRAGClient(
                 else None,
                 **(self._config.embedding.kwargs or {}),
             )
+            embedding_cache = _get_embedding_cache(self._config.embedding)
+            if embedding_cache is not None:
+                if self._logger:
+                    self._logger.info(f'Enabling the embedding cache: {embedding_cache}')
+                self._embedding = _search.CachedEmbedding(self._embedding, embedding_cache)
 
         # Initialize ContextLoader objects
         if self._logger:
@@ -209,6 +293,13 @@ class GraphRAGClient(
             max_data_tokens=self._config.global_search.max_data_tokens,
             community_level=self._config.global_search.community_level,
             encoding_model=self._config.global_search.encoding_model,
+            warm_up_context=self._config.global_search.warm_up_context,
+            map_workers=self._config.global_search.map_workers,
+            map_cache=_get_map_cache(self._config.global_search),
+            community_prefilter=self._config.global_search.community_prefilter,
+            reduce_fan_in=self._config.global_search.reduce_fan_in,
+            reduce_concurrency=self._config.global_search.reduce_concurrency,
+            intermediate_reduce_sys_prompt=self._config.global_search.intermediate_reduce_sys_prompt,
             logger=self._logger,
             **(self._config.global_search.kwargs or {}),
         )
@@ -336,6 +427,9 @@ class AsyncGraphRAGClient(
         _config: The configuration object for the GraphRAG system.
         _chat_llm: The asynchronous language model used for chat interactions.
         _embedding: The embedding model used for handling entity embeddings.
+        _async_embedding:
+            The asynchronous embedding model used to embed queries without
+            blocking the event loop.
         _local_search_engine:
             The search engine for performing local searches asynchronously.
         _global_search_engine:
@@ -347,6 +441,7 @@ class AsyncGraphRAGClient(
     _config: _cfg.GraphRAGConfig
     _chat_llm: _search.BaseAsyncChatLLM
     _embedding: _search.BaseEmbedding
+    _async_embedding: typing.Optional[_search.BaseAsyncEmbedding]
     _local_search_engine: _search.AsyncLocalSearchEngine
     _global_search_engine: _search.AsyncGlobalSearchEngine
     _logger: typing.Optional[_base_engine.Logger]
@@ -385,6 +480,7 @@ class AsyncGraphRAGClient(
         config: _cfg.GraphRAGConfig,
         chat_llm: typing.Optional[_search.BaseAsyncChatLLM] = None,
         embedding: typing.Optional[_search.BaseEmbedding] = None,
+        async_embedding: typing.Optional[_search.BaseAsyncEmbedding] = None,
         logger: typing.Optional[_base_engine.Logger] = None,
     ) -> None:
         """
@@ -423,6 +519,10 @@ class AsyncGraphRAGClient(
                 base_url=self._config.chat_llm.base_url,
                 timeout=self._config.chat_llm.timeout,
                 max_retries=self._config.chat_llm.max_retries,
+                rate_limiter=_get_rate_limiter(self._config.chat_llm),
+                token_encoder=_get_chat_token_encoder(self._config),
+                stream_usage=self._config.chat_llm.stream_usage is not False,
+                concurrency_limiter=_get_concurrency_limiter(self._config.chat_llm),
                 **(self._config.chat_llm.kwargs or {}),
             )
 
@@ -440,6 +540,37 @@ class AsyncGraphRAGClient(
                 base_url=self._config.embedding.base_url,
                 timeout=self._config.embedding.timeout,
                 max_retries=self._config.embedding.max_retries,
+                rate_limiter=_get_rate_limiter(self._config.embedding),
+                max_tokens=self._config.embedding.max_tokens,
+                token_encoder=tiktoken.get_encoding(
+                    self._config.embedding.token_encoder
+                )
+                if self._config.embedding.token_encoder
+                else None,
+                **(self._config.embedding.kwargs or {}),
+            )
+        embedding_cache = None if embedding else _get_embedding_cache(self._config.embedding)
+        if embedding_cache is not None:
+            if self._logger:
+                self._logger.info(f'Enabling the embedding cache: {embedding_cache}')
+            self._embedding = _search.CachedEmbedding(self._embedding, embedding_cache)
+
+        if async_embedding:
+            self._async_embedding = async_embedding
+            if self._logger:
+                self._logger.info(f"Using the provided AsyncEmbedding: {async_embedding}")
+        elif embedding:
+            # A custom sync embedding cannot be mirrored from config, so queries are embedded in a worker thread
+            self._async_embedding = None
+        else:
+            self._async_embedding = _search.AsyncEmbedding(
+                model=self._config.embedding.model,
+                api_key=self._config.embedding.api_key,
+                organization=self._config.embedding.organization,
+                base_url=self._config.embedding.base_url,
+                timeout=self._config.embedding.timeout,
+                max_retries=self._config.embedding.max_retries,
+                rate_limiter=_get_rate_limiter(self._config.embedding),
                 max_tokens=self._config.embedding.max_tokens,
                 token_encoder=tiktoken.get_encoding(
                     self._config.embedding.token_encoder
@@ -448,6 +579,9 @@ class AsyncGraphRAGClient(
                 else None,
                 **(self._config.embedding.kwargs or {}),
             )
+            if embedding_cache is not None:
+                # Shares the cache with the sync embedding, both produce the same vectors
+                self._async_embedding = _search.AsyncCachedEmbedding(self._async_embedding, embedding_cache)
 
         if self._logger:
             self._logger.info(f'Initializing the LocalContextLoader with directory: {self._config.context.directory}')
@@ -472,6 +606,7 @@ class AsyncGraphRAGClient(
         self._local_search_engine = _search.AsyncLocalSearchEngine(
             chat_llm=self._chat_llm,
             embedding=self._embedding,
+            async_embedding=self._async_embedding,
             context_loader=local_context_loader,
             sys_prompt=sys_prompt,
             community_level=self._config.local_search.community_level,
@@ -500,6 +635,14 @@ class AsyncGraphRAGClient(
             max_data_tokens=self._config.global_search.max_data_tokens,
             community_level=self._config.global_search.community_level,
             encoding_model=self._config.global_search.encoding_model,
+            warm_up_context=self._config.global_search.warm_up_context,
+            map_deadline=self._config.global_search.map_deadline,
+            map_quorum=self._config.global_search.map_quorum,
+            map_cache=_get_map_cache(self._config.global_search),
+            community_prefilter=self._config.global_search.community_prefilter,
+            reduce_fan_in=self._config.global_search.reduce_fan_in,
+            reduce_concurrency=self._config.global_search.reduce_concurrency,
+            intermediate_reduce_sys_prompt=self._config.global_search.intermediate_reduce_sys_prompt,
             logger=self._logger,
             **(self._config.global_search.kwargs or {}),
         )
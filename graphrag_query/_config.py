@@ -44,6 +44,26 @@ class ChatLLMConfig(pydantic.BaseModel):
         typing.Optional[int],
         pydantic.Field(..., env="MAX_RETRIES", ge=0, le=10)
     ] = None
+    requests_per_minute: typing.Annotated[
+        typing.Optional[int],
+        pydantic.Field(..., env="REQUESTS_PER_MINUTE", gt=0)
+    ] = None
+    tokens_per_minute: typing.Annotated[
+        typing.Optional[int],
+        pydantic.Field(..., env="TOKENS_PER_MINUTE", gt=0)
+    ] = None
+    adaptive_concurrency: typing.Annotated[
+        typing.Optional[bool],
+        pydantic.Field(..., env="ADAPTIVE_CONCURRENCY")
+    ] = None
+    max_concurrency: typing.Annotated[
+        typing.Optional[int],
+        pydantic.Field(..., env="MAX_CONCURRENCY", ge=1)
+    ] = None
+    stream_usage: typing.Annotated[
+        typing.Optional[bool],
+        pydantic.Field(..., env="STREAM_USAGE")
+    ] = None
     kwargs: typing.Annotated[
         typing.Optional[typing.Dict[str, typing.Any]],
         pydantic.Field(..., env="KWARGS")
@@ -76,6 +96,14 @@ class EmbeddingConfig(pydantic.BaseModel):
         typing.Optional[int],
         pydantic.Field(..., env="MAX_RETRIES", ge=0, le=10)
     ] = None
+    requests_per_minute: typing.Annotated[
+        typing.Optional[int],
+        pydantic.Field(..., env="REQUESTS_PER_MINUTE", gt=0)
+    ] = None
+    tokens_per_minute: typing.Annotated[
+        typing.Optional[int],
+        pydantic.Field(..., env="TOKENS_PER_MINUTE", gt=0)
+    ] = None
     max_tokens: typing.Annotated[
         typing.Optional[int],
         pydantic.Field(..., env="MAX_TOKENS", ge=1)
@@ -84,6 +112,26 @@ class EmbeddingConfig(pydantic.BaseModel):
         typing.Optional[str],
         pydantic.Field(..., env="TOKEN_ENCODER", pattern=r"^[a-zA-Z0-9_]+$")
     ] = None
+    cache_enabled: typing.Annotated[
+        typing.Optional[bool],
+        pydantic.Field(..., env="CACHE_ENABLED")
+    ] = None
+    cache_max_size: typing.Annotated[
+        typing.Optional[int],
+        pydantic.Field(..., env="CACHE_MAX_SIZE", ge=1)
+    ] = None
+    cache_ttl: typing.Annotated[
+        typing.Optional[float],
+        pydantic.Field(..., env="CACHE_TTL", gt=0)
+    ] = None
+    cache_backend: typing.Annotated[
+        typing.Optional[str],
+        pydantic.Field(..., env="CACHE_BACKEND", pattern=r"^(memory|disk)$")
+    ] = None
+    cache_path: typing.Annotated[
+        typing.Optional[str],
+        pydantic.Field(..., env="CACHE_PATH", min_length=1)
+    ] = None
     kwargs: typing.Annotated[
         typing.Optional[typing.Dict[str, typing.Any]],
         pydantic.Field(..., env="KWARGS")
@@ -216,6 +264,58 @@ class GlobalSearchConfig(pydantic.BaseModel):
         typing.Optional[str],
         pydantic.Field(..., env="ENCODING_MODEL", min_length=1)
     ] = None
+    warm_up_context: typing.Annotated[
+        typing.Optional[bool],
+        pydantic.Field(..., env="WARM_UP_CONTEXT")
+    ] = None
+    map_workers: typing.Annotated[
+        typing.Optional[int],
+        pydantic.Field(..., env="MAP_WORKERS", ge=1)
+    ] = None
+    map_deadline: typing.Annotated[
+        typing.Optional[float],
+        pydantic.Field(..., env="MAP_DEADLINE", gt=0)
+    ] = None
+    map_quorum: typing.Annotated[
+        typing.Optional[float],
+        pydantic.Field(..., env="MAP_QUORUM", gt=0, le=1)
+    ] = None
+    community_prefilter: typing.Annotated[
+        typing.Optional[bool],
+        pydantic.Field(..., env="COMMUNITY_PREFILTER")
+    ] = None
+    reduce_fan_in: typing.Annotated[
+        typing.Optional[int],
+        pydantic.Field(..., env="REDUCE_FAN_IN", ge=2)
+    ] = None
+    reduce_concurrency: typing.Annotated[
+        typing.Optional[int],
+        pydantic.Field(..., env="REDUCE_CONCURRENCY", ge=1)
+    ] = None
+    intermediate_reduce_sys_prompt: typing.Annotated[
+        typing.Optional[str],
+        pydantic.Field(..., env="INTERMEDIATE_REDUCE_SYS_PROMPT", min_length=1, repr=False)
+    ] = None
+    map_cache_enabled: typing.Annotated[
+        typing.Optional[bool],
+        pydantic.Field(..., env="MAP_CACHE_ENABLED")
+    ] = None
+    map_cache_max_size: typing.Annotated[
+        typing.Optional[int],
+        pydantic.Field(..., env="MAP_CACHE_MAX_SIZE", ge=1)
+    ] = None
+    map_cache_ttl: typing.Annotated[
+        typing.Optional[float],
+        pydantic.Field(..., env="MAP_CACHE_TTL", gt=0)
+    ] = None
+    map_cache_backend: typing.Annotated[
+        typing.Optional[str],
+        pydantic.Field(..., env="MAP_CACHE_BACKEND", pattern=r"^(memory|disk)$")
+    ] = None
+    map_cache_path: typing.Annotated[
+        typing.Optional[str],
+        pydantic.Field(..., env="MAP_CACHE_PATH", min_length=1)
+    ] = None
     kwargs: typing.Annotated[
         typing.Optional[typing.Dict[str, typing.Any]],
         pydantic.Field(..., env="KWARGS")
@@ -224,7 +324,8 @@ class GlobalSearchConfig(pydantic.BaseModel):
     @pydantic.field_serializer(
         'map_sys_prompt',
         'reduce_sys_prompt',
-        'general_knowledge_sys_prompt'
+        'general_knowledge_sys_prompt',
+        'intermediate_reduce_sys_prompt',
     )
     def __serialize_prompt(self, prompt: typing.Optional[str]) -> typing.Optional[str]:
         return prompt[:50] + '...' if prompt and len(prompt) > 50 else prompt
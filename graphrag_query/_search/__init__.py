@@ -21,16 +21,20 @@ from ._engine import (
     GlobalSearchEngine,
     LocalSearchEngine,
     QueryEngine,
+    SQLiteMapResultCache,
 )
 from ._llm import (
+    AsyncCachedEmbedding,
     AsyncChatLLM,
     AsyncEmbedding,
     BaseAsyncChatLLM,
     BaseAsyncEmbedding,
     BaseChatLLM,
     BaseEmbedding,
+    CachedEmbedding,
     ChatLLM,
     Embedding,
+    SQLiteEmbeddingCache,
 )
 from ._model import (
     Community,
@@ -67,15 +71,19 @@ __all__ = [
     "GlobalSearchEngine",
     "LocalSearchEngine",
     "QueryEngine",
+    "SQLiteMapResultCache",
 
+    "AsyncCachedEmbedding",
     "AsyncChatLLM",
     "AsyncEmbedding",
     "BaseAsyncChatLLM",
     "BaseAsyncEmbedding",
     "BaseChatLLM",
     "BaseEmbedding",
+    "CachedEmbedding",
     "ChatLLM",
     "Embedding",
+    "SQLiteEmbeddingCache",
 
     "Community",
     "CommunityReport",
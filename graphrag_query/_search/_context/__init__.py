@@ -14,6 +14,7 @@ from ._loaders import (
     GlobalContextLoader,
     LocalContextLoader,
 )
+from ._types import ContextRecords
 
 __all__ = [
     "BaseContextBuilder",
@@ -26,4 +27,5 @@ __all__ = [
     "BaseContextLoader",
     "GlobalContextLoader",
     "LocalContextLoader",
+    "ContextRecords",
 ]
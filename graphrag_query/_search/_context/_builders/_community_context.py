@@ -5,17 +5,29 @@ framework.
 Functions:
     build_community_context:
         Prepares community report data as context for system prompts.
-    _compute_community_weights:
+    compute_community_weights:
         Calculates community weight based on associated entities and text units.
-    _rank_report_context:
-        Sorts community report data by community weight and rank.
-    _convert_report_context_to_df:
-        Converts community report context records into a pandas DataFrame.
+    select_relevant_batches:
+        Picks the community report batches worth sending to the map phase.
+    render_report_rows:
+        Renders the community report rows of an index ahead of the first query.
+    _report_weights:
+        Looks up (and normalizes) the weight of each community report.
+    _rank_report_records:
+        Sorts community report records by community weight and rank.
+    _report_records_to_csv:
+        Renders community report records as CSV text.
 """
 
 from __future__ import annotations
 
+import csv
+import functools
+import io
+import math
+import os
 import random
+import types
 import typing
 
 import pandas as pd
@@ -43,6 +55,10 @@ def build_community_context(
     single_batch: bool = True,
     context_name: str = "Reports",
     random_state: int = 86,
+    token_counter: typing.Optional[typing.Callable[[str], int]] = None,
+    community_weights: typing.Optional[typing.Mapping[str, int]] = None,
+    batch_community_ids: typing.Optional[typing.List[typing.List[str]]] = None,
+    rendered_rows: typing.Optional[_utils.RenderedRows] = None,
 ) -> _types.Context_T:
     """
     Prepares community report data as a context table for system prompts.
@@ -77,10 +93,25 @@ def build_community_context(
         random_state:
             A seed used to shuffle the community reports (if shuffle_data is
             True).
+        token_counter:
+            An optional token counter used instead of `token_encoder`.
+        community_weights:
+            Community weights precomputed by `compute_community_weights`. If
+            omitted, they are computed from `entities` on every call. The
+            reports themselves are never modified.
+        batch_community_ids:
+            If a list is given, it is filled with the community IDs of the
+            reports in each returned batch, in batch order.
+        rendered_rows:
+            Optional rows rendered ahead from the same reports, looked up by
+            report ID instead of rendering and counting each row. Not used
+            when community weights are computed, since they depend on the
+            reports selected.
 
     Returns:
-        A tuple containing the formatted context string and a dictionary with
-        the context data as a DataFrame.
+        A tuple containing the formatted context batches (CSV text, rendered
+        without pandas) and a mapping with the context data as a DataFrame,
+        built on first access.
     """
 
     def _is_included(report: _model.CommunityReport) -> bool:
@@ -97,43 +128,47 @@ def build_community_context(
             _header.append(community_rank_name)
         return _header
 
+    weights: typing.Optional[typing.Dict[str, typing.Union[int, float]]] = None
+    if (
+            entities
+            and len(community_reports) > 0
+            and include_community_weight
+            and (
+                    community_reports[0].attributes is None
+                    or community_weight_name not in community_reports[0].attributes
+            )
+    ):
+        if community_weights is None:
+            community_weights = compute_community_weights(entities)
+        weights = _report_weights(community_reports, community_weights, normalize=normalize_community_weight)
+
+    def _attribute_text(report: _model.CommunityReport, field: str) -> str:
+        if weights is not None and field == community_weight_name:
+            return str(weights[report.community_id])
+        return str(report.attributes.get(field, "")) if report.attributes else ""
+
     def _report_context_text(
         report: _model.CommunityReport, attr: typing.List[str]
     ) -> typing.Tuple[str, typing.List[str]]:
         ctx = [report.short_id if report.short_id else "", report.title, *[
-            str(report.attributes.get(field, "")) if report.attributes else ""
-            for field in attr
+            _attribute_text(report, field) for field in attr
         ], report.summary if use_community_summary else report.full_content]
         if include_community_rank:
             ctx.append(str(report.rank))
         result = column_delimiter.join(ctx) + "\n"
         return result, ctx
 
-    compute_community_weights = (
-            entities
-            and len(community_reports) > 0
-            and include_community_weight
-            and (
-                    community_reports[0].attributes is None
-                    or community_weight_name not in community_reports[0].attributes
-            )
-    )
-    if compute_community_weights:
-        community_reports = _compute_community_weights(
-            community_reports=community_reports,
-            entities=entities,
-            weight_attribute=community_weight_name,
-            normalize=normalize_community_weight,
-        )
-
     selected_reports = [report for report in community_reports if _is_included(report)]
 
     if selected_reports is None or len(selected_reports) == 0:
         return [], {}
 
     if shuffle_data:
-        random.seed(random_state)
-        random.shuffle(selected_reports)
+        # a private generator, so concurrent builds do not interleave on the global one
+        random.Random(random_state).shuffle(selected_reports)
+
+    if token_counter is None:
+        token_counter = functools.partial(_utils.num_tokens, token_encoder=token_encoder)
 
     # "global" variables
     attributes = (
@@ -141,45 +176,57 @@ def build_community_context(
         if community_reports[0].attributes
         else []
     )
+    if weights is not None:
+        attributes.append(community_weight_name)
     header = _get_header(attributes)
+    weight_column = community_weight_name if entities and include_community_weight else None
+    rank_column = community_rank_name if include_community_rank else None
+    batch_preamble = f"-----{context_name}-----" + "\n" + column_delimiter.join(header) + "\n"
     all_context_text: typing.List[str] = []
-    all_context_records: typing.List[pd.DataFrame] = []
+    all_context_records: typing.List[typing.List[typing.Any]] = []
 
     # batch variables
-    batch_text: str = ""
     batch_tokens: int = 0
     batch_records: typing.List[typing.List[str]] = []
+    batch_ids: typing.List[str] = []
 
     def _init_batch() -> None:
-        nonlocal batch_text, batch_tokens, batch_records
-        batch_text = (
-                f"-----{context_name}-----" + "\n" + column_delimiter.join(header) + "\n"
-        )
-        batch_tokens = _utils.num_tokens(batch_text, token_encoder)
+        nonlocal batch_tokens, batch_records, batch_ids
+        batch_tokens = token_counter(batch_preamble)
         batch_records = []
+        batch_ids = []
 
     def _cut_batch() -> None:
-        # convert the current context records to pandas dataframe and sort by weight and rank if exist
-        record_df = _convert_report_context_to_df(
-            context_records=batch_records,
+        nonlocal batch_records, batch_ids
+        # sort the current context records by weight and rank if exist, and render them as CSV
+        records = _rank_report_records(
+            records=batch_records,
             header=header,
-            weight_column=(
-                community_weight_name if entities and include_community_weight else None
-            ),
-            rank_column=community_rank_name if include_community_rank else None,
+            weight_column=weight_column,
+            rank_column=rank_column,
         )
-        if len(record_df) == 0:
+        batch_records = []
+        if len(records) == 0:
             return
-        current_context_text = record_df.to_csv(index=False, sep=column_delimiter)
-        all_context_text.append(current_context_text)
-        all_context_records.append(record_df)
+        all_context_text.append(_report_records_to_csv(records, header, column_delimiter))
+        all_context_records.extend(records)
+        if batch_community_ids is not None:
+            batch_community_ids.append(batch_ids)
+        batch_ids = []
 
     # initialize the first batch
     _init_batch()
 
+    rows = _report_rows(
+        rendered_rows, attributes, use_community_summary, include_community_rank, column_delimiter
+    ) if weights is None else {}
     for report in selected_reports:
-        new_context_text, new_context = _report_context_text(report, attributes)
-        new_tokens = _utils.num_tokens(new_context_text, token_encoder)
+        row = rows.get(report.id)
+        if row is not None:
+            new_context, new_tokens = row.record, row.tokens
+        else:
+            new_context_text, new_context = _report_context_text(report, attributes)
+            new_tokens = token_counter(new_context_text)
 
         if batch_tokens + new_tokens > data_max_tokens:
             # add the current batch to the context data and start a new batch if we are in multi-batch mode
@@ -189,134 +236,246 @@ def build_community_context(
             _init_batch()
 
         # add current report to the current batch
-        batch_text += new_context_text
         batch_tokens += new_tokens
         batch_records.append(new_context)
+        batch_ids.append(report.community_id)
 
     # add the last batch if it has not been added
-    if batch_text not in all_context_text:
-        _cut_batch()
+    _cut_batch()
 
     if len(all_context_records) == 0:
         return [], {}
 
-    return all_context_text, {
-        context_name.lower(): pd.concat(all_context_records, ignore_index=True)
-    }
+    # the DataFrame is only built if the records are read (e.g. for verbose results)
+    context_records = _types.ContextRecords()
+    context_records.set_lazy(
+        context_name.lower(),
+        lambda: pd.DataFrame(all_context_records, columns=typing.cast(typing.Any, header)),
+    )
+    return all_context_text, context_records
 
 
-def _compute_community_weights(
-    community_reports: typing.List[_model.CommunityReport],
-    entities: typing.Optional[typing.List[_model.Entity]],
-    weight_attribute: str = "occurrence",
-    normalize: bool = True,
-) -> typing.List[_model.CommunityReport]:
+def render_report_rows(
+    rendered_rows: _utils.RenderedRows,
+    community_reports: typing.Sequence[_model.CommunityReport],
+    use_community_summary: bool = False,
+    include_community_rank: bool = False,
+    column_delimiter: str = "|",
+) -> None:
+    """
+    Renders the community report rows of an index, without community weights,
+    so the first query does not pay for it. The attribute columns are those
+    of the first report, as in the tables built for a query.
+    """
+    if len(community_reports) > 0:
+        attributes = list(community_reports[0].attributes.keys()) if community_reports[0].attributes else []
+        _report_rows(rendered_rows, attributes, use_community_summary, include_community_rank, column_delimiter)
+
+
+def _report_rows(
+    rendered_rows: typing.Optional[_utils.RenderedRows],
+    attributes: typing.List[str],
+    use_community_summary: bool,
+    include_community_rank: bool,
+    column_delimiter: str,
+) -> typing.Mapping[str, _utils.RenderedRow]:
+    if rendered_rows is None:
+        return {}
+    return rendered_rows.table(
+        "community_reports",
+        (use_community_summary, include_community_rank, tuple(attributes)),
+        column_delimiter,
+        functools.partial(
+            _report_record,
+            attributes=attributes,
+            use_community_summary=use_community_summary,
+            include_community_rank=include_community_rank,
+        ),
+    )
+
+
+def _report_record(
+    report: _model.CommunityReport,
+    attributes: typing.List[str],
+    use_community_summary: bool,
+    include_community_rank: bool,
+) -> typing.List[str]:
+    """Return the community report table row of a report, without community weights."""
+    record = [
+        report.short_id if report.short_id else "",
+        report.title,
+        *[str(report.attributes.get(field, "")) if report.attributes else "" for field in attributes],
+        report.summary if use_community_summary else report.full_content,
+    ]
+    if include_community_rank:
+        record.append(str(report.rank))
+    return record
+
+
+def compute_community_weights(
+    entities: typing.Iterable[_model.Entity],
+) -> typing.Mapping[str, int]:
     """
-    Calculates a community's weight as the count of text units associated with
-    entities in the community.
+    Calculates a community's weight as the count of distinct text units
+    associated with entities in the community.
+
+    The weights only depend on the loaded entities, so they are meant to be
+    computed once when the index is loaded and shared read-only by every
+    query.
 
     Args:
-        community_reports:
-            A list of community reports to update with weight information.
-        entities:
-            A list of entities to use for calculating the community weights.
-        weight_attribute:
-            The name of the attribute to store the calculated weight.
-        normalize:
-            Whether to normalize the weights across all community reports.
+        entities: The entities to use for calculating the community weights.
 
     Returns:
-        A list of community reports with updated weight information.
+        A read-only mapping from community ID to its (unnormalized) weight.
     """
-    if not entities:
-        return community_reports
-
-    community_text_units: typing.Dict[str, typing.List[str]] = {}
+    community_text_units: typing.Dict[str, typing.Set[str]] = {}
     for entity in entities:
         if entity.community_ids:
             for community_id in entity.community_ids:
-                if community_id not in community_text_units:
-                    community_text_units[community_id] = []
-                community_text_units[community_id].extend(entity.text_unit_ids or [])
-    for report in community_reports:
-        if not report.attributes:
-            report.attributes = {}
-        report.attributes[weight_attribute] = len(
-            set(community_text_units.get(report.community_id, []))
-        )
-    if normalize:
+                community_text_units.setdefault(community_id, set()).update(entity.text_unit_ids or [])
+    return types.MappingProxyType({
+        community_id: len(text_units) for community_id, text_units in community_text_units.items()
+    })
+
+
+def select_relevant_batches(
+    batch_scores: typing.Sequence[typing.Optional[float]],
+    threshold: float,
+    top_k: int,
+    min_confidence: float,
+) -> typing.List[int]:
+    """
+    Picks the community report batches worth sending to the map phase, given
+    the best query similarity of the reports in each batch.
+
+    A batch is kept if its score clears `threshold` or is among the `top_k`
+    best. If no batch clears `min_confidence`, the similarities say little
+    about the query and every batch is kept.
+
+    Args:
+        batch_scores:
+            The best similarity of each batch; None for a batch without any
+            scored report, which is always kept.
+        threshold: The score above which a batch is always kept.
+        top_k: The number of best-scoring batches that are always kept.
+        min_confidence:
+            The best score below which the filter is not trusted and every
+            batch is kept.
+
+    Returns:
+        The indices of the kept batches, in ascending order.
+    """
+    scored = [(score, index) for index, score in enumerate(batch_scores) if score is not None]
+    if len(scored) == 0 or max(score for score, _ in scored) < min_confidence:
+        return list(range(len(batch_scores)))
+    kept = {index for index, score in enumerate(batch_scores) if score is None or score >= threshold}
+    kept.update(index for _, index in sorted(scored, key=lambda x: (-x[0], x[1]))[:max(top_k, 0)])
+    return sorted(kept)
+
+
+def _report_weights(
+    community_reports: typing.List[_model.CommunityReport],
+    community_weights: typing.Mapping[str, int],
+    normalize: bool = True,
+) -> typing.Dict[str, typing.Union[int, float]]:
+    """
+    Looks up the weight of each community report, optionally normalized by the
+    largest weight among the reports.
+
+    Args:
+        community_reports: The community reports to weigh.
+        community_weights: The weights computed by `compute_community_weights`.
+        normalize: Whether to normalize the weights across the reports.
+
+    Returns:
+        A mapping from community ID to the weight of its report.
+    """
+    weights: typing.Dict[str, typing.Union[int, float]] = {
+        report.community_id: community_weights.get(report.community_id, 0)
+        for report in community_reports
+    }
+    if normalize and weights:
         # normalize by max weight
-        all_weights = [
-            report.attributes[weight_attribute]
-            for report in community_reports
-            if report.attributes
-        ]
-        max_weight = max(all_weights)
-        for report in community_reports:
-            if report.attributes:
-                report.attributes[weight_attribute] = (
-                        report.attributes[weight_attribute] / max_weight
-                )
-    return community_reports
+        max_weight = max(weights.values())
+        weights = {
+            community_id: weight / max_weight if max_weight else 0.0
+            for community_id, weight in weights.items()
+        }
+    return weights
 
 
-def _rank_report_context(
-    report_df: pd.DataFrame,
+def _rank_report_records(
+    records: typing.List[typing.List[str]],
+    header: typing.List[str],
     weight_column: typing.Optional[str] = "occurrence weight",
     rank_column: typing.Optional[str] = "rank",
-) -> pd.DataFrame:
+) -> typing.List[typing.List[typing.Any]]:
     """
-    Sorts the report context by community weight and rank, if these attributes
-    are provided.
+    Sorts community report records by community weight and rank, if these
+    attributes are provided, in descending order with NaN last. Ties are
+    broken by ascending community id, so the order does not depend on the
+    order of the input. The weight and rank values are converted to floats.
 
     Args:
-        report_df: A DataFrame containing the community report data.
+        records: A list of records representing community reports.
+        header: A list of column headers of the records.
         weight_column: The name of the column containing community weights.
         rank_column: The name of the column containing community ranks.
 
     Returns:
-        A sorted DataFrame based on the community weight and rank.
+        The sorted records.
     """
-    rank_attributes: typing.List[str] = []
-    if weight_column:
-        rank_attributes.append(weight_column)
-        report_df[weight_column] = report_df[weight_column].astype(float)
-    if rank_column:
-        rank_attributes.append(rank_column)
-        report_df[rank_column] = report_df[rank_column].astype(float)
-    if len(rank_attributes) > 0:
-        report_df.sort_values(by=rank_attributes, ascending=False, inplace=True)
-    return report_df
-
-
-def _convert_report_context_to_df(
-    context_records: typing.List[typing.List[str]],
+    rank_indices = [header.index(column) for column in (weight_column, rank_column) if column]
+    if len(rank_indices) == 0:
+        return list(records)
+
+    ranked_records: typing.List[typing.List[typing.Any]] = []
+    for record in records:
+        ranked_record: typing.List[typing.Any] = list(record)
+        for index in rank_indices:
+            ranked_record[index] = float(ranked_record[index])
+        ranked_records.append(ranked_record)
+
+    id_index = header.index("id")
+
+    def _key(record: typing.List[typing.Any]) -> typing.Tuple[typing.Any, ...]:
+        id_ = record[id_index]
+        return (
+            *(math.inf if math.isnan(record[index]) else -record[index] for index in rank_indices),
+            # numeric ids in numeric order, before any other ids
+            (0, int(id_), "") if id_.isdigit() else (1, 0, id_),
+        )
+
+    ranked_records.sort(key=_key)
+    return ranked_records
+
+
+def _report_records_to_csv(
+    records: typing.List[typing.List[typing.Any]],
     header: typing.List[str],
-    weight_column: typing.Optional[str] = None,
-    rank_column: typing.Optional[str] = None,
-) -> pd.DataFrame:
+    column_delimiter: str = "|",
+) -> str:
     """
-    Converts community report context records into a pandas DataFrame and sorts
-    by weight and rank.
+    Renders community report records as CSV text, the same way
+    `pd.DataFrame.to_csv(index=False, sep=column_delimiter)` would.
 
     Args:
-        context_records: A list of records representing community reports.
-        header: A list of column headers for the DataFrame.
-        weight_column: An optional column name for community weights.
-        rank_column: An optional column name for community ranks.
+        records: A list of records representing community reports.
+        header: A list of column headers of the records.
+        column_delimiter: The delimiter to use for separating columns.
 
     Returns:
-        A pandas DataFrame containing the community report context data.
+        The CSV text, header included.
     """
-    if len(context_records) == 0:
-        return pd.DataFrame()
-
-    record_df = pd.DataFrame(
-        context_records,
-        columns=typing.cast(typing.Any, header),
-    )
-    return _rank_report_context(
-        report_df=record_df,
-        weight_column=weight_column,
-        rank_column=rank_column,
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=column_delimiter, lineterminator=os.linesep, quoting=csv.QUOTE_MINIMAL)
+    writer.writerow(header)
+    writer.writerows(
+        [
+            ("" if math.isnan(value) else repr(value)) if isinstance(value, float) else value
+            for value in record
+        ]
+        for record in records
     )
+    return buffer.getvalue()
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 import abc
+import concurrent.futures
+import functools
+import time
 import typing
 import warnings
 
@@ -57,17 +60,37 @@ class GlobalContextBuilder(BaseContextBuilder):
         _random_state:
             A random seed used to shuffle the data during community context
             construction.
+        _community_context_cache:
+            The community report batches built so far, keyed by the
+            parameters of `build_community_context`. The batches depend only
+            on the loaded data and those parameters, never on the query.
+        _community_weights:
+            The read-only community weights computed from `_entities` when
+            the data is loaded.
+        _report_index:
+            An optional vector index of the report summary embeddings, keyed
+            by community ID, used to skip batches unrelated to the query.
+        _report_embedding:
+            The embedding model `_report_index` was built with, reused when
+            the data is reloaded.
     """
     _community_reports: typing.List[_model.CommunityReport]
     _entities: typing.Optional[typing.List[_model.Entity]]
+    _community_weights: typing.Mapping[str, int]
     _token_encoder: typing.Optional[tiktoken.Encoding]
     _random_state: int
+    _community_context_cache: _utils.LRUCache[
+        typing.Tuple[typing.List[str], _types.ContextRecords, typing.Tuple[typing.Tuple[str, ...], ...]]
+    ]
+    _report_index: typing.Optional[_vector_stores.BaseVectorStore]
+    _report_embedding: typing.Optional[_llm.BaseEmbedding]
 
     @classmethod
     def from_local_context_builder(
         cls,
         local_context_builder: LocalContextBuilder,
         random_state: int = 42,
+        cache_size: int = 32,
     ) -> GlobalContextBuilder:
         """
         Creates a GlobalContextBuilder from an existing LocalContextBuilder to
@@ -82,6 +105,9 @@ class GlobalContextBuilder(BaseContextBuilder):
                 initialize the GlobalContextBuilder.
             random_state:
                 The random seed used to shuffle community data.
+            cache_size:
+                The maximum number of community batch configurations kept in
+                the cache.
 
         Returns:
             A new instance of GlobalContextBuilder initialized with data from
@@ -92,6 +118,7 @@ class GlobalContextBuilder(BaseContextBuilder):
             entities=list(local_context_builder.entities.values()),
             token_encoder=local_context_builder.token_encoder,
             random_state=random_state,
+            cache_size=cache_size,
         )
 
     @property
@@ -106,6 +133,14 @@ class GlobalContextBuilder(BaseContextBuilder):
     def token_encoder(self) -> typing.Optional[tiktoken.Encoding]:
         return self._token_encoder
 
+    @property
+    def community_weights(self) -> typing.Mapping[str, int]:
+        return self._community_weights
+
+    @property
+    def report_index(self) -> typing.Optional[_vector_stores.BaseVectorStore]:
+        return self._report_index
+
     def __init__(
         self,
         *,
@@ -113,11 +148,188 @@ class GlobalContextBuilder(BaseContextBuilder):
         entities: typing.Optional[typing.List[_model.Entity]] = None,
         token_encoder: typing.Optional[tiktoken.Encoding] = None,
         random_state: int = 42,
+        cache_size: int = 32,
+        community_weights: typing.Optional[typing.Mapping[str, int]] = None,
     ):
         self._community_reports = community_reports
         self._entities = entities
+        self._community_weights = (
+            community_weights
+            if community_weights is not None
+            else _community_context.compute_community_weights(entities or [])
+        )
         self._token_encoder = token_encoder
         self._random_state = random_state
+        self._community_context_cache = _utils.LRUCache(max_size=cache_size)
+        self._report_index = None
+        self._report_embedding = None
+
+    @property
+    def cache_stats(self) -> _utils.CacheStats:
+        return self._community_context_cache.stats
+
+    def build_report_index(self, embedding: _llm.BaseEmbedding) -> None:
+        """
+        Builds the vector index of the report summaries used to filter the
+        community batches by relevance to the query.
+
+        Reports that come with a summary embedding keep it; the others are
+        embedded once here, in a single batch.
+
+        Args:
+            embedding:
+                The embedding model, which must be the one used to embed the
+                queries.
+        """
+        missing = [
+            report for report in self._community_reports
+            if report.summary_embedding is None and (report.summary or report.full_content)
+        ]
+        embedded = dict(zip(
+            (report.community_id for report in missing),
+            embedding.embed_many([report.summary or report.full_content for report in missing]) if missing else [],
+        ))
+        index = _vector_stores.InMemoryVectorStore(collection_name="community_report_summaries")
+        index.load_documents([
+            _vector_stores.VectorStoreDocument(
+                id=report.community_id,
+                text=None,
+                vector=report.summary_embedding or embedded.get(report.community_id),
+            ) for report in self._community_reports
+        ])
+        self._report_index = index
+        self._report_embedding = embedding
+
+    def reload(
+        self,
+        *,
+        community_reports: typing.List[_model.CommunityReport],
+        entities: typing.Optional[typing.List[_model.Entity]] = None,
+        community_weights: typing.Optional[typing.Mapping[str, int]] = None,
+    ) -> None:
+        """
+        Replaces the community reports and entities, dropping every cached
+        community batch built from the previous data.
+
+        Args:
+            community_reports: The new list of community reports.
+            entities: The new optional list of entities.
+            community_weights:
+                Precomputed community weights; computed from `entities` if
+                omitted.
+        """
+        self._community_reports = community_reports
+        self._entities = entities
+        self._community_weights = (
+            community_weights
+            if community_weights is not None
+            else _community_context.compute_community_weights(entities or [])
+        )
+        self.clear_cache()
+        if self._report_embedding is not None:
+            self.build_report_index(self._report_embedding)
+
+    def clear_cache(self) -> None:
+        """Drops every cached community batch."""
+        self._community_context_cache.clear()
+
+    def warm_up(self, **kwargs: typing.Any) -> None:
+        """
+        Builds and caches the community batches ahead of the first query, so
+        that query starts its map phase without any context-building cost.
+
+        Args:
+            **kwargs:
+                The same keyword arguments later passed to `build_context`;
+                the conversation history arguments are ignored.
+        """
+        self._build_community_context(**kwargs)
+
+    def _build_community_context(
+        self,
+        *,
+        use_community_summary: bool = True,
+        column_delimiter: str = "|",
+        shuffle_data: bool = True,
+        include_community_rank: bool = False,
+        min_community_rank: int = 0,
+        community_rank_name: str = "rank",
+        include_community_weight: bool = True,
+        community_weight_name: str = "occurrence",
+        normalize_community_weight: bool = True,
+        data_max_tokens: int = 8000,
+        context_name: str = "Reports",
+        **kwargs: typing.Any,
+    ) -> typing.Tuple[typing.List[str], _types.ContextRecords, typing.List[typing.List[str]]]:
+        key = repr((
+            use_community_summary,
+            column_delimiter,
+            shuffle_data,
+            include_community_rank,
+            min_community_rank,
+            community_rank_name,
+            include_community_weight,
+            community_weight_name,
+            normalize_community_weight,
+            data_max_tokens,
+            context_name,
+        ))
+        cached = self._community_context_cache.get(key)
+        if cached is None:
+            batch_community_ids: typing.List[typing.List[str]] = []
+            community_context, community_context_data = _community_context.build_community_context(
+                community_reports=self._community_reports,
+                entities=self._entities,
+                token_encoder=self._token_encoder,
+                use_community_summary=use_community_summary,
+                column_delimiter=column_delimiter,
+                shuffle_data=shuffle_data,
+                include_community_rank=include_community_rank,
+                min_community_rank=min_community_rank,
+                community_rank_name=community_rank_name,
+                include_community_weight=include_community_weight,
+                community_weight_name=community_weight_name,
+                normalize_community_weight=normalize_community_weight,
+                data_max_tokens=data_max_tokens,
+                single_batch=False,
+                context_name=context_name,
+                random_state=self._random_state,
+                community_weights=self._community_weights,
+                batch_community_ids=batch_community_ids,
+            )
+            cached = (
+                typing.cast(typing.List[str], community_context),
+                _types.ContextRecords(community_context_data),
+                tuple(tuple(ids) for ids in batch_community_ids),
+            )
+            self._community_context_cache.set(key, cached)
+        # hand out copies, so callers cannot alter the cached batches
+        community_context, community_context_data, cached_ids = cached
+        return (
+            list(community_context),
+            community_context_data.copy(),
+            [list(ids) for ids in cached_ids],
+        )
+
+    def _batch_relevance(
+        self,
+        query_embedding: typing.List[float],
+        batch_community_ids: typing.List[typing.List[str]],
+    ) -> typing.List[typing.Optional[float]]:
+        """
+        Scores each community batch by the best query similarity of its
+        report summaries; None for a batch without any indexed report.
+        """
+        index = typing.cast(_vector_stores.BaseVectorStore, self._report_index)
+        scores = {
+            str(result.document.id): result.score
+            for result in index.similarity_search_by_vector(query_embedding, k=len(self._community_reports))
+        }
+        batch_scores: typing.List[typing.Optional[float]] = []
+        for community_ids in batch_community_ids:
+            report_scores = [scores[community_id] for community_id in community_ids if community_id in scores]
+            batch_scores.append(max(report_scores) if report_scores else None)
+        return batch_scores
 
     @typing_extensions.override
     def build_context(
@@ -137,6 +349,10 @@ class GlobalContextBuilder(BaseContextBuilder):
         context_name: str = "Reports",
         conversation_history_user_turns_only: bool = True,
         conversation_history_max_turns: int = 5,
+        query_embedding: typing.Optional[typing.List[float]] = None,
+        relevance_threshold: float = 0.3,
+        relevance_top_k: int = 4,
+        relevance_min_confidence: float = 0.2,
         **kwargs: typing.Any,
     ) -> _types.Context_T:
         """
@@ -176,6 +392,16 @@ class GlobalContextBuilder(BaseContextBuilder):
                 If True, only include user turns in conversation history.
             conversation_history_max_turns:
                 The maximum number of conversation turns to include.
+            query_embedding:
+                The embedding of the query. If given and the report index has
+                been built, only the batches relevant to the query are
+                returned, see `select_relevant_batches`.
+            relevance_threshold:
+                The report similarity above which a batch is always kept.
+            relevance_top_k:
+                The number of most relevant batches that are always kept.
+            relevance_min_confidence:
+                The best report similarity below which every batch is kept.
             **kwargs: Additional arguments for future expansion.
 
         Returns:
@@ -183,7 +409,7 @@ class GlobalContextBuilder(BaseContextBuilder):
             context strings, along with any associated metadata.
         """
         conversation_history_context = ""
-        final_context_data = {}
+        final_context_data = _types.ContextRecords()
         if conversation_history:
             # build conversation history context
             (
@@ -195,14 +421,12 @@ class GlobalContextBuilder(BaseContextBuilder):
                 column_delimiter=column_delimiter,
                 data_max_tokens=data_max_tokens,
                 recency_bias=False,
+                token_encoder=self._token_encoder,
             )
             if conversation_history_context != "":
-                final_context_data = conversation_history_context_data
+                final_context_data.update(conversation_history_context_data)
 
-        community_context, community_context_data = _community_context.build_community_context(
-            community_reports=self._community_reports,
-            entities=self._entities,
-            token_encoder=self._token_encoder,
+        community_context, community_context_data, batch_community_ids = self._build_community_context(
             use_community_summary=use_community_summary,
             column_delimiter=column_delimiter,
             shuffle_data=shuffle_data,
@@ -213,10 +437,22 @@ class GlobalContextBuilder(BaseContextBuilder):
             community_weight_name=community_weight_name,
             normalize_community_weight=normalize_community_weight,
             data_max_tokens=data_max_tokens,
-            single_batch=False,
             context_name=context_name,
-            random_state=self._random_state,
         )
+        if query_embedding is not None and self._report_index is not None and len(community_context) > 0:
+            kept = _community_context.select_relevant_batches(
+                self._batch_relevance(query_embedding, batch_community_ids),
+                threshold=relevance_threshold,
+                top_k=relevance_top_k,
+                min_confidence=relevance_min_confidence,
+            )
+            if len(kept) < len(community_context):
+                community_context = [community_context[index] for index in kept]
+                kept_short_ids = _short_ids(self._community_reports, [batch_community_ids[index] for index in kept])
+                community_context_data.transform(
+                    context_name.lower(),
+                    lambda df: df[df["id"].isin(kept_short_ids)].reset_index(drop=True),
+                )
         final_context_data.update(community_context_data)
         if isinstance(community_context, list):
             return [
@@ -253,12 +489,37 @@ class LocalContextBuilder(BaseContextBuilder):
         _text_embedder:
             The text embedding model used for generating embeddings, consistent
             with the vector store.
+        _async_text_embedder:
+            An optional async text embedding model used by `abuild_context`.
+            When absent, `abuild_context` runs `_text_embedder` in a worker
+            thread instead.
         _token_encoder:
             An optional encoder used to calculate the number of tokens in text,
             for alignment with LLMs.
         _embedding_vectorstore_key:
             A key used to identify entities when searching for matching results,
             though this could be redesigned for a more streamlined approach.
+        _rendered_rows:
+            The rows of the context tables rendered from the loaded entities,
+            relationships, covariates, community reports and text units, with
+            their token counts. The tables with the default settings are
+            rendered when the data is loaded, any other settings on first use.
+        _section_executor:
+            An optional executor on which the community, local and text unit
+            sections are built concurrently once the entities are selected.
+        _context_cache:
+            An optional cache of assembled contexts, keyed by the ordered IDs
+            of the selected entities and the building parameters. Popular
+            entities recur across differently phrased queries, and for a given
+            selection the context is deterministic.
+        _entity_list:
+            The entities as an immutable sequence, built once at load and
+            passed to the retrieval helpers without copying. The same holds
+            for `_community_report_list`, `_text_unit_list` and
+            `_relationship_list`.
+        _relationship_index:
+            The positions in `_relationship_list` of the relationships of each
+            entity, keyed by entity title.
     """
     _entities: typing.Dict[str, _model.Entity]
     _community_reports: typing.Dict[str, _model.CommunityReport]
@@ -267,8 +528,17 @@ class LocalContextBuilder(BaseContextBuilder):
     _covariates: typing.Dict[str, typing.List[_model.Covariate]]
     _entity_text_embeddings: _vector_stores.BaseVectorStore
     _text_embedder: _llm.BaseEmbedding
+    _async_text_embedder: typing.Optional[_llm.BaseAsyncEmbedding]
     _token_encoder: typing.Optional[tiktoken.Encoding]
     _embedding_vectorstore_key: str
+    _rendered_rows: _utils.RenderedRows
+    _section_executor: typing.Optional[concurrent.futures.Executor]
+    _context_cache: typing.Optional[_utils.LRUCache[_types.SingleContext_T]]
+    _entity_list: typing.Tuple[_model.Entity, ...]
+    _community_report_list: typing.Tuple[_model.CommunityReport, ...]
+    _text_unit_list: typing.Tuple[_model.TextUnit, ...]
+    _relationship_list: typing.Tuple[_model.Relationship, ...]
+    _relationship_index: typing.Dict[str, typing.List[int]]
 
     @property
     def entities(self) -> typing.Dict[str, _model.Entity]:
@@ -294,6 +564,18 @@ class LocalContextBuilder(BaseContextBuilder):
     def token_encoder(self) -> typing.Optional[tiktoken.Encoding]:
         return self._token_encoder
 
+    @property
+    def async_text_embedder(self) -> typing.Optional[_llm.BaseAsyncEmbedding]:
+        return self._async_text_embedder
+
+    @async_text_embedder.setter
+    def async_text_embedder(self, value: typing.Optional[_llm.BaseAsyncEmbedding]) -> None:
+        self._async_text_embedder = value
+
+    @property
+    def cache_stats(self) -> _utils.CacheStats:
+        return self._context_cache.stats if self._context_cache is not None else _utils.CacheStats()
+
     def __init__(
         self,
         *,
@@ -306,6 +588,9 @@ class LocalContextBuilder(BaseContextBuilder):
         covariates: typing.Optional[typing.Dict[str, typing.List[_model.Covariate]]] = None,
         token_encoder: typing.Optional[tiktoken.Encoding] = None,
         embedding_vectorstore_key: str = _entity_extraction.EntityVectorStoreKey.ID,
+        async_text_embedder: typing.Optional[_llm.BaseAsyncEmbedding] = None,
+        section_executor: typing.Optional[concurrent.futures.Executor] = None,
+        context_cache_size: int = 128,
     ) -> None:
         community_reports = community_reports or []
         relationships = relationships or []
@@ -324,12 +609,48 @@ class LocalContextBuilder(BaseContextBuilder):
         self._relationships = {
             relationship.id: relationship for relationship in relationships
         }
+        self._entity_list = tuple(self._entities.values())
+        self._community_report_list = tuple(self._community_reports.values())
+        self._text_unit_list = tuple(self._text_units.values())
+        self._relationship_list = tuple(self._relationships.values())
+        self._relationship_index = {}
+        for position, relationship in enumerate(self._relationship_list):
+            self._relationship_index.setdefault(relationship.source, []).append(position)
+            if relationship.target != relationship.source:
+                self._relationship_index.setdefault(relationship.target, []).append(position)
 
         self._covariates = covariates
         self._entity_text_embeddings = entity_text_embeddings
         self._text_embedder = text_embedder
+        self._async_text_embedder = async_text_embedder
         self._token_encoder = token_encoder
         self._embedding_vectorstore_key = embedding_vectorstore_key
+        self._rendered_rows = _utils.RenderedRows(
+            {
+                "entities": self._entity_list,
+                "relationships": self._relationship_list,
+                "community_reports": self._community_report_list,
+                "text_units": self._text_unit_list,
+                **{f"covariates/{name}": covariate_list for name, covariate_list in covariates.items()},
+            },
+            token_encoder,
+        )
+        # the rows of the tables `build_context` builds with its default settings
+        _local_context.render_local_rows(
+            self._rendered_rows,
+            entities=self._entity_list,
+            relationships=self._relationship_list,
+            covariates=covariates,
+        )
+        _community_context.render_report_rows(self._rendered_rows, self._community_report_list)
+        _source_context.render_text_unit_rows(self._rendered_rows, self._text_unit_list)
+        self._section_executor = section_executor
+        self._context_cache = _utils.LRUCache(max_size=context_cache_size) if context_cache_size > 0 else None
+
+    def clear_cache(self) -> None:
+        """Drops every cached context."""
+        if self._context_cache is not None:
+            self._context_cache.clear()
 
     def filter_by_entity_keys(self, entity_keys: typing.Union[typing.List[int], typing.List[str]]) -> None:
         """Filter entity text embeddings by entity keys."""
@@ -423,11 +744,121 @@ class LocalContextBuilder(BaseContextBuilder):
             The constructed context and associated data, ready to be used in
             local search queries.
         """
-        include_entity_names = include_entity_names or []
-        exclude_entity_names = exclude_entity_names or []
         if community_prop + text_unit_prop > 1:
             raise ValueError("The sum of community_prop and text_unit_prop should not exceed 1.")
 
+        selected_entities = _entity_extraction.map_query_to_entities(
+            query=self._expand_query(query, conversation_history, conversation_history_max_turns),
+            text_embedding_vectorstore=self._entity_text_embeddings,
+            text_embedder=self._text_embedder,
+            all_entities=self._entity_list,
+            embedding_vectorstore_key=self._embedding_vectorstore_key,
+            include_entity_names=include_entity_names or [],
+            exclude_entity_names=exclude_entity_names or [],
+            k=top_k_mapped_entities,
+            oversample_scaler=2,
+        )
+
+        return self._build_context_from_entities(
+            selected_entities=selected_entities,
+            data_max_tokens=data_max_tokens,
+            text_unit_prop=text_unit_prop,
+            community_prop=community_prop,
+            top_k_relationships=top_k_relationships,
+            include_community_rank=include_community_rank,
+            include_entity_rank=include_entity_rank,
+            rank_description=rank_description,
+            include_relationship_weight=include_relationship_weight,
+            relationship_ranking_attribute=relationship_ranking_attribute,
+            return_candidate_context=return_candidate_context,
+            use_community_summary=use_community_summary,
+            min_community_rank=min_community_rank,
+            community_context_name=community_context_name,
+            column_delimiter=column_delimiter,
+        )
+
+    async def abuild_context(
+        self,
+        *,
+        query: str,
+        conversation_history: typing.Optional[_conversation_history.ConversationHistory] = None,
+        include_entity_names: typing.Optional[typing.List[str]] = None,
+        exclude_entity_names: typing.Optional[typing.List[str]] = None,
+        conversation_history_max_turns: int = 5,
+        top_k_mapped_entities: int = 10,
+        text_unit_prop: float = 0.5,
+        community_prop: float = 0.25,
+        **kwargs: typing.Any,
+    ) -> _types.Context_T:
+        """
+        Async version of `build_context`.
+
+        The query is embedded with `BaseAsyncEmbedding.aembed` (or, without an
+        async embedder, with the sync embedder in a worker thread) and the
+        entity vector store is queried through its async interface, so a slow
+        embedding round trip does not block the event loop. The remaining
+        context assembly is identical to `build_context`.
+
+        Args:
+            query:
+                The search query used to map to relevant entities and context.
+            conversation_history:
+                Optional conversation history to provide additional context.
+            include_entity_names:
+                A list of entity names to explicitly include in the context.
+            exclude_entity_names:
+                A list of entity names to explicitly exclude from the context.
+            conversation_history_max_turns:
+                The maximum number of conversation turns to include.
+            top_k_mapped_entities:
+                The number of top-matching entities to include in the context.
+            text_unit_prop: The proportion of tokens allocated to text units.
+            community_prop:
+                The proportion of tokens allocated to community reports.
+            **kwargs: The remaining keyword arguments of `build_context`.
+
+        Returns:
+            The constructed context and associated data, ready to be used in
+            local search queries.
+        """
+        if community_prop + text_unit_prop > 1:
+            raise ValueError("The sum of community_prop and text_unit_prop should not exceed 1.")
+
+        selected_entities = await _entity_extraction.amap_query_to_entities(
+            query=self._expand_query(query, conversation_history, conversation_history_max_turns),
+            text_embedding_vectorstore=self._entity_text_embeddings,
+            text_embedder=self._async_text_embedder or self._text_embedder,
+            all_entities=self._entity_list,
+            embedding_vectorstore_key=self._embedding_vectorstore_key,
+            include_entity_names=include_entity_names or [],
+            exclude_entity_names=exclude_entity_names or [],
+            k=top_k_mapped_entities,
+            oversample_scaler=2,
+        )
+
+        return self._build_context_from_entities(
+            selected_entities=selected_entities,
+            text_unit_prop=text_unit_prop,
+            community_prop=community_prop,
+            **kwargs,
+        )
+
+    def _incident_relationships(self, entities: typing.List[_model.Entity]) -> typing.List[_model.Relationship]:
+        """
+        Looks up the relationships with an endpoint among `entities` in the
+        relationship index, in their load order.
+        """
+        positions: typing.Set[int] = set()
+        for entity in entities:
+            positions.update(self._relationship_index.get(entity.title, ()))
+        return [self._relationship_list[position] for position in sorted(positions)]
+
+    @staticmethod
+    def _expand_query(
+        query: str,
+        conversation_history: typing.Optional[_conversation_history.ConversationHistory],
+        conversation_history_max_turns: int,
+    ) -> str:
         # map user query to entities
         # if there is conversation history, attached the previous user questions to the current query
         if conversation_history:
@@ -437,26 +868,67 @@ class LocalContextBuilder(BaseContextBuilder):
                 conversation_history.get_all_turns(conversation_history_max_turns)
             )
             query = f"{query}\n{pre_user_questions}"
+        return query
 
-        selected_entities = _entity_extraction.map_query_to_entities(
-            query=query,
-            text_embedding_vectorstore=self._entity_text_embeddings,
-            text_embedder=self._text_embedder,
-            all_entities=list(self._entities.values()),
-            embedding_vectorstore_key=self._embedding_vectorstore_key,
-            include_entity_names=include_entity_names,
-            exclude_entity_names=exclude_entity_names,
-            k=top_k_mapped_entities,
-            oversample_scaler=2,
-        )
-
-        # build context
-        final_context: typing.List[str] = []
-        final_context_data: typing.Dict[str, pd.DataFrame] = {}
+    def _build_context_from_entities(
+        self,
+        *,
+        selected_entities: typing.List[_model.Entity],
+        data_max_tokens: int = 8000,
+        text_unit_prop: float = 0.5,
+        community_prop: float = 0.25,
+        top_k_relationships: int = 10,
+        include_community_rank: bool = False,
+        include_entity_rank: bool = False,
+        rank_description: str = "number of relationships",
+        include_relationship_weight: bool = False,
+        relationship_ranking_attribute: str = "rank",
+        return_candidate_context: bool = False,
+        use_community_summary: bool = False,
+        min_community_rank: int = 0,
+        community_context_name: str = "Reports",
+        column_delimiter: str = "|",
+        **kwargs: typing.Any,
+    ) -> _types.Context_T:
+        """
+        Assembles the community, local and text unit sections for the entities
+        the query was mapped to. See `build_context` for the arguments.
 
-        # build community context
+        The sections have fixed token shares and do not depend on each other,
+        so they are built concurrently on `_section_executor` if one is set.
+        The time spent on each section is reported in the `timings` of the
+        returned records; a context served from `_context_cache` reports none.
+        """
+        cache_key = repr((
+            tuple(entity.id for entity in selected_entities),
+            data_max_tokens,
+            text_unit_prop,
+            community_prop,
+            top_k_relationships,
+            include_community_rank,
+            include_entity_rank,
+            rank_description,
+            include_relationship_weight,
+            relationship_ranking_attribute,
+            return_candidate_context,
+            use_community_summary,
+            min_community_rank,
+            community_context_name,
+            column_delimiter,
+        ))
+        if self._context_cache is not None:
+            cached = self._context_cache.get(cache_key)
+            if cached is not None:
+                # hand out a copy, so callers cannot alter the cached records
+                context_records = cached[1].copy()
+                # no section was built for this query
+                context_records.timings = {}
+                return cached[0], context_records
+
+        # community context
         community_tokens = max(int(data_max_tokens * community_prop), 0)
-        community_context, community_context_data = self._build_community_context(
+        community_section = functools.partial(
+            self._build_community_context,
             selected_entities=selected_entities,
             data_max_tokens=community_tokens,
             use_community_summary=use_community_summary,
@@ -466,14 +938,12 @@ class LocalContextBuilder(BaseContextBuilder):
             return_candidate_context=return_candidate_context,
             context_name=community_context_name,
         )
-        if community_context.strip() != "":
-            final_context.append(community_context)
-            final_context_data = {**final_context_data, **community_context_data}
 
-        # build local (i.e. entity-relationship-covariate) context
+        # local (i.e. entity-relationship-covariate) context
         local_prop = 1 - community_prop - text_unit_prop
         local_tokens = max(int(data_max_tokens * local_prop), 0)
-        local_context, local_context_data = self._build_local_context(
+        local_section = functools.partial(
+            self._build_local_context,
             selected_entities=selected_entities,
             data_max_tokens=local_tokens,
             include_entity_rank=include_entity_rank,
@@ -484,22 +954,42 @@ class LocalContextBuilder(BaseContextBuilder):
             return_candidate_context=return_candidate_context,
             column_delimiter=column_delimiter,
         )
-        if local_context.strip() != "":
-            final_context.append(str(local_context))
-            final_context_data = {**final_context_data, **local_context_data}
 
-        # build text unit context
+        # text unit context
         text_unit_tokens = max(int(data_max_tokens * text_unit_prop), 0)
-        text_unit_context, text_unit_context_data = self._build_text_unit_context(
+        text_unit_section = functools.partial(
+            self._build_text_unit_context,
             selected_entities=selected_entities,
             data_max_tokens=text_unit_tokens,
             return_candidate_context=return_candidate_context,
         )
-        if text_unit_context.strip() != "":
-            final_context.append(text_unit_context)
-            final_context_data = {**final_context_data, **text_unit_context_data}
 
-        return "\n\n".join(final_context), final_context_data
+        sections = {
+            "community": community_section,
+            "local": local_section,
+            "text_unit": text_unit_section,
+        }
+        if self._section_executor is not None:
+            futures = {
+                name: self._section_executor.submit(_timed, section) for name, section in sections.items()
+            }
+            results = {name: future.result() for name, future in futures.items()}
+        else:
+            results = {name: _timed(section) for name, section in sections.items()}
+
+        # assemble the sections in their fixed order
+        final_context: typing.List[str] = []
+        final_context_data = _types.ContextRecords()
+        for name, ((context, context_data), elapsed) in results.items():
+            final_context_data.timings[name] = elapsed
+            if context.strip() != "":
+                final_context.append(str(context))
+                final_context_data.update(context_data)
+
+        final_context_text = "\n\n".join(final_context)
+        if self._context_cache is not None:
+            self._context_cache.set(cache_key, (final_context_text, final_context_data.copy()))
+        return final_context_text, final_context_data
 
     def _build_community_context(
         self,
@@ -550,21 +1040,17 @@ class LocalContextBuilder(BaseContextBuilder):
                 for community_id in entity.community_ids:
                     community_matches[community_id] = community_matches.get(community_id, 0) + 1
 
-        # sort communities by number of matched entities and rank
-        selected_communities = [
-            self._community_reports[community_id]
-            for community_id in community_matches if community_id in self._community_reports
+        # sort communities by number of matched entities and rank; the sort keys
+        # are kept aside, so the shared reports are never modified
+        community_candidates = [
+            (matches, self._community_reports[community_id])
+            for community_id, matches in community_matches.items() if community_id in self._community_reports
         ]
-        for community in selected_communities:
-            if community.attributes is None:
-                community.attributes = {}
-            community.attributes["matches"] = community_matches[community.id]
-        selected_communities.sort(
-            key=lambda x: (x.attributes["matches"], x.rank),  # type: ignore
-            reverse=True,  # type: ignore
+        community_candidates.sort(
+            key=lambda x: (x[0], x[1].rank),  # type: ignore
+            reverse=True,
         )
-        for community in selected_communities:
-            del community.attributes["matches"]  # type: ignore
+        selected_communities = [community for _, community in community_candidates]
 
         context_text, context_data = _community_context.build_community_context(
             community_reports=selected_communities,
@@ -577,6 +1063,7 @@ class LocalContextBuilder(BaseContextBuilder):
             data_max_tokens=data_max_tokens,
             single_batch=True,
             context_name=context_name,
+            rendered_rows=self._rendered_rows,
         )
         if isinstance(context_text, list) and len(context_text) > 0:
             context_text = "\n\n".join(context_text)
@@ -584,7 +1071,7 @@ class LocalContextBuilder(BaseContextBuilder):
         if return_candidate_context:
             candidate_context_data = _community_reports.get_candidate_communities(
                 selected_entities=selected_entities,
-                community_reports=list(self._community_reports.values()),
+                community_reports=self._community_report_list,
                 use_community_summary=use_community_summary,
                 include_community_rank=include_community_rank,
             )
@@ -634,7 +1121,9 @@ class LocalContextBuilder(BaseContextBuilder):
         if not selected_entities or not self._text_units:
             return "", {context_name.lower(): pd.DataFrame()}
 
-        selected_text_units = []
+        # (entity order, number of relationships, text unit); the sort keys are
+        # kept aside, so the shared text units are never modified
+        text_unit_candidates: typing.List[typing.Tuple[int, int, _model.TextUnit]] = []
         text_unit_ids_set = set()
 
         for index, entity in enumerate(selected_entities):
@@ -645,21 +1134,10 @@ class LocalContextBuilder(BaseContextBuilder):
                     num_relationships = _source_context.count_relationships(
                         selected_unit, entity, self._relationships
                     )
-                    if selected_unit.attributes is None:
-                        selected_unit.attributes = {}
-                    selected_unit.attributes["entity_order"] = index
-                    selected_unit.attributes["num_relationships"] = num_relationships
-                    selected_text_units.append(selected_unit)
-
-        selected_text_units.sort(
-            key=lambda x: (
-                x.attributes["entity_order"], -x.attributes["num_relationships"],  # type: ignore
-            )
-        )
+                    text_unit_candidates.append((index, num_relationships, selected_unit))
 
-        for unit in selected_text_units:
-            unit.attributes.pop("entity_order", None)  # type: ignore
-            unit.attributes.pop("num_relationships", None)  # type: ignore
+        text_unit_candidates.sort(key=lambda x: (x[0], -x[1]))
+        selected_text_units = [unit for _, _, unit in text_unit_candidates]
 
         context_text, context_data = _source_context.build_text_unit_context(
             text_units=selected_text_units,
@@ -668,12 +1146,13 @@ class LocalContextBuilder(BaseContextBuilder):
             shuffle_data=False,
             context_name=context_name,
             column_delimiter=column_delimiter,
+            rendered_rows=self._rendered_rows,
         )
 
         if return_candidate_context:
             candidate_context_data = _text_units.get_candidate_text_units(
                 selected_entities=selected_entities,
-                text_units=list(self._text_units.values()),
+                text_units=self._text_unit_list,
             )
             context_key = context_name.lower()
             if context_key not in context_data:
@@ -730,7 +1209,7 @@ class LocalContextBuilder(BaseContextBuilder):
             The local context data and any associated metadata.
         """
         # build entity context
-        entity_context, entity_context_data = _local_context.build_entity_context(
+        entity_table = _local_context.build_entity_table(
             selected_entities=selected_entities,
             token_encoder=self._token_encoder,
             data_max_tokens=data_max_tokens,
@@ -738,63 +1217,39 @@ class LocalContextBuilder(BaseContextBuilder):
             include_entity_rank=include_entity_rank,
             rank_description=rank_description,
             context_name="Entities",
+            rendered_rows=self._rendered_rows,
         )
-        entity_tokens = _utils.num_tokens(entity_context, self._token_encoder)
+        entity_context = entity_table.text
 
         # build relationship-covariate context
-        added_entities = []
-        final_context = []
-        final_context_data = {}
+        relationships = self._incident_relationships(selected_entities)
+        packer = _local_context.LocalContextPacker(
+            selected_entities=selected_entities,
+            relationships=relationships,
+            covariates=self._covariates,
+            base_tokens=entity_table.tokens,
+            token_encoder=self._token_encoder,
+            data_max_tokens=data_max_tokens,
+            column_delimiter=column_delimiter,
+            top_k_relationships=top_k_relationships,
+            include_relationship_weight=include_relationship_weight,
+            relationship_ranking_attribute=relationship_ranking_attribute,
+            relationship_context_name="Relationships",
+            rendered_rows=self._rendered_rows,
+        )
 
         # gradually add entities and associated metadata to the context until we reach limit
         for entity in selected_entities:
-            current_context = []
-            current_context_data = {}
-            added_entities.append(entity)
-
-            # build relationship context
-            (
-                relationship_context,
-                relationship_context_data,
-            ) = _local_context.build_relationship_context(
-                selected_entities=added_entities,
-                relationships=list(self._relationships.values()),
-                token_encoder=self._token_encoder,
-                data_max_tokens=data_max_tokens,
-                column_delimiter=column_delimiter,
-                top_k_relationships=top_k_relationships,
-                include_relationship_weight=include_relationship_weight,
-                relationship_ranking_attribute=relationship_ranking_attribute,
-                context_name="Relationships",
-            )
-            current_context.append(relationship_context)
-            current_context_data["relationships"] = relationship_context_data
-            total_tokens = entity_tokens + _utils.num_tokens(relationship_context, self._token_encoder)
-
-            # build covariate context
-            for covariate in self._covariates:
-                covariate_context, covariate_context_data = _local_context.build_covariates_context(
-                    selected_entities=added_entities,
-                    covariates=self._covariates[covariate],
-                    token_encoder=self._token_encoder,
-                    data_max_tokens=data_max_tokens,
-                    column_delimiter=column_delimiter,
-                    context_name=covariate,
-                )
-                total_tokens += _utils.num_tokens(covariate_context, self._token_encoder)
-                current_context.append(covariate_context)
-                current_context_data[covariate.lower()] = covariate_context_data
-
-            if total_tokens > data_max_tokens:
+            if not packer.add(entity):
                 warnings.warn("Reached token limit - reverting to previous context state", RuntimeWarning)
                 break
 
-            final_context = current_context
-            final_context_data = current_context_data
+        final_context = packer.context
+        final_context_data = packer.context_data
 
         # attach entity context to final context
         final_context_text = entity_context + "\n\n" + "\n\n".join(final_context)
-        final_context_data["entities"] = entity_context_data
+        final_context_data.set_lazy("entities", entity_table.to_dataframe)
 
         if return_candidate_context:
             # we return all the candidate entities/relationships/covariates (not only those that were fitted into the
@@ -802,8 +1257,8 @@ class LocalContextBuilder(BaseContextBuilder):
             # and add a tag to indicate which records were included in the context window
             candidate_context_data = _local_context.get_candidate_context(
                 selected_entities=selected_entities,
-                entities=list(self._entities.values()),
-                relationships=list(self._relationships.values()),
+                entities=self._entity_list,
+                relationships=relationships,
                 covariates=self._covariates,
                 include_entity_rank=include_entity_rank,
                 entity_rank_description=rank_description,
@@ -827,5 +1282,30 @@ class LocalContextBuilder(BaseContextBuilder):
 
         else:
             for key in final_context_data:
-                final_context_data[key]["in_context"] = True
+                final_context_data.transform(key, _mark_in_context)
         return final_context_text, final_context_data
+
+
+def _timed(func: typing.Callable[[], _types.SingleContext_T]) -> typing.Tuple[_types.SingleContext_T, float]:
+    """Run a context section and return its result with the elapsed seconds."""
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def _mark_in_context(records: pd.DataFrame) -> pd.DataFrame:
+    records["in_context"] = True
+    return records
+
+
+def _short_ids(
+    community_reports: typing.Iterable[_model.CommunityReport],
+    batch_community_ids: typing.Iterable[typing.List[str]],
+) -> typing.Set[str]:
+    """The short IDs (the "id" column of the report table) of the reports in the given batches."""
+    community_ids = {community_id for community_ids in batch_community_ids for community_id in community_ids}
+    return {
+        report.short_id if report.short_id else ""
+        for report in community_reports
+        if report.community_id in community_ids
+    }
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
 import collections
+import csv
 import dataclasses
 import enum
+import functools
+import io
+import itertools
+import os
 import typing
 
 import pandas as pd
@@ -161,9 +166,16 @@ class ConversationHistory:
         Returns:
             A list of strings representing the content of the last user turns.
         """
-        return [turn.content
-                for turn in list(self._turns)
-                if turn.role == ConversationRole.USER][-max_user_turns:]
+        if max_user_turns <= 0:
+            return [turn.content
+                    for turn in self._turns
+                    if turn.role == ConversationRole.USER][-max_user_turns:]
+        # walk back from the latest turn instead of copying the whole history
+        user_turns = itertools.islice(
+            (turn.content for turn in reversed(self._turns) if turn.role == ConversationRole.USER),
+            max_user_turns,
+        )
+        return list(user_turns)[::-1]
 
     def get_all_turns(self, max_turns: int = 10) -> typing.List[str]:
         """
@@ -175,7 +187,10 @@ class ConversationHistory:
         Returns:
             A list of strings representing the content of the turns.
         """
-        return [turn.content for turn in list(self._turns)[-max_turns:]]
+        if max_turns <= 0:
+            return [turn.content for turn in list(self._turns)[-max_turns:]]
+        # walk back from the latest turn instead of copying the whole history
+        return [turn.content for turn in itertools.islice(reversed(self._turns), max_turns)][::-1]
 
     def build_context(
         self,
@@ -186,6 +201,7 @@ class ConversationHistory:
         recency_bias: bool = True,
         column_delimiter: str = "|",
         context_name: str = "Conversation History",
+        token_counter: typing.Optional[typing.Callable[[str], int]] = None,
     ) -> _types.SingleContext_T:
         """
         Prepares the conversation history as context data for system prompts.
@@ -207,10 +223,12 @@ class ConversationHistory:
                 The delimiter used to separate columns in the context data.
             context_name:
                 The name of the context section for conversation history.
+            token_counter:
+                An optional token counter used instead of `token_encoder`.
 
         Returns:
-            A tuple containing the context as a string and a dictionary with the
-            context data as a DataFrame.
+            A tuple containing the context as a string and a mapping with the
+            context data as a DataFrame, built on first access.
         """
         qa_turns = self.to_qa_turns()
         if include_user_turns_only:
@@ -228,36 +246,39 @@ class ConversationHistory:
         if len(qa_turns) == 0 or not qa_turns:
             return "", {context_name: pd.DataFrame()}
 
+        if token_counter is None:
+            token_counter = functools.partial(_utils.num_tokens, token_encoder=token_encoder)
+
         # add table header
         header = f"-----{context_name}-----" + "\n"
+        columns = ["turn", "content"]
+        lines = [_render_row(columns, column_delimiter)]
+        tokens = token_counter(header + lines[0])
 
-        turn_list = []
-        current_context_df = pd.DataFrame()
+        # each turn is rendered and counted once; the budget is checked with a running sum
+        records: typing.List[typing.List[str]] = []
         for turn in qa_turns:
-            turn_list.append(
-                {
-                    "turn":    ConversationRole.USER.__str__(),
-                    "content": turn.user_query.content,
-                }
-            )
+            turn_records = [[ConversationRole.USER.__str__(), turn.user_query.content]]
             if turn.assistant_answers:
-                turn_list.append(
-                    {
-                        "turn":    ConversationRole.ASSISTANT.__str__(),
-                        "content": turn.get_answer_text() or "",
-                    }
-                )
-
-            context_df = pd.DataFrame(turn_list)
-            context_text = header + context_df.to_csv(sep=column_delimiter, index=False)
-            if _utils.num_tokens(context_text, token_encoder) > data_max_tokens:
+                turn_records.append([ConversationRole.ASSISTANT.__str__(), turn.get_answer_text() or ""])
+            turn_lines = [_render_row(record, column_delimiter) for record in turn_records]
+            turn_tokens = sum(token_counter(line) for line in turn_lines)
+            if tokens + turn_tokens > data_max_tokens:
                 break
-
-            current_context_df = context_df
-        context_text = header + current_context_df.to_csv(
-            sep=column_delimiter, index=False
+            tokens += turn_tokens
+            lines.extend(turn_lines)
+            records.extend(turn_records)
+
+        context_records = _types.ContextRecords()
+        if len(records) == 0:
+            # the rendering of an empty table
+            context_records[context_name.lower()] = pd.DataFrame()
+            return header + os.linesep, context_records
+        context_records.set_lazy(
+            context_name.lower(),
+            lambda: pd.DataFrame(records, columns=typing.cast(typing.Any, columns)),
         )
-        return context_text, {context_name.lower(): current_context_df}
+        return header + "".join(lines), context_records
 
     def to_dict(self) -> typing.List[typing.Dict[str, str]]:
         """
@@ -270,3 +291,10 @@ class ConversationHistory:
             A list of dictionaries representing the conversation history.
         """
         return [{"role": turn.role.value, "content": turn.content} for turn in self._turns]
+
+
+def _render_row(record: typing.List[str], column_delimiter: str) -> str:
+    """Render a table row as CSV, the way `DataFrame.to_csv` does."""
+    buffer = io.StringIO()
+    csv.writer(buffer, delimiter=column_delimiter, lineterminator=os.linesep).writerow(record)
+    return buffer.getvalue()
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import asyncio
 import enum
+import heapq
 import typing
 
 from ... import _llm, _model
@@ -28,7 +30,7 @@ def map_query_to_entities(
     query: str,
     text_embedding_vectorstore: _vector_stores.BaseVectorStore,
     text_embedder: _llm.BaseEmbedding,
-    all_entities: typing.List[_model.Entity],
+    all_entities: typing.Sequence[_model.Entity],
     embedding_vectorstore_key: str = EntityVectorStoreKey.ID,
     include_entity_names: typing.Optional[typing.List[str]] = None,
     exclude_entity_names: typing.Optional[typing.List[str]] = None,
@@ -39,10 +41,6 @@ def map_query_to_entities(
     Extract entities that match a given query using semantic similarity of text
     embeddings of query and entity descriptions.
     """
-    if include_entity_names is None:
-        include_entity_names = []
-    if exclude_entity_names is None:
-        exclude_entity_names = []
     matched_entities = []
     if query != "":
         # get entities with the highest semantic similarity to query
@@ -52,18 +50,82 @@ def map_query_to_entities(
             text_embedder=lambda t: text_embedder.embed(t),
             k=k * oversample_scaler,
         )
-        for result in search_results:
-            matched = _entities.get_entity_by_key(
-                entities=all_entities,
-                key=embedding_vectorstore_key,
-                value=result.document.id,
-            )
-            if matched:
-                matched_entities.append(matched)
+        matched_entities = _resolve_search_results(search_results, all_entities, embedding_vectorstore_key)
     else:
-        all_entities.sort(key=lambda x: x.rank if x.rank else 0, reverse=True)
-        matched_entities = all_entities[:k]
+        # same as a stable descending sort truncated to k, without reordering the caller's sequence
+        matched_entities = heapq.nlargest(k, all_entities, key=lambda x: x.rank if x.rank else 0)
 
+    return _filter_matched_entities(matched_entities, all_entities, include_entity_names, exclude_entity_names)
+
+
+async def amap_query_to_entities(
+    query: str,
+    text_embedding_vectorstore: _vector_stores.BaseVectorStore,
+    text_embedder: typing.Union[_llm.BaseAsyncEmbedding, _llm.BaseEmbedding],
+    all_entities: typing.Sequence[_model.Entity],
+    embedding_vectorstore_key: str = EntityVectorStoreKey.ID,
+    include_entity_names: typing.Optional[typing.List[str]] = None,
+    exclude_entity_names: typing.Optional[typing.List[str]] = None,
+    k: int = 10,
+    oversample_scaler: int = 2,
+) -> typing.List[_model.Entity]:
+    """
+    Async version of `map_query_to_entities`. The query is embedded with
+    `BaseAsyncEmbedding.aembed` and the vector store is queried through its async
+    interface, so neither round trip blocks the event loop. A synchronous
+    embedder is accepted as well and is run in a worker thread.
+    """
+    matched_entities = []
+    if query != "":
+        if isinstance(text_embedder, _llm.BaseAsyncEmbedding):
+            async_embedder = text_embedder
+
+            async def _embed(t: str) -> typing.List[float]:
+                return await async_embedder.aembed(t)
+        else:
+            sync_embedder = text_embedder
+
+            async def _embed(t: str) -> typing.List[float]:
+                return await asyncio.to_thread(sync_embedder.embed, t)
+
+        # get entities with the highest semantic similarity to query
+        # oversample to account for excluded entities
+        search_results = await text_embedding_vectorstore.asimilarity_search_by_text(
+            text=query,
+            text_embedder=_embed,
+            k=k * oversample_scaler,
+        )
+        matched_entities = _resolve_search_results(search_results, all_entities, embedding_vectorstore_key)
+    else:
+        # same as a stable descending sort truncated to k, without reordering the caller's sequence
+        matched_entities = heapq.nlargest(k, all_entities, key=lambda x: x.rank if x.rank else 0)
+
+    return _filter_matched_entities(matched_entities, all_entities, include_entity_names, exclude_entity_names)
+
+
+def _resolve_search_results(
+    search_results: typing.List[_vector_stores.VectorStoreSearchResult],
+    all_entities: typing.Sequence[_model.Entity],
+    embedding_vectorstore_key: str,
+) -> typing.List[_model.Entity]:
+    matched_entities = []
+    for result in search_results:
+        matched = _entities.get_entity_by_key(
+            entities=all_entities,
+            key=embedding_vectorstore_key,
+            value=result.document.id,
+        )
+        if matched:
+            matched_entities.append(matched)
+    return matched_entities
+
+
+def _filter_matched_entities(
+    matched_entities: typing.List[_model.Entity],
+    all_entities: typing.Sequence[_model.Entity],
+    include_entity_names: typing.Optional[typing.List[str]],
+    exclude_entity_names: typing.Optional[typing.List[str]],
+) -> typing.List[_model.Entity]:
     # filter out excluded entities
     if exclude_entity_names:
         matched_entities = [
@@ -74,7 +136,7 @@ def map_query_to_entities(
 
     # add entities in the include_entity list
     included_entities = []
-    for entity_name in include_entity_names:
+    for entity_name in include_entity_names or []:
         included_entities.extend(_entities.get_entity_by_name(all_entities, entity_name))
     return included_entities + matched_entities
 
@@ -4,10 +4,18 @@ relationships, and covariates, for use in the GraphRAG framework.
 
 Functions:
     build_entity_context: Prepares entity data as context for system prompts.
+    build_entity_table:
+        Prepares entity data as a packed table with a known token count.
     build_covariates_context:
         Prepares covariate data as context for system prompts.
     build_relationship_context:
         Prepares relationship data as context for system prompts.
+    LocalContextPacker:
+        Packs relationship and covariate tables one entity at a time within a
+        token budget.
+    render_local_rows:
+        Renders the entity, relationship and covariate rows of an index ahead
+        of the first query.
     _filter_relationships:
         Filters and sorts relationships based on selected entities.
     get_candidate_context:
@@ -18,11 +26,14 @@ Functions:
 from __future__ import annotations
 
 import collections
+import dataclasses
+import functools
 import typing
 
 import pandas as pd
 import tiktoken
 
+from .. import _types
 from ... import _model
 from ..._input._retrieval import (
     _covariates,
@@ -40,6 +51,8 @@ def build_entity_context(
     rank_description: str = "number of relationships",
     column_delimiter: str = "|",
     context_name: str = "Entities",
+    token_counter: typing.Optional[typing.Callable[[str], int]] = None,
+    rendered_rows: typing.Optional[_utils.RenderedRows] = None,
 ) -> typing.Tuple[str, pd.DataFrame]:
     """
     Prepares entity data as a context table for use in system prompts.
@@ -54,60 +67,67 @@ def build_entity_context(
         column_delimiter:
             The delimiter to use for separating columns in the context data.
         context_name: The name to use for the context section.
+        token_counter:
+            An optional token counter used instead of `token_encoder`.
+        rendered_rows:
+            Optional rows rendered ahead from the same entities, looked up by
+            entity ID instead of rendering and counting each row.
 
     Returns:
         A tuple containing the formatted context string and a DataFrame
         representing the context data.
     """
+    table = build_entity_table(
+        selected_entities=selected_entities,
+        token_encoder=token_encoder,
+        data_max_tokens=data_max_tokens,
+        include_entity_rank=include_entity_rank,
+        rank_description=rank_description,
+        column_delimiter=column_delimiter,
+        context_name=context_name,
+        token_counter=token_counter,
+        rendered_rows=rendered_rows,
+    )
+    return table.text, table.to_dataframe()
+
+
+def build_entity_table(
+    selected_entities: typing.List[_model.Entity],
+    token_encoder: typing.Optional[tiktoken.Encoding] = None,
+    data_max_tokens: int = 8000,
+    include_entity_rank: bool = True,
+    rank_description: str = "number of relationships",
+    column_delimiter: str = "|",
+    context_name: str = "Entities",
+    token_counter: typing.Optional[typing.Callable[[str], int]] = None,
+    rendered_rows: typing.Optional[_utils.RenderedRows] = None,
+) -> ContextTable:
+    """
+    Like `build_entity_context`, but returns the packed table, whose token
+    count is known without tokenizing the rendered text again.
+    """
     if len(selected_entities) == 0:
-        return "", pd.DataFrame()
+        return ContextTable()
+
+    count_tokens = _token_counter(token_encoder, token_counter)
 
     # add headers
-    current_context_text = f"-----{context_name}-----" + "\n"
-    header = ["id", "entity", "description"]
-    if include_entity_rank:
-        header.append(rank_description)
-    attribute_cols = (
-        list(selected_entities[0].attributes.keys())
-        if selected_entities[0].attributes
-        else []
-    )
-    header.extend(attribute_cols)
-    current_context_text += column_delimiter.join(header) + "\n"
-    current_tokens = _utils.num_tokens(current_context_text, token_encoder)
+    header, attribute_cols = _entity_header(selected_entities, include_entity_rank, rank_description)
+    preamble = f"-----{context_name}-----" + "\n" + column_delimiter.join(header) + "\n"
+    table = ContextTable(header=header, lines=[preamble], tokens=count_tokens(preamble))
 
-    all_context_records = [header]
+    render = functools.partial(_entity_record, include_entity_rank=include_entity_rank, attribute_cols=attribute_cols)
+    rows = _entity_rows(rendered_rows, include_entity_rank, attribute_cols, column_delimiter)
     for entity in selected_entities:
-        new_context = [
-            entity.short_id if entity.short_id else "",
-            entity.title,
-            entity.description if entity.description else "",
-        ]
-        if include_entity_rank:
-            new_context.append(str(entity.rank))
-        for field in attribute_cols:
-            field_value = (
-                str(entity.attributes.get(field))
-                if entity.attributes and entity.attributes.get(field)
-                else ""
-            )
-            new_context.append(field_value)
-        new_context_text = column_delimiter.join(new_context) + "\n"
-        new_tokens = _utils.num_tokens(new_context_text, token_encoder)
-        if current_tokens + new_tokens > data_max_tokens:
+        row = _row(rows, entity, render, column_delimiter, count_tokens)
+        if table.tokens + row.tokens > data_max_tokens:
+            table.full = True
             break
-        current_context_text += new_context_text
-        all_context_records.append(new_context)
-        current_tokens += new_tokens
+        table.lines.append(row.text)
+        table.records.append(row.record)
+        table.tokens += row.tokens
 
-    if len(all_context_records) > 1:
-        record_df = pd.DataFrame(
-            all_context_records[1:], columns=typing.cast(typing.Any, all_context_records[0])
-        )
-    else:
-        record_df = pd.DataFrame()
-
-    return current_context_text, record_df
+    return table
 
 
 def build_covariates_context(
@@ -117,6 +137,7 @@ def build_covariates_context(
     data_max_tokens: int = 8000,
     column_delimiter: str = "|",
     context_name: str = "_model.Covariates",
+    token_counter: typing.Optional[typing.Callable[[str], int]] = None,
 ) -> typing.Tuple[str, pd.DataFrame]:
     """
     Prepares covariate data as a context table for use in system prompts.
@@ -130,6 +151,8 @@ def build_covariates_context(
         column_delimiter:
             The delimiter to use for separating columns in the context data.
         context_name: The name to use for the context section.
+        token_counter:
+            An optional token counter used instead of `token_encoder`.
 
     Returns:
         A tuple containing the formatted context string and a DataFrame
@@ -139,19 +162,17 @@ def build_covariates_context(
     if len(selected_entities) == 0 or len(covariates) == 0:
         return "", pd.DataFrame()
 
-    selected_covariates = typing.List[_model.Covariate]()
+    count_tokens = _token_counter(token_encoder, token_counter)
+    selected_covariates: typing.List[_model.Covariate] = []
     record_df = pd.DataFrame()
 
     # add context header
     current_context_text = f"-----{context_name}-----" + "\n"
 
     # add header
-    header = ["id", "entity"]
-    attributes = covariates[0].attributes or {} if len(covariates) > 0 else {}
-    attribute_cols = list(attributes.keys()) if len(covariates) > 0 else []
-    header.extend(attribute_cols)
+    header, attribute_cols = _covariate_header(covariates)
     current_context_text += column_delimiter.join(header) + "\n"
-    current_tokens = _utils.num_tokens(current_context_text, token_encoder)
+    current_tokens = count_tokens(current_context_text)
 
     all_context_records = [header]
     for entity in selected_entities:
@@ -162,20 +183,9 @@ def build_covariates_context(
         )
 
     for covariate in selected_covariates:
-        new_context = [
-            covariate.short_id if covariate.short_id else "",
-            covariate.subject_id,
-        ]
-        for field in attribute_cols:
-            field_value = (
-                str(covariate.attributes.get(field))
-                if covariate.attributes and covariate.attributes.get(field)
-                else ""
-            )
-            new_context.append(field_value)
-
+        new_context = _covariate_record(covariate, attribute_cols)
         new_context_text = column_delimiter.join(new_context) + "\n"
-        new_tokens = _utils.num_tokens(new_context_text, token_encoder)
+        new_tokens = count_tokens(new_context_text)
         if current_tokens + new_tokens > data_max_tokens:
             break
         current_context_text += new_context_text
@@ -202,6 +212,7 @@ def build_relationship_context(
     relationship_ranking_attribute: str = "rank",
     column_delimiter: str = "|",
     context_name: str = "_model.Relationships",
+    token_counter: typing.Optional[typing.Callable[[str], int]] = None,
 ) -> typing.Tuple[str, pd.DataFrame]:
     """
     Prepares relationship data as a context table for use in system prompts.
@@ -220,6 +231,8 @@ def build_relationship_context(
         column_delimiter:
             The delimiter to use for separating columns in the context data.
         context_name: The name to use for the context section.
+        token_counter:
+            An optional token counter used instead of `token_encoder`.
 
     Returns:
         A tuple containing the formatted context string and a DataFrame
@@ -235,41 +248,19 @@ def build_relationship_context(
     if len(selected_entities) == 0 or len(selected_relationships) == 0:
         return "", pd.DataFrame()
 
+    count_tokens = _token_counter(token_encoder, token_counter)
+
     # add headers
     current_context_text = f"-----{context_name}-----" + "\n"
-    header = ["id", "source", "target", "description"]
-    if include_relationship_weight:
-        header.append("weight")
-    attribute_cols = (
-        list(selected_relationships[0].attributes.keys())
-        if selected_relationships[0].attributes
-        else []
-    )
-    attribute_cols = [col for col in attribute_cols if col not in header]
-    header.extend(attribute_cols)
-
+    header, attribute_cols = _relationship_header(selected_relationships, include_relationship_weight)
     current_context_text += column_delimiter.join(header) + "\n"
-    current_tokens = _utils.num_tokens(current_context_text, token_encoder)
+    current_tokens = count_tokens(current_context_text)
 
     all_context_records = [header]
     for rel in selected_relationships:
-        new_context = [
-            rel.short_id if rel.short_id else "",
-            rel.source,
-            rel.target,
-            rel.description if rel.description else "",
-        ]
-        if include_relationship_weight:
-            new_context.append(str(rel.weight if rel.weight else ""))
-        for field in attribute_cols:
-            field_value = (
-                str(rel.attributes.get(field))
-                if rel.attributes and rel.attributes.get(field)
-                else ""
-            )
-            new_context.append(field_value)
+        new_context = _relationship_record(rel, include_relationship_weight, attribute_cols)
         new_context_text = column_delimiter.join(new_context) + "\n"
-        new_tokens = _utils.num_tokens(new_context_text, token_encoder)
+        new_tokens = count_tokens(new_context_text)
         if current_tokens + new_tokens > data_max_tokens:
             break
         current_context_text += new_context_text
@@ -286,6 +277,464 @@ def build_relationship_context(
     return current_context_text, record_df
 
 
+@dataclasses.dataclass
+class ContextTable:
+    """A context table being packed: its rendered lines, records and tokens."""
+
+    header: typing.List[str] = dataclasses.field(default_factory=list)
+    """column names of the records"""
+
+    lines: typing.List[str] = dataclasses.field(default_factory=list)
+    """rendered lines, starting with the section title and the header line"""
+
+    records: typing.List[typing.List[str]] = dataclasses.field(default_factory=list)
+    """rows added to the table"""
+
+    tokens: int = 0
+    """number of tokens of the rendered lines"""
+
+    full: bool = False
+    """whether a row has been rejected for exceeding the token budget"""
+
+    @property
+    def text(self) -> str:
+        return "".join(self.lines)
+
+    def snapshot(self) -> ContextTable:
+        """Return a copy that is unaffected by rows added to this table later."""
+        return dataclasses.replace(self, lines=list(self.lines), records=list(self.records))
+
+    def to_dataframe(self) -> pd.DataFrame:
+        if len(self.records) == 0:
+            return pd.DataFrame()
+        return pd.DataFrame(self.records, columns=typing.cast(typing.Any, self.header))
+
+
+class LocalContextPacker:
+    """
+    Packs the relationship and covariate tables of the local context one
+    selected entity at a time, keeping the last state that fits the token
+    budget.
+
+    The tables are identical to the ones `build_relationship_context` and
+    `build_covariates_context` return for the entities added so far, but each
+    step only does the work the new entity requires:
+
+    - Covariate rows only ever append, so a step renders and counts just the
+      new entity's covariates, and a rejected step is rolled back by
+      truncating the tables.
+    - Relationships are re-ranked on every step (an added entity turns some
+      out-of-network relationships into in-network ones), but only among the
+      relationships incident to the selected entities, and the rendered rows
+      and their token counts are looked up by relationship ID.
+
+    Table sizes are the sums of their line token counts; every line ends with
+    a newline, on which the tiktoken pre-tokenizers always split, so the sums
+    equal the token counts of the rendered tables.
+    """
+
+    def __init__(
+        self,
+        *,
+        selected_entities: typing.List[_model.Entity],
+        relationships: typing.Iterable[_model.Relationship],
+        covariates: typing.Dict[str, typing.List[_model.Covariate]],
+        base_tokens: int = 0,
+        token_encoder: typing.Optional[tiktoken.Encoding] = None,
+        data_max_tokens: int = 8000,
+        column_delimiter: str = "|",
+        top_k_relationships: int = 10,
+        include_relationship_weight: bool = False,
+        relationship_ranking_attribute: str = "rank",
+        relationship_context_name: str = "Relationships",
+        token_counter: typing.Optional[typing.Callable[[str], int]] = None,
+        rendered_rows: typing.Optional[_utils.RenderedRows] = None,
+    ) -> None:
+        """
+        Args:
+            selected_entities:
+                All the entities that may be added, used to narrow down the
+                relationships and covariates to consider.
+            relationships: All the relationships of the graph index.
+            covariates: All the covariates of the graph index, grouped by type.
+            base_tokens:
+                Tokens already used by the rest of the local context (i.e. the
+                entity table), counted against `data_max_tokens`.
+            token_encoder: An optional token encoder to calculate token counts.
+            data_max_tokens: The maximum number of tokens of the local context.
+            column_delimiter:
+                The delimiter to use for separating columns in the context data.
+            top_k_relationships:
+                The maximum number of out-of-network relationships per entity.
+            include_relationship_weight:
+                Whether to include relationship weights in the context.
+            relationship_ranking_attribute:
+                The attribute used to rank relationships.
+            relationship_context_name:
+                The name to use for the relationship context section.
+            token_counter:
+                An optional token counter used instead of `token_encoder`.
+            rendered_rows:
+                Optional rows rendered ahead from the same relationships and
+                covariates, looked up by record ID instead of rendering and
+                counting each row.
+        """
+        self._count_tokens = _token_counter(token_encoder, token_counter)
+        self._rendered_rows = rendered_rows
+        self._data_max_tokens = data_max_tokens
+        self._column_delimiter = column_delimiter
+        self._top_k_relationships = top_k_relationships
+        self._include_relationship_weight = include_relationship_weight
+        self._relationship_ranking_attribute = relationship_ranking_attribute
+        self._relationship_context_name = relationship_context_name
+        self._base_tokens = base_tokens
+
+        selected_entity_names = {entity.title for entity in selected_entities}
+        self._relationships = [
+            relationship
+            for relationship in relationships
+            if relationship.source in selected_entity_names or relationship.target in selected_entity_names
+        ]
+        self._entities: typing.List[_model.Entity] = []
+        self._entity_names: typing.Set[str] = set()
+        self._relationship_table = ContextTable()
+
+        self._covariate_attribute_cols: typing.Dict[str, typing.List[str]] = {}
+        self._covariate_rows: typing.Dict[str, typing.Mapping[str, _utils.RenderedRow]] = {}
+        self._covariates_by_subject: typing.Dict[str, typing.Dict[str, typing.List[_model.Covariate]]] = {}
+        self._covariate_tables: typing.Dict[str, ContextTable] = {}
+        for name, covariate_list in covariates.items():
+            covariates_by_subject = collections.defaultdict(list)
+            for covariate in covariate_list:
+                if covariate.subject_id in selected_entity_names:
+                    covariates_by_subject[covariate.subject_id].append(covariate)
+            self._covariates_by_subject[name] = covariates_by_subject
+            if len(covariate_list) == 0:
+                self._covariate_tables[name] = ContextTable()
+                continue
+            header, self._covariate_attribute_cols[name] = _covariate_header(covariate_list)
+            self._covariate_rows[name] = _covariate_rows(
+                rendered_rows, name, self._covariate_attribute_cols[name], column_delimiter
+            )
+            self._covariate_tables[name] = self._new_table(name, header)
+
+    @property
+    def entities(self) -> typing.List[_model.Entity]:
+        """The entities added so far."""
+        return self._entities
+
+    @property
+    def context(self) -> typing.List[str]:
+        """The relationship and covariate sections, or nothing if no entity fits."""
+        if len(self._entities) == 0:
+            return []
+        return [self._relationship_table.text] + [table.text for table in self._covariate_tables.values()]
+
+    @property
+    def context_data(self) -> _types.ContextRecords:
+        """
+        The relationship and covariate records, keyed like `build_context`
+        data. The DataFrames are built on first access.
+        """
+        context_data = _types.ContextRecords()
+        if len(self._entities) == 0:
+            return context_data
+        context_data.set_lazy("relationships", self._relationship_table.snapshot().to_dataframe)
+        for name, table in self._covariate_tables.items():
+            context_data.set_lazy(name.lower(), table.snapshot().to_dataframe)
+        return context_data
+
+    def add(self, entity: _model.Entity) -> bool:
+        """
+        Adds an entity's relationships and covariates to the tables.
+
+        Args:
+            entity: The next selected entity.
+
+        Returns:
+            True if the local context still fits the token budget. Otherwise
+            False, with the tables rolled back to the state before the call.
+        """
+        self._entities.append(entity)
+        self._entity_names.add(entity.title)
+        relationship_table = self._pack_relationships()
+        total_tokens = self._base_tokens + relationship_table.tokens
+
+        checkpoints = []
+        for name, table in self._covariate_tables.items():
+            checkpoints.append((table, len(table.lines), len(table.records), table.tokens, table.full))
+            render = functools.partial(_covariate_record, attribute_cols=self._covariate_attribute_cols.get(name, []))
+            rows = self._covariate_rows.get(name, {})
+            for covariate in self._covariates_by_subject[name].get(entity.title, []):
+                if table.full or not self._add_row(
+                    table, _row(rows, covariate, render, self._column_delimiter, self._count_tokens)
+                ):
+                    break
+            total_tokens += table.tokens
+
+        if total_tokens > self._data_max_tokens:
+            self._entities.pop()
+            self._entity_names = {entity.title for entity in self._entities}
+            for table, num_lines, num_records, tokens, full in checkpoints:
+                del table.lines[num_lines:]
+                del table.records[num_records:]
+                table.tokens, table.full = tokens, full
+            return False
+
+        self._relationship_table = relationship_table
+        return True
+
+    def _new_table(self, context_name: str, header: typing.List[str]) -> ContextTable:
+        preamble = f"-----{context_name}-----" + "\n" + self._column_delimiter.join(header) + "\n"
+        return ContextTable(header=header, lines=[preamble], tokens=self._count_tokens(preamble))
+
+    def _add_row(self, table: ContextTable, row: _utils.RenderedRow) -> bool:
+        if table.tokens + row.tokens > self._data_max_tokens:
+            table.full = True
+            return False
+        table.lines.append(row.text)
+        table.records.append(row.record)
+        table.tokens += row.tokens
+        return True
+
+    def _pack_relationships(self) -> ContextTable:
+        selected_relationships = _filter_relationships(
+            selected_entities=self._entities,
+            relationships=[
+                relationship
+                for relationship in self._relationships
+                if relationship.source in self._entity_names or relationship.target in self._entity_names
+            ],
+            top_k_relationships=self._top_k_relationships,
+            relationship_ranking_attribute=self._relationship_ranking_attribute,
+        )
+        if len(selected_relationships) == 0:
+            return ContextTable()
+
+        header, attribute_cols = _relationship_header(selected_relationships, self._include_relationship_weight)
+        table = self._new_table(self._relationship_context_name, header)
+        render = functools.partial(
+            _relationship_record,
+            include_relationship_weight=self._include_relationship_weight,
+            attribute_cols=attribute_cols,
+        )
+        rows = _relationship_rows(
+            self._rendered_rows, self._include_relationship_weight, attribute_cols, self._column_delimiter
+        )
+        for rel in selected_relationships:
+            if not self._add_row(table, _row(rows, rel, render, self._column_delimiter, self._count_tokens)):
+                break
+        return table
+
+
+def _token_counter(
+    token_encoder: typing.Optional[tiktoken.Encoding],
+    token_counter: typing.Optional[typing.Callable[[str], int]],
+) -> typing.Callable[[str], int]:
+    if token_counter is not None:
+        return token_counter
+    return functools.partial(_utils.num_tokens, token_encoder=token_encoder)
+
+
+def render_local_rows(
+    rendered_rows: _utils.RenderedRows,
+    *,
+    entities: typing.Sequence[_model.Entity],
+    relationships: typing.Sequence[_model.Relationship],
+    covariates: typing.Dict[str, typing.List[_model.Covariate]],
+    include_entity_rank: bool = False,
+    include_relationship_weight: bool = False,
+    column_delimiter: str = "|",
+) -> None:
+    """
+    Renders the entity, relationship and covariate rows of an index with the
+    given settings, so the first query does not pay for it. The attribute
+    columns are those of the first record of each kind, as in the tables
+    built for a query.
+    """
+    if len(entities) > 0:
+        _, attribute_cols = _entity_header(entities, include_entity_rank, "")
+        _entity_rows(rendered_rows, include_entity_rank, attribute_cols, column_delimiter)
+    if len(relationships) > 0:
+        _, attribute_cols = _relationship_header(list(relationships[:1]), include_relationship_weight)
+        _relationship_rows(rendered_rows, include_relationship_weight, attribute_cols, column_delimiter)
+    for name, covariate_list in covariates.items():
+        if len(covariate_list) > 0:
+            _covariate_rows(rendered_rows, name, _covariate_header(covariate_list)[1], column_delimiter)
+
+
+def _row(
+    rows: typing.Mapping[str, _utils.RenderedRow],
+    record: typing.Any,
+    render: typing.Callable[[typing.Any], typing.List[str]],
+    column_delimiter: str,
+    count_tokens: typing.Callable[[str], int],
+) -> _utils.RenderedRow:
+    """Looks up the rendered row of a record, or renders and counts it if it was not rendered ahead."""
+    row = rows.get(record.id)
+    if row is None:
+        values = render(record)
+        text = column_delimiter.join(values) + "\n"
+        row = _utils.RenderedRow(values, text, count_tokens(text))
+    return row
+
+
+def _entity_rows(
+    rendered_rows: typing.Optional[_utils.RenderedRows],
+    include_entity_rank: bool,
+    attribute_cols: typing.List[str],
+    column_delimiter: str,
+) -> typing.Mapping[str, _utils.RenderedRow]:
+    if rendered_rows is None:
+        return {}
+    return rendered_rows.table(
+        "entities",
+        (include_entity_rank, tuple(attribute_cols)),
+        column_delimiter,
+        functools.partial(_entity_record, include_entity_rank=include_entity_rank, attribute_cols=attribute_cols),
+    )
+
+
+def _relationship_rows(
+    rendered_rows: typing.Optional[_utils.RenderedRows],
+    include_relationship_weight: bool,
+    attribute_cols: typing.List[str],
+    column_delimiter: str,
+) -> typing.Mapping[str, _utils.RenderedRow]:
+    if rendered_rows is None:
+        return {}
+    return rendered_rows.table(
+        "relationships",
+        (include_relationship_weight, tuple(attribute_cols)),
+        column_delimiter,
+        functools.partial(
+            _relationship_record, include_relationship_weight=include_relationship_weight, attribute_cols=attribute_cols
+        ),
+    )
+
+
+def _covariate_rows(
+    rendered_rows: typing.Optional[_utils.RenderedRows],
+    name: str,
+    attribute_cols: typing.List[str],
+    column_delimiter: str,
+) -> typing.Mapping[str, _utils.RenderedRow]:
+    if rendered_rows is None:
+        return {}
+    return rendered_rows.table(
+        f"covariates/{name}",
+        tuple(attribute_cols),
+        column_delimiter,
+        functools.partial(_covariate_record, attribute_cols=attribute_cols),
+    )
+
+
+def _entity_header(
+    entities: typing.Sequence[_model.Entity],
+    include_entity_rank: bool,
+    rank_description: str,
+) -> typing.Tuple[typing.List[str], typing.List[str]]:
+    """Return the entity table header and its attribute columns."""
+    header = ["id", "entity", "description"]
+    if include_entity_rank:
+        header.append(rank_description)
+    attribute_cols = list(entities[0].attributes.keys()) if entities[0].attributes else []
+    header.extend(attribute_cols)
+    return header, attribute_cols
+
+
+def _entity_record(
+    entity: _model.Entity,
+    include_entity_rank: bool,
+    attribute_cols: typing.List[str],
+) -> typing.List[str]:
+    """Return the entity table row of an entity."""
+    record = [
+        entity.short_id if entity.short_id else "",
+        entity.title,
+        entity.description if entity.description else "",
+    ]
+    if include_entity_rank:
+        record.append(str(entity.rank))
+    for field in attribute_cols:
+        field_value = (
+            str(entity.attributes.get(field))
+            if entity.attributes and entity.attributes.get(field)
+            else ""
+        )
+        record.append(field_value)
+    return record
+
+
+def _covariate_header(
+    covariates: typing.List[_model.Covariate],
+) -> typing.Tuple[typing.List[str], typing.List[str]]:
+    """Return the covariate table header and its attribute columns."""
+    header = ["id", "entity"]
+    attributes = covariates[0].attributes or {} if len(covariates) > 0 else {}
+    attribute_cols = list(attributes.keys()) if len(covariates) > 0 else []
+    header.extend(attribute_cols)
+    return header, attribute_cols
+
+
+def _covariate_record(covariate: _model.Covariate, attribute_cols: typing.List[str]) -> typing.List[str]:
+    """Return the covariate table row of a covariate."""
+    record = [
+        covariate.short_id if covariate.short_id else "",
+        covariate.subject_id,
+    ]
+    for field in attribute_cols:
+        field_value = (
+            str(covariate.attributes.get(field))
+            if covariate.attributes and covariate.attributes.get(field)
+            else ""
+        )
+        record.append(field_value)
+    return record
+
+
+def _relationship_header(
+    relationships: typing.List[_model.Relationship],
+    include_relationship_weight: bool = False,
+) -> typing.Tuple[typing.List[str], typing.List[str]]:
+    """Return the relationship table header and its attribute columns."""
+    header = ["id", "source", "target", "description"]
+    if include_relationship_weight:
+        header.append("weight")
+    attribute_cols = (
+        list(relationships[0].attributes.keys())
+        if relationships[0].attributes
+        else []
+    )
+    attribute_cols = [col for col in attribute_cols if col not in header]
+    header.extend(attribute_cols)
+    return header, attribute_cols
+
+
+def _relationship_record(
+    rel: _model.Relationship,
+    include_relationship_weight: bool,
+    attribute_cols: typing.List[str],
+) -> typing.List[str]:
+    """Return the relationship table row of a relationship."""
+    record = [
+        rel.short_id if rel.short_id else "",
+        rel.source,
+        rel.target,
+        rel.description if rel.description else "",
+    ]
+    if include_relationship_weight:
+        record.append(str(rel.weight if rel.weight else ""))
+    for field in attribute_cols:
+        field_value = (
+            str(rel.attributes.get(field))
+            if rel.attributes and rel.attributes.get(field)
+            else ""
+        )
+        record.append(field_value)
+    return record
+
+
 def _filter_relationships(
     selected_entities: typing.List[_model.Entity],
     relationships: typing.List[_model.Relationship],
@@ -331,58 +780,32 @@ def _filter_relationships(
 
     # within out-of-network relationships, prioritize mutual relationships
     # (i.e. relationships with out-network entities that are shared with multiple selected entities)
-    selected_entity_names = [entity.title for entity in selected_entities]
-    out_network_source_names = [
-        relationship.source
-        for relationship in out_network_relationships
-        if relationship.source not in selected_entity_names
-    ]
-    out_network_target_names = [
-        relationship.target
-        for relationship in out_network_relationships
-        if relationship.target not in selected_entity_names
-    ]
-    out_network_entity_names = list(
-        set(out_network_source_names + out_network_target_names)
-    )
-    out_network_entity_links = collections.defaultdict(int)
-    for entity_name in out_network_entity_names:
-        targets = [
-            relationship.target
-            for relationship in out_network_relationships
-            if relationship.source == entity_name
-        ]
-        sources = [
-            relationship.source
-            for relationship in out_network_relationships
-            if relationship.target == entity_name
-        ]
-        out_network_entity_links[entity_name] = len(set(targets + sources))
-
-    # sort out-network relationships by number of links and rank_attributes
-    for rel in out_network_relationships:
-        if rel.attributes is None:
-            rel.attributes = {}
-        rel.attributes["links"] = (
+    # every out-network relationship links its outside endpoint to one selected entity
+    selected_entity_names = {entity.title for entity in selected_entities}
+    out_network_partners: typing.DefaultDict[str, typing.Set[str]] = collections.defaultdict(set)
+    for relationship in out_network_relationships:
+        if relationship.source not in selected_entity_names:
+            out_network_partners[relationship.source].add(relationship.target)
+        if relationship.target not in selected_entity_names:
+            out_network_partners[relationship.target].add(relationship.source)
+    out_network_entity_links = {
+        entity_name: len(partners) for entity_name, partners in out_network_partners.items()
+    }
+
+    # sort out-network relationships by number of links first, then by
+    # ranking_attribute; the link counts and ranks are looked up rather than
+    # stored on the shared relationships
+    def _links(rel: _model.Relationship) -> int:
+        return (
             out_network_entity_links[rel.source]
             if rel.source in out_network_entity_links
             else out_network_entity_links[rel.target]
         )
 
-    # sort by attributes[links] first, then by ranking_attribute
-    if relationship_ranking_attribute == "weight":
-        out_network_relationships.sort(
-            key=lambda x: (x.attributes["links"], x.weight),  # type: ignore
-            reverse=True,  # type: ignore
-        )
-    else:
-        out_network_relationships.sort(
-            key=lambda x: (
-                x.attributes["links"],  # type: ignore
-                x.attributes[relationship_ranking_attribute],  # type: ignore
-            ),  # type: ignore
-            reverse=True,
-        )
+    rank = _relationships.get_relationship_ranker(
+        out_network_relationships, selected_entities, relationship_ranking_attribute
+    )
+    out_network_relationships.sort(key=lambda x: (_links(x), rank(x)), reverse=True)
 
     relationship_budget = top_k_relationships * len(selected_entities)
     return in_network_relationships + out_network_relationships[:relationship_budget]
@@ -390,8 +813,8 @@ def _filter_relationships(
 
 def get_candidate_context(
     selected_entities: typing.List[_model.Entity],
-    entities: typing.List[_model.Entity],
-    relationships: typing.List[_model.Relationship],
+    entities: typing.Iterable[_model.Entity],
+    relationships: typing.Iterable[_model.Relationship],
     covariates: typing.Dict[str, typing.List[_model.Covariate]],
     include_entity_rank: bool = True,
     entity_rank_description: str = "number of relationships",
@@ -3,17 +3,20 @@ Module for preparing text-unit data and counting relationships for system prompt
 
 Functions:
     build_text_unit_context: Prepares text-unit data as context for system prompts.
+    render_text_unit_rows: Renders the text-unit rows of an index ahead of the first query.
     count_relationships: Counts the number of relationships associated with a text unit for a given entity.
 """
 
 from __future__ import annotations
 
+import functools
 import random
 import typing
 
 import pandas as pd
 import tiktoken
 
+from .. import _types
 from ... import _model
 from .... import _utils
 
@@ -26,7 +29,9 @@ def build_text_unit_context(
     data_max_tokens: int = 8000,
     context_name: str = "Sources",
     random_state: int = 86,
-) -> typing.Tuple[str, typing.Dict[str, pd.DataFrame]]:
+    token_counter: typing.Optional[typing.Callable[[str], int]] = None,
+    rendered_rows: typing.Optional[_utils.RenderedRows] = None,
+) -> _types.SingleContext_T:
     """
     Prepares text-unit data as a context table for use in system prompts.
 
@@ -42,59 +47,116 @@ def build_text_unit_context(
         context_name: The name to use for the context section.
         random_state:
             A seed used to shuffle the text units (if shuffle_data is True).
+        token_counter:
+            An optional token counter used instead of `token_encoder`.
+        rendered_rows:
+            Optional rows rendered ahead from the same text units, looked up
+            by text unit ID instead of rendering and counting each row.
 
     Returns:
-        A tuple containing the formatted context string and a dictionary with
-        the context data as a DataFrame.
+        A tuple containing the formatted context string and a mapping with the
+        context data as a DataFrame, built on first access.
     """
     if text_units is None or len(text_units) == 0:
-        return "", {}
+        return "", _types.ContextRecords()
 
     if shuffle_data:
-        random.seed(random_state)
-        random.shuffle(text_units)
+        # shuffle a copy with a private generator, so neither the caller's list
+        # nor concurrent builds are affected
+        text_units = list(text_units)
+        random.Random(random_state).shuffle(text_units)
+
+    if token_counter is None:
+        token_counter = functools.partial(_utils.num_tokens, token_encoder=token_encoder)
 
     # add context header
     current_context_text = f"-----{context_name}-----" + "\n"
 
     # add header
-    header = ["id", "text"]
-    attribute_cols = (
-        list(text_units[0].attributes.keys()) if text_units[0].attributes else []
-    )
-    attribute_cols = [col for col in attribute_cols if col not in header]
-    header.extend(attribute_cols)
+    header, attribute_cols = _text_unit_header(text_units)
 
     current_context_text += column_delimiter.join(header) + "\n"
-    current_tokens = _utils.num_tokens(current_context_text, token_encoder)
+    current_tokens = token_counter(current_context_text)
     all_context_records = [header]
 
+    rows = _text_unit_rows(rendered_rows, attribute_cols, column_delimiter)
     for unit in text_units:
-        new_context = [
-            unit.short_id or "",
-            unit.text,
-            *[
-                str(unit.attributes.get(field, "")) if unit.attributes else ""
-                for field in attribute_cols
-            ],
-        ]
-        new_context_text = column_delimiter.join(new_context) + "\n"
-        new_tokens = _utils.num_tokens(new_context_text, token_encoder)
+        row = rows.get(unit.id)
+        if row is None:
+            new_context = _text_unit_record(unit, attribute_cols)
+            new_context_text = column_delimiter.join(new_context) + "\n"
+            row = _utils.RenderedRow(new_context, new_context_text, token_counter(new_context_text))
 
-        if current_tokens + new_tokens > data_max_tokens:
+        if current_tokens + row.tokens > data_max_tokens:
             break
 
-        current_context_text += new_context_text
-        all_context_records.append(new_context)
-        current_tokens += new_tokens
+        current_context_text += row.text
+        all_context_records.append(row.record)
+        current_tokens += row.tokens
 
-    if len(all_context_records) > 1:
-        record_df = pd.DataFrame(
+    # the DataFrame is only built if the records are read (e.g. for verbose results)
+    context_records = _types.ContextRecords()
+    context_records.set_lazy(
+        context_name.lower(),
+        lambda: pd.DataFrame(
             all_context_records[1:], columns=typing.cast(typing.Any, all_context_records[0])
-        )
-    else:
-        record_df = pd.DataFrame()
-    return current_context_text, {context_name.lower(): record_df}
+        ) if len(all_context_records) > 1 else pd.DataFrame(),
+    )
+    return current_context_text, context_records
+
+
+def render_text_unit_rows(
+    rendered_rows: _utils.RenderedRows,
+    text_units: typing.Sequence[_model.TextUnit],
+    column_delimiter: str = "|",
+) -> None:
+    """
+    Renders the text-unit rows of an index, so the first query does not pay
+    for it. The attribute columns are those of the first text unit, as in
+    the tables built for a query.
+    """
+    if len(text_units) > 0:
+        _text_unit_rows(rendered_rows, _text_unit_header(text_units)[1], column_delimiter)
+
+
+def _text_unit_rows(
+    rendered_rows: typing.Optional[_utils.RenderedRows],
+    attribute_cols: typing.List[str],
+    column_delimiter: str,
+) -> typing.Mapping[str, _utils.RenderedRow]:
+    if rendered_rows is None:
+        return {}
+    return rendered_rows.table(
+        "text_units",
+        tuple(attribute_cols),
+        column_delimiter,
+        functools.partial(_text_unit_record, attribute_cols=attribute_cols),
+    )
+
+
+def _text_unit_header(
+    text_units: typing.Sequence[_model.TextUnit],
+) -> typing.Tuple[typing.List[str], typing.List[str]]:
+    """Return the text unit table header and its attribute columns."""
+    header = ["id", "text"]
+    attribute_cols = (
+        list(text_units[0].attributes.keys()) if text_units[0].attributes else []
+    )
+    attribute_cols = [col for col in attribute_cols if col not in header]
+    header.extend(attribute_cols)
+    return header, attribute_cols
+
+
+def _text_unit_record(unit: _model.TextUnit, attribute_cols: typing.List[str]) -> typing.List[str]:
+    """Return the text unit table row of a text unit."""
+    return [
+        unit.short_id or "",
+        unit.text,
+        *[
+            str(unit.attributes.get(field, "")) if unit.attributes else ""
+            for field in attribute_cols
+        ],
+    ]
 
 
 def count_relationships(
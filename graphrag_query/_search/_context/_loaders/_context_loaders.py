@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import concurrent.futures
 import os
 import pathlib
 import typing
@@ -168,6 +169,9 @@ class LocalContextLoader(_base.BaseContextLoader):
         store_coll_name: str,
         store_uri: str,
         encoding_model: str,
+        async_embedder: typing.Optional[_llm.BaseAsyncEmbedding] = None,
+        section_workers: typing.Optional[int] = None,
+        context_cache_size: int = 128,
         **kwargs: typing.Any
     ) -> _builders.LocalContextBuilder:
         """
@@ -187,13 +191,26 @@ class LocalContextLoader(_base.BaseContextLoader):
                 embeddings are stored.
             store_uri: The URI for connecting to the vector store.
             encoding_model: The model used for token encoding.
+            async_embedder:
+                Optional async text embedding model used by
+                `LocalContextBuilder.abuild_context` to embed queries without
+                blocking the event loop.
+            section_workers:
+                If set, the community, local and text unit sections of each
+                context are built concurrently on a thread pool with this many
+                workers.
+            context_cache_size:
+                The maximum number of assembled contexts cached per selection
+                of entities and parameters; 0 disables the cache.
             **kwargs:
                 Additional keyword arguments, can be prefixed with 'entities__'
                 for `_utils.get_entities`, 'community_reports__' for
                 `_utils.get_community_reports`, 'text_units__' for
                 `_utils.get_text_units`, 'relationships__' for
-                `_utils.get_relationships`, and 'covariates__' for
-                `_utils.get_covariates`. See details in the specific method
+                `_utils.get_relationships`, 'covariates__' for
+                `_utils.get_covariates`, and 'store__' for `_utils.get_store`
+                (e.g. `store__quantization='binary'` for the quantized entity
+                embedding index). See details in the specific method
                 documentation and source code.
 
         Returns:
@@ -226,7 +243,12 @@ class LocalContextLoader(_base.BaseContextLoader):
                 **_common_utils.filter_kwargs(_utils.get_covariates, kwargs, prefix="covariates__")
             ) if self._covariates is not None else []
         }
-        store = _utils.get_store(entities_list, coll_name=store_coll_name, uri=store_uri)
+        store = _utils.get_store(
+            entities_list,
+            coll_name=store_coll_name,
+            uri=store_uri,
+            **_common_utils.filter_kwargs(_utils.get_store, kwargs, prefix="store__")
+        )
         return _builders.LocalContextBuilder(
             entities=entities_list,
             entity_text_embeddings=store,
@@ -235,7 +257,14 @@ class LocalContextLoader(_base.BaseContextLoader):
             relationships=relationships_list,
             covariates=covariates_dict,
             text_embedder=embedder,
+            async_text_embedder=async_embedder,
             token_encoder=tiktoken.get_encoding(encoding_model),
+            section_executor=(
+                concurrent.futures.ThreadPoolExecutor(
+                    max_workers=section_workers, thread_name_prefix="local-context"
+                ) if section_workers else None
+            ),
+            context_cache_size=context_cache_size,
         )
 
     @typing_extensions.override
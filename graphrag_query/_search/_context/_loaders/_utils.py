@@ -11,7 +11,9 @@ Functions:
     get_relationships: Fetch and process relationship data from a DataFrame.
     get_covariates: Fetch and process covariate data from a DataFrame.
     get_text_units: Fetch and process text unit data from a DataFrame.
-    get_store: Store entity embeddings into a LanceDBVectorStore.
+    get_store:
+        Store entity embeddings into a LanceDBVectorStore, or into a quantized
+        InMemoryVectorStore.
 """
 
 from __future__ import annotations
@@ -23,7 +25,11 @@ import pandas as pd
 from . import _defaults
 from ... import _model
 from ..._input._loaders import _dfs
-from ...._vector_stores import LanceDBVectorStore
+from ...._vector_stores import (
+    BaseVectorStore,
+    InMemoryVectorStore,
+    LanceDBVectorStore,
+)
 
 
 def get_entities(
@@ -259,22 +265,55 @@ def get_text_units(
     )
 
 
-def get_store(entities: typing.List[_model.Entity], coll_name: str, uri: str) -> LanceDBVectorStore:
+def get_store(
+    entities: typing.List[_model.Entity],
+    coll_name: str,
+    uri: str,
+    *,
+    quantization: typing.Optional[typing.Literal["int8", "binary"]] = None,
+    oversample_scaler: typing.Optional[int] = None,
+    rerank: bool = True,
+) -> BaseVectorStore:
     """
-    Store entity embeddings into a LanceDBVectorStore and return the store.
+    Store entity embeddings into a vector store and return the store.
+
+    By default, the embeddings are stored in a LanceDBVectorStore. When
+    `quantization` is set, they are kept in an InMemoryVectorStore that scans
+    int8 or binary codes and re-ranks the top `k * oversample_scaler`
+    candidates with the full-precision vectors.
 
     Args:
         entities:
             A list of processed Entity objects whose embeddings will be stored.
         coll_name: The name of the collection in the vector store.
         uri: The URI of the LanceDB vector store.
+        quantization:
+            Optional quantized index mode: 'binary' for faster searches, or
+            'int8' with `rerank=False` for a smaller index.
+        oversample_scaler:
+            The candidate oversampling factor used for exact re-ranking in the
+            quantized index mode; defaults to the InMemoryVectorStore one for
+            the mode.
+        rerank:
+            Whether the quantized index keeps the full-precision vectors to
+            re-rank its candidates; without them it takes far less memory but
+            loses some recall.
 
     Returns:
-        A LanceDBVectorStore object.
+        A vector store object holding the entity description embeddings.
     """
-    store = LanceDBVectorStore(
-        collection_name=coll_name,
-        uri=uri,
-    )
+    store: BaseVectorStore
+    if quantization:
+        store = InMemoryVectorStore(
+            collection_name=coll_name,
+            quantization=quantization,
+            oversample_scaler=oversample_scaler,
+            rerank=rerank,
+        )
+    else:
+        store = LanceDBVectorStore(
+            collection_name=coll_name,
+            uri=uri,
+        )
     _dfs.store_entity_semantic_embeddings(entities=entities, vectorstore=store)
     return store
@@ -4,6 +4,91 @@ import typing
 
 import pandas as pd
 
-Context_T: typing.TypeAlias = typing.Tuple[typing.Union[str, typing.List[str]], typing.Dict[str, pd.DataFrame]]
+Context_T: typing.TypeAlias = typing.Tuple[
+    typing.Union[str, typing.List[str]], typing.MutableMapping[str, pd.DataFrame]
+]
 
-SingleContext_T: typing.TypeAlias = typing.Tuple[str, typing.Dict[str, pd.DataFrame]]
+SingleContext_T: typing.TypeAlias = typing.Tuple[str, typing.MutableMapping[str, pd.DataFrame]]
+
+RecordsFactory_T: typing.TypeAlias = typing.Callable[[], pd.DataFrame]
+
+
+class ContextRecords(typing.MutableMapping[str, pd.DataFrame]):
+    """
+    The record tables of a built context, keyed by section name.
+
+    Prompts are assembled from the rendered context text alone; the tables
+    only end up in verbose search results. A table can therefore be stored as
+    a factory, which runs on the first access to its key and is replaced by
+    the DataFrame it returns, so searches that never read the records never
+    pay for DataFrame construction.
+
+    Attributes:
+        timings:
+            The time (in seconds) spent building each section of the context,
+            keyed by section name.
+    """
+    timings: typing.Dict[str, float]
+
+    def __init__(self, records: typing.Optional[typing.Mapping[str, pd.DataFrame]] = None) -> None:
+        self._records: typing.Dict[str, typing.Union[pd.DataFrame, RecordsFactory_T]] = {}
+        self.timings = {}
+        if records:
+            self.update(records)
+
+    def set_lazy(self, key: str, factory: RecordsFactory_T) -> None:
+        """Store a table that is built by `factory` on first access."""
+        self._records[key] = factory
+
+    def transform(self, key: str, func: typing.Callable[[pd.DataFrame], pd.DataFrame]) -> None:
+        """Apply `func` to a table once it is built, or right away if it already is."""
+        value = self._records[key]
+        if isinstance(value, pd.DataFrame):
+            self._records[key] = func(value)
+        else:
+            self._records[key] = lambda: func(value())
+
+    def copy(self) -> ContextRecords:
+        """
+        Return an independent copy: built tables are copied, and factories,
+        which build a new table on every call, are shared. The timings are
+        copied too.
+        """
+        copied = ContextRecords()
+        copied._records = {
+            key: value.copy() if isinstance(value, pd.DataFrame) else value for key, value in self._records.items()
+        }
+        copied.timings = dict(self.timings)
+        return copied
+
+    def is_built(self, key: str) -> bool:
+        """Whether the table under `key` has been built."""
+        return isinstance(self._records[key], pd.DataFrame)
+
+    def update(self, other: typing.Any = (), /, **kwargs: pd.DataFrame) -> None:
+        # copy the factories of another ContextRecords instead of building them
+        if isinstance(other, ContextRecords):
+            self._records.update(other._records)
+            other = ()
+        super().update(other, **kwargs)
+
+    def __getitem__(self, key: str) -> pd.DataFrame:
+        value = self._records[key]
+        if not isinstance(value, pd.DataFrame):
+            value = self._records[key] = value()
+        return value
+
+    def __setitem__(self, key: str, value: pd.DataFrame) -> None:
+        self._records[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self._records[key]
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({list(self._records)})"
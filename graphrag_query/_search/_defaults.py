@@ -3,6 +3,7 @@ from __future__ import annotations
 __all__ = [
     "GLOBAL_SEARCH__MAP__SYS_PROMPT",
     "GLOBAL_SEARCH__REDUCE__SYS_PROMPT",
+    "GLOBAL_SEARCH__REDUCE__INTERMEDIATE_SYS_PROMPT",
     "GLOBAL_SEARCH__REDUCE__NO_DATA_ANSWER",
     "GLOBAL_SEARCH__REDUCE__GENERAL_KNOWLEDGE_INSTRUCTION",
     "LOCAL_SEARCH__SYS_PROMPT",
@@ -13,6 +14,16 @@ __all__ = [
     "DEFAULT__GLOBAL_SEARCH__COMMUNITY_LEVEL",
     "DEFAULT__GLOBAL_SEARCH__DATA_MAX_TOKENS",
     "DEFAULT__CONCURRENT_COROUTINES",
+    "DEFAULT__GLOBAL_SEARCH__MAP_WORKERS",
+    "DEFAULT__GLOBAL_SEARCH__REDUCE_CONCURRENCY",
+    "DEFAULT__EMBEDDING_CACHE__MAX_SIZE",
+    "DEFAULT__EMBEDDING_CACHE__DISK_MAX_SIZE",
+    "DEFAULT__EMBEDDING_CACHE__PATH",
+    "DEFAULT__MAP_CACHE__MAX_SIZE",
+    "DEFAULT__MAP_CACHE__DISK_MAX_SIZE",
+    "DEFAULT__MAP_CACHE__PATH",
+    "DEFAULT__ADAPTIVE_CONCURRENCY__INITIAL_LIMIT",
+    "DEFAULT__ADAPTIVE_CONCURRENCY__MAX_LIMIT",
 ]
 
 GLOBAL_SEARCH__MAP__SYS_PROMPT = """
@@ -192,6 +203,53 @@ Markdown formatted, multiple paragraphs.
 Add sections and commentary to the response as appropriate for the length and format. Style the response in markdown.
 """
 
+GLOBAL_SEARCH__REDUCE__INTERMEDIATE_SYS_PROMPT = """
+---Role---
+
+You are a helpful assistant condensing the reports of several analysts about a dataset into fewer key points.
+
+
+---Goal---
+
+Generate a response consisting of a list of key points that responds to the user's question, merging the key points 
+of the analysts' reports below. Merge points that say the same thing, drop points that are irrelevant to the 
+question, and keep the points that are relevant even if only one analyst made them.
+
+Note that the analysts' reports provided below are ranked in the **descending order of importance**.
+
+If the provided reports do not contain sufficient information to provide an answer, just say so. Do not make anything 
+up.
+
+Each key point in the response should have the following element:
+- Description: A comprehensive description of the point.
+- Importance Score: An integer score between 0-100 that indicates how important the point is in answering the user's 
+question, consistent with the importance scores of the points it was merged from. An 'I don't know' type of response 
+should have a score of 0.
+
+The response should be JSON formatted as follows:
+{
+    "points": [
+        {"description": "Description of point 1 [Data: Reports (report ids)]", "score": score_value},
+        {"description": "Description of point 2 [Data: Reports (report ids)]", "score": score_value}
+    ]
+}
+
+The response shall preserve the original meaning and use of modal verbs such as "shall", "may" or "will".
+
+The response should preserve all the data references previously included in the analysts' reports, merging the 
+references of merged points.
+
+**Do not list more than 5 record ids in a single reference**. Instead, list the top 5 most relevant record ids and 
+add "+more" to indicate that there are more.
+
+Do not include information where the supporting evidence for it is not provided.
+
+
+---Analyst Reports---
+
+{{ report_data }}
+"""
+
 GLOBAL_SEARCH__REDUCE__NO_DATA_ANSWER = """
 I am sorry but I am unable to answer this question given the provided data.
 """
@@ -287,3 +345,17 @@ DEFAULT__GLOBAL_SEARCH__COMMUNITY_LEVEL: int = 2
 DEFAULT__GLOBAL_SEARCH__DATA_MAX_TOKENS: int = 8000
 
 DEFAULT__CONCURRENT_COROUTINES: int = 16
+DEFAULT__GLOBAL_SEARCH__MAP_WORKERS: int = DEFAULT__CONCURRENT_COROUTINES
+DEFAULT__GLOBAL_SEARCH__REDUCE_CONCURRENCY: int = DEFAULT__CONCURRENT_COROUTINES
+
+# start where the engines' own concurrency bound is, then probe upwards
+DEFAULT__ADAPTIVE_CONCURRENCY__INITIAL_LIMIT: int = DEFAULT__CONCURRENT_COROUTINES
+DEFAULT__ADAPTIVE_CONCURRENCY__MAX_LIMIT: int = 64
+
+DEFAULT__EMBEDDING_CACHE__MAX_SIZE: int = 1024
+DEFAULT__EMBEDDING_CACHE__DISK_MAX_SIZE: int = 100_000
+DEFAULT__EMBEDDING_CACHE__PATH: str = "./cache/embeddings.sqlite3"
+
+DEFAULT__MAP_CACHE__MAX_SIZE: int = 1024
+DEFAULT__MAP_CACHE__DISK_MAX_SIZE: int = 100_000
+DEFAULT__MAP_CACHE__PATH: str = "./cache/map_results.sqlite3"
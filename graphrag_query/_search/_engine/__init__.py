@@ -12,6 +12,7 @@ from ._local import (
     AsyncLocalSearchEngine,
     LocalSearchEngine,
 )
+from ._map_cache import SQLiteMapResultCache
 
 __all__ = [
     "QueryEngine",
@@ -20,4 +21,5 @@ __all__ = [
     "AsyncLocalSearchEngine",
     "GlobalSearchEngine",
     "AsyncGlobalSearchEngine",
+    "SQLiteMapResultCache",
 ]
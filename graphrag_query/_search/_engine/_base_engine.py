@@ -142,11 +142,13 @@ class QueryEngine(abc.ABC):
         *,
         verbose: bool,
         created: float,
-        context_data: typing.Optional[typing.Dict[str, pd.DataFrame]] = None,
+        context_data: typing.Optional[typing.Mapping[str, pd.DataFrame]] = None,
         context_text: typing.Optional[typing.Union[str, typing.List[str]]] = None,
         map_result: typing.Optional[typing.List[_types.SearchResult]] = None,
-        reduce_context_data: typing.Optional[typing.Dict[str, pd.DataFrame]] = None,
+        reduce_context_data: typing.Optional[typing.Mapping[str, pd.DataFrame]] = None,
         reduce_context_text: typing.Optional[typing.Union[str, typing.List[str]]] = None,
+        cache_usage: typing.Optional[_types.CacheUsage] = None,
+        reduce_usage: typing.Optional[_types.ReduceUsage] = None,
     ) -> _types.SearchResult_T:
         """
         Parses the non-streaming search result from the language model response.
@@ -175,6 +177,13 @@ class QueryEngine(abc.ABC):
             reduce_context_text:
                 Optional context text for the reduce phase of a global search.
                 Only used in verbose mode.
+            cache_usage:
+                Optional cache hit/miss counts of the LLM calls made before the
+                final one. Only used in verbose mode.
+            reduce_usage:
+                Optional calls and token usage of the intermediate reduce calls
+                of a global search, which also count in `llm_calls`. Only used
+                in verbose mode.
 
         Returns:
             A search result object.
@@ -214,10 +223,12 @@ class QueryEngine(abc.ABC):
                 context_data=context_data,
                 context_text=context_text,
                 completion_time=time.time() - created,
-                llm_calls=1,
+                llm_calls=1 + (reduce_usage.llm_calls if reduce_usage else 0),
                 map_result=map_result,
                 reduce_context_data=reduce_context_data,
                 reduce_context_text=reduce_context_text,
+                cache_usage=cache_usage,
+                reduce_usage=reduce_usage,
             )
 
     def _parse_stream_result(
@@ -226,11 +237,13 @@ class QueryEngine(abc.ABC):
         *,
         verbose: bool,
         created: float,
-        context_data: typing.Optional[typing.Dict[str, pd.DataFrame]] = None,
+        context_data: typing.Optional[typing.Mapping[str, pd.DataFrame]] = None,
         context_text: typing.Optional[typing.Union[str, typing.List[str]]] = None,
         map_result: typing.Optional[typing.List[_types.SearchResult]] = None,
-        reduce_context_data: typing.Optional[typing.Dict[str, pd.DataFrame]] = None,
+        reduce_context_data: typing.Optional[typing.Mapping[str, pd.DataFrame]] = None,
         reduce_context_text: typing.Optional[typing.Union[str, typing.List[str]]] = None,
+        cache_usage: typing.Optional[_types.CacheUsage] = None,
+        reduce_usage: typing.Optional[_types.ReduceUsage] = None,
     ) -> _types.StreamSearchResult_T:
         """
         Parses the streaming search result from the language model response.
@@ -260,72 +273,87 @@ class QueryEngine(abc.ABC):
             reduce_context_text:
                 Optional context text for the reduce phase of a global search.
                 Only used in verbose mode.
+            cache_usage:
+                Optional cache hit/miss counts of the LLM calls made before the
+                final one. Only used in verbose mode.
+            reduce_usage:
+                Optional calls and token usage of the intermediate reduce calls
+                of a global search, which also count in `llm_calls`. Only used
+                in verbose mode.
 
         Yields:
             A search result chunk object.
         """
-        for chunk in result:
-            usage = _types.Usage(
-                completion_tokens=chunk.usage.completion_tokens,
-                prompt_tokens=chunk.usage.prompt_tokens,
-                total_tokens=chunk.usage.total_tokens,
-            ) if chunk.usage else None
-            if (
-                    hasattr(chunk.choices[0].delta, 'reasoning_content')
-                    and chunk.choices[0].delta.reasoning_content is not None
-            ):
-                delta_content = chunk.choices[0].delta.reasoning_content
-                thinking = True
-            else:
-                delta_content = chunk.choices[0].delta.content
-                thinking = False
-            if not verbose:
-                yield _types.SearchResultChunk(
-                    created=created.__int__(),
-                    model=self._chat_llm.model,
-                    system_fingerprint=chunk.system_fingerprint,
-                    choice=_types.ChunkChoice(
-                        finish_reason=chunk.choices[0].finish_reason,
-                        delta=_types.Delta(
-                            content=delta_content,
-                            refusal=chunk.choices[0].delta.refusal,
+        try:
+            for chunk in result:
+                usage = _types.Usage(
+                    completion_tokens=chunk.usage.completion_tokens,
+                    prompt_tokens=chunk.usage.prompt_tokens,
+                    total_tokens=chunk.usage.total_tokens,
+                ) if chunk.usage else None
+                if (
+                        hasattr(chunk.choices[0].delta, 'reasoning_content')
+                        and chunk.choices[0].delta.reasoning_content is not None
+                ):
+                    delta_content = chunk.choices[0].delta.reasoning_content
+                    thinking = True
+                else:
+                    delta_content = chunk.choices[0].delta.content
+                    thinking = False
+                if not verbose:
+                    yield _types.SearchResultChunk(
+                        created=created.__int__(),
+                        model=self._chat_llm.model,
+                        system_fingerprint=chunk.system_fingerprint,
+                        choice=_types.ChunkChoice(
+                            finish_reason=chunk.choices[0].finish_reason,
+                            delta=_types.Delta(
+                                content=delta_content,
+                                refusal=chunk.choices[0].delta.refusal,
+                            ),
                         ),
-                    ),
-                    usage=usage,
-                    thinking=thinking,
-                )
-            else:
-                if chunk.choices[0].finish_reason == "stop":
-                    context_data_ = context_data
-                    context_text_ = context_text
-                    completion_time = time.time() - created
-                    llm_calls = 1
+                        usage=usage,
+                        thinking=thinking,
+                    )
                 else:
-                    context_data_ = None
-                    context_text_ = None
-                    completion_time = None
-                    llm_calls = None
-                yield _types.SearchResultChunkVerbose(
-                    created=created.__int__(),
-                    model=self._chat_llm.model,
-                    system_fingerprint=chunk.system_fingerprint,
-                    choice=_types.ChunkChoice(
-                        finish_reason=chunk.choices[0].finish_reason,
-                        delta=_types.Delta(
-                            content=delta_content,
-                            refusal=chunk.choices[0].delta.refusal,
+                    if chunk.choices[0].finish_reason == "stop":
+                        context_data_ = context_data
+                        context_text_ = context_text
+                        completion_time = time.time() - created
+                        llm_calls = 1 + (reduce_usage.llm_calls if reduce_usage else 0)
+                    else:
+                        context_data_ = None
+                        context_text_ = None
+                        completion_time = None
+                        llm_calls = None
+                    yield _types.SearchResultChunkVerbose(
+                        created=created.__int__(),
+                        model=self._chat_llm.model,
+                        system_fingerprint=chunk.system_fingerprint,
+                        choice=_types.ChunkChoice(
+                            finish_reason=chunk.choices[0].finish_reason,
+                            delta=_types.Delta(
+                                content=delta_content,
+                                refusal=chunk.choices[0].delta.refusal,
+                            ),
                         ),
-                    ),
-                    usage=usage,
-                    context_data=context_data_,
-                    context_text=context_text_,
-                    completion_time=completion_time,
-                    llm_calls=llm_calls,
-                    map_result=map_result,
-                    reduce_context_data=reduce_context_data,
-                    reduce_context_text=reduce_context_text,
-                    thinking=thinking,
-                )
+                        usage=usage,
+                        context_data=context_data_,
+                        context_text=context_text_,
+                        completion_time=completion_time,
+                        llm_calls=llm_calls,
+                        map_result=map_result,
+                        reduce_context_data=reduce_context_data,
+                        reduce_context_text=reduce_context_text,
+                        cache_usage=cache_usage,
+                        reduce_usage=reduce_usage,
+                        thinking=thinking,
+                    )
+        finally:
+            # close the upstream response if the consumer stops early
+            close = getattr(result, "close", None)
+            if close is not None:
+                close()
 
     def close(self) -> None:
         """
@@ -460,11 +488,13 @@ class AsyncQueryEngine(abc.ABC):
         *,
         verbose: bool,
         created: float,
-        context_data: typing.Optional[typing.Dict[str, pd.DataFrame]] = None,
+        context_data: typing.Optional[typing.Mapping[str, pd.DataFrame]] = None,
         context_text: typing.Optional[typing.Union[str, typing.List[str]]] = None,
         map_result: typing.Optional[typing.List[_types.SearchResult]] = None,
-        reduce_context_data: typing.Optional[typing.Dict[str, pd.DataFrame]] = None,
+        reduce_context_data: typing.Optional[typing.Mapping[str, pd.DataFrame]] = None,
         reduce_context_text: typing.Optional[typing.Union[str, typing.List[str]]] = None,
+        cache_usage: typing.Optional[_types.CacheUsage] = None,
+        reduce_usage: typing.Optional[_types.ReduceUsage] = None,
     ) -> _types.SearchResult_T:
         """
         Parses the non-streaming search result from the language model response.
@@ -493,6 +523,13 @@ class AsyncQueryEngine(abc.ABC):
             reduce_context_text:
                 Optional context text for the reduce phase of a global search.
                 Only used in verbose mode.
+            cache_usage:
+                Optional cache hit/miss counts of the LLM calls made before the
+                final one. Only used in verbose mode.
+            reduce_usage:
+                Optional calls and token usage of the intermediate reduce calls
+                of a global search, which also count in `llm_calls`. Only used
+                in verbose mode.
 
         Returns:
             A search result object.
@@ -532,10 +569,12 @@ class AsyncQueryEngine(abc.ABC):
                 context_data=context_data,
                 context_text=context_text,
                 completion_time=time.time() - created,
-                llm_calls=1,
+                llm_calls=1 + (reduce_usage.llm_calls if reduce_usage else 0),
                 map_result=map_result,
                 reduce_context_data=reduce_context_data,
                 reduce_context_text=reduce_context_text,
+                cache_usage=cache_usage,
+                reduce_usage=reduce_usage,
             )
 
     async def _parse_stream_result(
@@ -544,11 +583,13 @@ class AsyncQueryEngine(abc.ABC):
         *,
         verbose: bool,
         created: float,
-        context_data: typing.Optional[typing.Dict[str, pd.DataFrame]] = None,
+        context_data: typing.Optional[typing.Mapping[str, pd.DataFrame]] = None,
         context_text: typing.Optional[typing.Union[str, typing.List[str]]] = None,
         map_result: typing.Optional[typing.List[_types.SearchResult]] = None,
-        reduce_context_data: typing.Optional[typing.Dict[str, pd.DataFrame]] = None,
+        reduce_context_data: typing.Optional[typing.Mapping[str, pd.DataFrame]] = None,
         reduce_context_text: typing.Optional[typing.Union[str, typing.List[str]]] = None,
+        cache_usage: typing.Optional[_types.CacheUsage] = None,
+        reduce_usage: typing.Optional[_types.ReduceUsage] = None,
     ) -> _types.AsyncStreamSearchResult_T:
         """
         Parses the streaming search result from the language model response.
@@ -578,72 +619,87 @@ class AsyncQueryEngine(abc.ABC):
             reduce_context_text:
                 Optional context text for the reduce phase of a global search.
                 Only used in verbose mode.
+            cache_usage:
+                Optional cache hit/miss counts of the LLM calls made before the
+                final one. Only used in verbose mode.
+            reduce_usage:
+                Optional calls and token usage of the intermediate reduce calls
+                of a global search, which also count in `llm_calls`. Only used
+                in verbose mode.
 
         Yields:
             A search result chunk object.
         """
-        async for chunk in result:
-            usage = _types.Usage(
-                completion_tokens=chunk.usage.completion_tokens,
-                prompt_tokens=chunk.usage.prompt_tokens,
-                total_tokens=chunk.usage.total_tokens,
-            ) if chunk.usage else None
-            if (
-                    hasattr(chunk.choices[0].delta, 'reasoning_content')
-                    and chunk.choices[0].delta.reasoning_content is not None
-            ):
-                delta_content = chunk.choices[0].delta.reasoning_content
-                thinking = True
-            else:
-                delta_content = chunk.choices[0].delta.content
-                thinking = False
-            if not verbose:
-                yield _types.SearchResultChunk(
-                    created=created.__int__(),
-                    model=self._chat_llm.model,
-                    system_fingerprint=chunk.system_fingerprint,
-                    choice=_types.ChunkChoice(
-                        finish_reason=chunk.choices[0].finish_reason,
-                        delta=_types.Delta(
-                            content=delta_content,
-                            refusal=chunk.choices[0].delta.refusal,
+        try:
+            async for chunk in result:
+                usage = _types.Usage(
+                    completion_tokens=chunk.usage.completion_tokens,
+                    prompt_tokens=chunk.usage.prompt_tokens,
+                    total_tokens=chunk.usage.total_tokens,
+                ) if chunk.usage else None
+                if (
+                        hasattr(chunk.choices[0].delta, 'reasoning_content')
+                        and chunk.choices[0].delta.reasoning_content is not None
+                ):
+                    delta_content = chunk.choices[0].delta.reasoning_content
+                    thinking = True
+                else:
+                    delta_content = chunk.choices[0].delta.content
+                    thinking = False
+                if not verbose:
+                    yield _types.SearchResultChunk(
+                        created=created.__int__(),
+                        model=self._chat_llm.model,
+                        system_fingerprint=chunk.system_fingerprint,
+                        choice=_types.ChunkChoice(
+                            finish_reason=chunk.choices[0].finish_reason,
+                            delta=_types.Delta(
+                                content=delta_content,
+                                refusal=chunk.choices[0].delta.refusal,
+                            ),
                         ),
-                    ),
-                    usage=usage,
-                    thinking=thinking,
-                )
-            else:
-                if chunk.choices[0].finish_reason == "stop":
-                    context_data_ = context_data
-                    context_text_ = context_text
-                    completion_time = time.time() - created
-                    llm_calls = 1
+                        usage=usage,
+                        thinking=thinking,
+                    )
                 else:
-                    context_data_ = None
-                    context_text_ = None
-                    completion_time = None
-                    llm_calls = None
-                yield _types.SearchResultChunkVerbose(
-                    created=created.__int__(),
-                    model=self._chat_llm.model,
-                    system_fingerprint=chunk.system_fingerprint,
-                    choice=_types.ChunkChoice(
-                        finish_reason=chunk.choices[0].finish_reason,
-                        delta=_types.Delta(
-                            content=delta_content,
-                            refusal=chunk.choices[0].delta.refusal,
+                    if chunk.choices[0].finish_reason == "stop":
+                        context_data_ = context_data
+                        context_text_ = context_text
+                        completion_time = time.time() - created
+                        llm_calls = 1 + (reduce_usage.llm_calls if reduce_usage else 0)
+                    else:
+                        context_data_ = None
+                        context_text_ = None
+                        completion_time = None
+                        llm_calls = None
+                    yield _types.SearchResultChunkVerbose(
+                        created=created.__int__(),
+                        model=self._chat_llm.model,
+                        system_fingerprint=chunk.system_fingerprint,
+                        choice=_types.ChunkChoice(
+                            finish_reason=chunk.choices[0].finish_reason,
+                            delta=_types.Delta(
+                                content=delta_content,
+                                refusal=chunk.choices[0].delta.refusal,
+                            ),
                         ),
-                    ),
-                    usage=usage,
-                    context_data=context_data_,
-                    context_text=context_text_,
-                    completion_time=completion_time,
-                    llm_calls=llm_calls,
-                    map_result=map_result,
-                    reduce_context_data=reduce_context_data,
-                    reduce_context_text=reduce_context_text,
-                    thinking=thinking,
-                )
+                        usage=usage,
+                        context_data=context_data_,
+                        context_text=context_text_,
+                        completion_time=completion_time,
+                        llm_calls=llm_calls,
+                        map_result=map_result,
+                        reduce_context_data=reduce_context_data,
+                        reduce_context_text=reduce_context_text,
+                        cache_usage=cache_usage,
+                        reduce_usage=reduce_usage,
+                        thinking=thinking,
+                    )
+        finally:
+            # close the upstream response if the consumer stops early
+            aclose = getattr(result, "aclose", None)
+            if aclose is not None:
+                await aclose()
 
     async def aclose(self) -> None:
         await self._chat_llm.aclose()
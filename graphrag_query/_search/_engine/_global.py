@@ -1,16 +1,19 @@
 from __future__ import annotations
 
 import asyncio
+import bisect
+import concurrent.futures
+import math
 import time
 import typing
 import warnings
 
-import jinja2
+import numpy as np
 import openai
 import tiktoken
 import typing_extensions
 
-from . import _base_engine
+from . import _base_engine, _map_cache
 from .. import (
     _context,
     _defaults,
@@ -67,6 +70,29 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
         _data_max_tokens:
             The maximum number of tokens allowed for input context during the
             map phase.
+        _map_workers:
+            The maximum number of map calls running concurrently in worker
+            threads during the map phase.
+        _map_cache:
+            Optional cache of map results, keyed by the community batch, the
+            normalized query, the map prompt and the model.
+        _community_prefilter:
+            Whether community batches unrelated to the query, judged by the
+            embeddings of their report summaries, are skipped in the map phase.
+        _reduce_fan_in:
+            If set, the key points that do not fit `_data_max_tokens` are
+            condensed in a tree of intermediate reduce calls, each taking at
+            most this many key points.
+        _reduce_concurrency:
+            The maximum number of intermediate reduce calls in flight per tree
+            level, 16 by default.
+        _intermediate_reduce_sys_prompt:
+            The prompt of the intermediate reduce calls. Must include the
+            placeholder '{{ report_data }}' and ask for key points formatted
+            like the map responses.
+        _map_parse_stats:
+            Counters of how the map responses were parsed: how often they
+            needed extracting or repairing, and the parse time.
     """
     _chat_llm: _llm.BaseChatLLM
     _embedding: _llm.BaseEmbedding
@@ -80,12 +106,31 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
     _no_data_answer: str
     _json_mode: bool
     _data_max_tokens: int
+    _map_workers: int
+    _map_cache: typing.Optional[_utils.BaseCache[_types.SearchResult]]
+    _community_prefilter: bool
+    _reduce_fan_in: typing.Optional[int]
+    _reduce_concurrency: int
+    _intermediate_reduce_sys_prompt: str
+    _map_parse_stats: _utils.JSONParseStats
 
     @typing_extensions.override
     @property
     def context_builder(self) -> _context.GlobalContextBuilder:
         return self._context_builder
 
+    @property
+    def map_cache(self) -> typing.Optional[_utils.BaseCache[_types.SearchResult]]:
+        return self._map_cache
+
+    @property
+    def map_cache_stats(self) -> typing.Optional[_utils.CacheStats]:
+        return self._map_cache.stats if self._map_cache is not None else None
+
+    @property
+    def map_parse_stats(self) -> _utils.JSONParseStats:
+        return self._map_parse_stats
+
     @typing_extensions.override
     @property
     def chat_llm(self) -> _llm.BaseChatLLM:
@@ -115,6 +160,13 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
         json_mode: typing.Optional[bool] = None,
         max_data_tokens: typing.Optional[int] = None,
         encoding_model: typing.Optional[str] = None,
+        warm_up_context: typing.Optional[bool] = None,
+        map_workers: typing.Optional[int] = None,
+        map_cache: typing.Optional[_utils.BaseCache[_types.SearchResult]] = None,
+        community_prefilter: typing.Optional[bool] = None,
+        reduce_fan_in: typing.Optional[int] = None,
+        reduce_concurrency: typing.Optional[int] = None,
+        intermediate_reduce_sys_prompt: typing.Optional[str] = None,
 
         logger: typing.Optional[_base_engine.Logger] = None,
         **kwargs: typing.Any,
@@ -123,6 +175,8 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
             logger.debug(f"Creating GlobalSearchEngine with context_loader: {context_loader}")
         if not context_builder and not context_loader:
             raise ValueError("Either context_builder or context_loader must be provided")
+        if reduce_fan_in is not None and reduce_fan_in < 2:
+            raise ValueError("reduce_fan_in must be at least 2")
 
         if context_loader:
             context_builder = context_loader.to_context_builder(
@@ -134,6 +188,14 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
         if logger:
             logger.debug(f"Created GlobalSearchEngine with context_builder: {context_builder}")
         context_builder = typing.cast(_context.GlobalContextBuilder, context_builder)
+        if warm_up_context:
+            if logger:
+                logger.debug("Warming up the community context cache")
+            context_builder.warm_up(**kwargs)
+        if community_prefilter:
+            if logger:
+                logger.debug("Building the community report index")
+            context_builder.build_report_index(embedding)
         super().__init__(
             chat_llm=chat_llm,
             embedding=embedding,
@@ -161,6 +223,16 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
         self._no_data_answer = no_data_answer or _defaults.GLOBAL_SEARCH__REDUCE__NO_DATA_ANSWER
         self._json_mode = json_mode if json_mode is not None else True
         self._data_max_tokens = max_data_tokens or _defaults.DEFAULT__GLOBAL_SEARCH__DATA_MAX_TOKENS
+        self._map_workers = map_workers or _defaults.DEFAULT__GLOBAL_SEARCH__MAP_WORKERS
+        self._map_cache = map_cache
+        self._community_prefilter = bool(community_prefilter)
+        self._reduce_fan_in = reduce_fan_in
+        self._reduce_concurrency = reduce_concurrency or _defaults.DEFAULT__GLOBAL_SEARCH__REDUCE_CONCURRENCY
+        self._intermediate_reduce_sys_prompt = (intermediate_reduce_sys_prompt or
+                                                _defaults.GLOBAL_SEARCH__REDUCE__INTERMEDIATE_SYS_PROMPT)
+        for prompt in (self._map_sys_prompt, self._reduce_sys_prompt, self._intermediate_reduce_sys_prompt):
+            _utils.get_prompt_template(prompt)
+        self._map_parse_stats = _utils.JSONParseStats()
 
     @typing_extensions.override
     def search(
@@ -231,20 +303,21 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
         elif isinstance(conversation_history, list):
             conversation_history = _context.ConversationHistory.from_list(conversation_history)
 
+        if self._community_prefilter:
+            kwargs["query_embedding"] = self._embedding.embed(query)
         context_chunks, context_records = self._context_builder.build_context(
             conversation_history=conversation_history,
             **kwargs,
         )
-        # TODO: Parallelize the map phase
-        map_result = [self._map(
+        map_result = self._map_batches(
+            context_chunks=context_chunks,
             query=query,
-            context=context,
             verbose=verbose,
             map_sys_prompt=map_sys_prompt,
             chat_llm=chat_llm,
             json_mode=self._json_mode,
             **kwargs
-        ) for context in context_chunks]
+        )
         return self._reduce(
             map_results=map_result,
             query=query,
@@ -256,6 +329,157 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
             **kwargs
         )
 
+    def evaluate_prefilter(
+        self,
+        query: str,
+        *,
+        conversation_history: _types.ConversationHistory_T = None,
+        chat_llm: _llm.BaseChatLLM = None,
+        **kwargs: typing.Any,
+    ) -> typing.Dict[str, float]:
+        """
+        Measures what the community pre-filter saves and how much it changes
+        the answer to a sample query.
+
+        The map phase runs once over every community batch; the pre-filtered
+        search is the subset of those map results from the batches the filter
+        keeps. Both sets are then reduced, and the two answers are compared by
+        the cosine similarity of their embeddings.
+
+        Args:
+            query: A sample query.
+            conversation_history:
+                The conversation history, which can be passed in as a list
+                or a ConversationHistory object.
+            chat_llm:
+                A temporary chat language model to override the default chat
+                language model.
+            **kwargs: The same keyword arguments as for `search`.
+
+        Returns:
+            A dict with the number of map calls with and without the filter,
+            the fraction of map calls saved, the fractions of the positive-score
+            key points and of their total score that the filter keeps, and the
+            similarity of the two answers.
+        """
+        chat_llm = chat_llm or self._chat_llm
+        if self._context_builder.report_index is None:
+            self._context_builder.build_report_index(self._embedding)
+        if conversation_history is None:
+            conversation_history = _context.ConversationHistory()
+        elif isinstance(conversation_history, list):
+            conversation_history = _context.ConversationHistory.from_list(conversation_history)
+        kwargs.pop("query_embedding", None)
+
+        context_chunks, _ = self._context_builder.build_context(conversation_history=conversation_history, **kwargs)
+        kept_chunks, _ = self._context_builder.build_context(
+            conversation_history=conversation_history, query_embedding=self._embedding.embed(query), **kwargs
+        )
+        kept_set = set(kept_chunks)
+        kept = [index for index, context in enumerate(context_chunks) if context in kept_set]
+
+        map_results = self._map_batches(
+            context_chunks=context_chunks,
+            query=query,
+            verbose=False,
+            chat_llm=chat_llm,
+            json_mode=self._json_mode,
+            **kwargs
+        )
+        kept_results = [map_results[index] for index in kept]
+
+        answers = [
+            typing.cast(_types.SearchResult, self._reduce(
+                map_results=results, query=query, verbose=False, stream=False, chat_llm=chat_llm, **kwargs
+            )).choice.message.content or ""
+            for results in (map_results, kept_results)
+        ]
+        vectors = [self._embedding.embed(str(answer)) for answer in answers]
+        return _prefilter_metrics(map_results=map_results, kept=kept, answer_vectors=vectors)
+
+    def _map_batches(
+        self,
+        *,
+        context_chunks: typing.List[str],
+        query: str,
+        verbose: bool,
+        chat_llm: _llm.BaseChatLLM,
+        **kwargs: typing.Any
+    ) -> typing.List[_types.SearchResult_T]:
+        """
+        Runs the map phase over all community batches, with at most
+        `self._map_workers` map calls in flight at a time.
+
+        A failing map call only fails its own batch, which then contributes no
+        key points to the reduce phase. If every batch fails, the first error
+        is raised.
+
+        Args:
+            context_chunks: The context data of each community batch.
+            query: The query string for the search.
+            verbose:
+                If True, returns detailed SearchResultVerbose objects,
+                otherwise returns basic SearchResult objects.
+            chat_llm: The chat language model used for the map calls.
+            **kwargs: Additional keyword arguments passed to `self._map`.
+
+        Returns:
+            The map results, in the same order as `context_chunks`.
+        """
+        if len(context_chunks) == 0:
+            return []
+
+        workers = min(self._map_workers, len(context_chunks))
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="graphrag-map")
+        try:
+            futures = [
+                executor.submit(
+                    self._map, query=query, context=context, verbose=verbose, chat_llm=chat_llm, **kwargs
+                ) for context in context_chunks
+            ]
+            concurrent.futures.wait(futures)
+        finally:
+            # on an interrupt (e.g. Ctrl-C), map calls not started yet are dropped
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        map_results: typing.List[_types.SearchResult_T] = []
+        errors: typing.List[BaseException] = []
+        for idx, (context, future) in enumerate(zip(context_chunks, futures)):
+            error = future.exception()
+            if error is None:
+                map_results.append(future.result())
+                continue
+            errors.append(error)
+            if self._logger:
+                self._logger.warning(f"Map call for batch {idx} failed: {error!r}")
+            map_results.append(self._failed_map(context=context, verbose=verbose, chat_llm=chat_llm))
+
+        if len(errors) == len(futures):
+            raise errors[0]
+        return map_results
+
+    @staticmethod
+    def _failed_map(*, context: str, verbose: bool, chat_llm: _llm.BaseChatLLM) -> _types.SearchResult_T:
+        """
+        Builds the placeholder map result of a batch whose map call failed.
+        """
+        created = time.time()
+        choice = _types.Choice(
+            finish_reason="error",
+            message=_types.Message(content=[{"answer": "", "score": 0}]),
+        )
+        if verbose:
+            return _types.SearchResultVerbose(
+                created=created.__int__(),
+                model=chat_llm.model,
+                choice=choice,
+                context_data=None,
+                context_text=context,
+                completion_time=0.0,
+                llm_calls=1,
+            )
+        return _types.SearchResult(created=created.__int__(), model=chat_llm.model, choice=choice)
+
     def _map(
         self,
         *,
@@ -302,7 +526,24 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
         if self._logger:
             self._logger.info(f"Starting map for query: {query} at {created}")
 
-        prompt = jinja2.Template(map_sys_prompt or self._map_sys_prompt).render(context_data=context, query=query)
+        chat_kwargs = _utils.filter_kwargs(chat_llm.chat, kwargs, prefix='map__')
+        cache_key: typing.Optional[str] = None
+        if self._map_cache is not None:
+            cache_key = _map_cache.make_map_cache_key(
+                model=chat_llm.model,
+                query=query,
+                prompt=map_sys_prompt or self._map_sys_prompt,
+                context=context,
+                json_mode=json_mode,
+                options=chat_kwargs,
+            )
+            cached = self._map_cache.get(cache_key)
+            if cached is not None:
+                if self._logger:
+                    self._logger.debug("Map result found in the map cache")
+                return _map_cache.from_cached_map_result(cached, context=context, verbose=verbose, created=created)
+
+        prompt = _utils.get_prompt_template(map_sys_prompt or self._map_sys_prompt).render(context_data=context, query=query)
         msg = [{"role": "system", "content": prompt}, {"role": "user", "content": query}]
         if self._logger:
             self._logger.debug(f"Constructed messages: {msg}")
@@ -312,19 +553,16 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
                 msg=typing.cast(_llm.MessageParam_T, msg),
                 stream=False,
                 response_format={"type": "json_object"} if json_mode else openai.NOT_GIVEN,
-                **_utils.filter_kwargs(chat_llm.chat, kwargs, prefix='map__')
+                **chat_kwargs
             )
         )
-        result = self._parse_map(response)
+        result = self._parse_map(response, stats=self._map_parse_stats)
 
-        usage = _types.Usage(
-            completion_tokens=response.usage.completion_tokens,
-            prompt_tokens=response.usage.prompt_tokens,
-            total_tokens=response.usage.total_tokens,
-        ) if response.usage else None
+        usage = _usage(response)
 
+        map_result: _types.SearchResult_T
         if verbose:
-            return _types.SearchResultVerbose(
+            map_result = _types.SearchResultVerbose(
                 created=created.__int__(),
                 model=chat_llm.model,
                 system_fingerprint=response.system_fingerprint,
@@ -340,9 +578,10 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
                 context_text=context,
                 completion_time=time.time() - created,
                 llm_calls=1,
+                cache_usage=_types.CacheUsage(misses=1) if cache_key is not None else None,
             )
         else:
-            return _types.SearchResult(
+            map_result = _types.SearchResult(
                 created=created.__int__(),
                 model=chat_llm.model,
                 system_fingerprint=response.system_fingerprint,
@@ -356,13 +595,21 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
                 usage=usage,
             )
 
+        # truncated or filtered responses are not cached, the next query retries them
+        if self._map_cache is not None and cache_key is not None and response.choices[0].finish_reason == "stop":
+            self._map_cache.set(cache_key, _map_cache.to_cached_map_result(map_result))
+        return map_result
+
     @staticmethod
-    def _parse_map(response: _llm.ChatResponse_T) -> typing.List[typing.Dict[str, typing.Any]]:
+    def _parse_map(
+        response: _llm.ChatResponse_T,
+        stats: typing.Optional[_utils.JSONParseStats] = None,
+    ) -> typing.List[typing.Dict[str, typing.Any]]:
         """
         Converts the response from the map phase into a list of key points.
         """
         default = [{"answer": "", "score": 0}]
-        json_ = _utils.deserialize_json(response.choices[0].message.content or "")
+        json_ = _utils.deserialize_json(response.choices[0].message.content or "", stats=stats)
         if json_ == {}:
             return default
 
@@ -376,6 +623,144 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
             if isinstance(point, dict) and "description" in point and "score" in point
         ]
 
+    @staticmethod
+    def _format_key_point(analyst: int, key_point: typing.Dict[str, typing.Any]) -> str:
+        """
+        Formats a key point the way it is passed to the reduce phase.
+        """
+        return '\n'.join(
+            [f'----Analyst {analyst + 1}----', f'Importance score: {key_point["score"]}', key_point["answer"]]
+        )
+
+    def _tree_reduce(
+        self,
+        *,
+        key_points: typing.List[typing.Dict[str, typing.Any]],
+        query: str,
+        chat_llm: _llm.BaseChatLLM,
+        **kwargs: typing.Any
+    ) -> typing.Tuple[typing.List[typing.Dict[str, typing.Any]], _types.ReduceUsage]:
+        """
+        Condenses the key points level by level until they fit
+        `self._data_max_tokens`.
+
+        The ranked key points are packed into groups of at most
+        `self._reduce_fan_in` points that fit `self._data_max_tokens`. Each
+        group is condensed into fewer key points by an intermediate reduce
+        call, with at most `self._reduce_concurrency` calls in flight, and the
+        condensed points form the next level. The number of levels, and so the
+        latency, grows logarithmically with the number of key points.
+
+        A group whose call fails keeps its key points. Condensing stops when a
+        level no longer shrinks the key points, which the final reduce then
+        truncates as usual.
+
+        Args:
+            key_points: The positive-score key points, ranked by score.
+            query: The query string for the search.
+            chat_llm: The chat language model used for the reduce calls.
+            **kwargs: Additional keyword arguments passed to `self._reduce_group`.
+
+        Returns:
+            The condensed key points, ranked by score, and the calls and token
+            usage of the intermediate reduce calls.
+        """
+        usage = _types.ReduceUsage()
+        previous_tokens: typing.Optional[int] = None
+        while True:
+            tokens = [
+                _utils.num_tokens(self._format_key_point(kp["analyst"], kp), self._token_encoder)
+                for kp in key_points
+            ]
+            total_tokens = sum(tokens)
+            # done once the points fit, or when the last level did not shrink them
+            if total_tokens <= self._data_max_tokens or total_tokens >= (previous_tokens or total_tokens + 1):
+                return key_points, usage
+            groups = _group_key_points(tokens, self._reduce_fan_in or 2, self._data_max_tokens)
+            if len(groups) == len(key_points):
+                return key_points, usage
+
+            usage.levels += 1
+            usage.llm_calls += len(groups)
+            level = usage.levels
+            if self._logger:
+                self._logger.info(
+                    f"Reduce level {level}: condensing {len(key_points)} key points ({total_tokens} tokens) "
+                    f"in {len(groups)} groups"
+                )
+            executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(self._reduce_concurrency, len(groups)), thread_name_prefix="graphrag-reduce"
+            )
+            try:
+                futures = [
+                    executor.submit(
+                        self._reduce_group,
+                        key_points=[key_points[idx] for idx in group],
+                        query=query,
+                        chat_llm=chat_llm,
+                        **kwargs
+                    ) for group in groups
+                ]
+                concurrent.futures.wait(futures)
+            finally:
+                # on an interrupt (e.g. Ctrl-C), reduce calls not started yet are dropped
+                executor.shutdown(wait=False, cancel_futures=True)
+
+            condensed: typing.List[typing.Dict[str, typing.Any]] = []
+            for analyst, (group, future) in enumerate(zip(groups, futures)):
+                error = future.exception()
+                if error is not None:
+                    if self._logger:
+                        self._logger.warning(f"Reduce call for group {analyst} at level {level} failed: {error!r}")
+                    usage.failed_calls += 1
+                    points = [key_points[idx] for idx in group]
+                else:
+                    points, call_usage = future.result()
+                    usage.add(call_usage)
+                condensed.extend(
+                    {"analyst": analyst, "answer": point["answer"], "score": point["score"]}
+                    for point in points
+                    if isinstance(point["score"], (int, float)) and point["score"] > 0
+                )
+            previous_tokens = total_tokens
+            key_points = sorted(condensed, key=lambda kp: kp["score"], reverse=True)
+
+    def _reduce_group(
+        self,
+        *,
+        key_points: typing.List[typing.Dict[str, typing.Any]],
+        query: str,
+        chat_llm: _llm.BaseChatLLM,
+        **kwargs: typing.Any
+    ) -> typing.Tuple[typing.List[typing.Dict[str, typing.Any]], typing.Optional[_types.Usage]]:
+        """
+        Condenses a group of key points into fewer key points with one
+        intermediate reduce call.
+
+        Args:
+            key_points: The key points of the group, ranked by score.
+            query: The query string for the search.
+            chat_llm: The chat language model used for the call.
+            **kwargs:
+                Additional keyword arguments. Should be prefixed with 'reduce__'
+                for `ChatLLM.chat` method.
+
+        Returns:
+            The condensed key points and the token usage of the call.
+        """
+        report_data = '\n\n'.join(self._format_key_point(kp["analyst"], kp) for kp in key_points)
+        prompt = _utils.get_prompt_template(self._intermediate_reduce_sys_prompt).render(report_data=report_data)
+        msg = [{"role": "system", "content": prompt}, {"role": "user", "content": query}]
+        response = typing.cast(
+            _llm.ChatResponse_T, chat_llm.chat(
+                msg=typing.cast(_llm.MessageParam_T, msg),
+                stream=False,
+                response_format={"type": "json_object"} if self._json_mode else openai.NOT_GIVEN,
+                **_utils.filter_kwargs(chat_llm.chat, kwargs, prefix='reduce__')
+            )
+        )
+        return self._parse_map(response), _usage(response)
+
     def _reduce(
         self,
         *,
@@ -474,6 +859,7 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
                 ),
                 completion_time=time.time() - created,
                 llm_calls=0,
+                cache_usage=_map_cache.total_cache_usage(map_results),
             )
 
         key_points = sorted(
@@ -484,12 +870,16 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
         if self._logger:
             self._logger.info(f"Key points found: {key_points}")
 
+        reduce_usage: typing.Optional[_types.ReduceUsage] = None
+        if self._reduce_fan_in:
+            key_points, reduce_usage = self._tree_reduce(
+                key_points=key_points, query=query, chat_llm=chat_llm, **kwargs
+            )
+
         data: typing.List[str] = []
         total_tokens = 0
         for kp in key_points:
-            formatted_response = '\n'.join(
-                [f'----Analyst {kp["analyst"] + 1}----', f'Importance score: {kp["score"]}', kp["answer"]]
-            )
+            formatted_response = self._format_key_point(kp["analyst"], kp)
             total_tokens += _utils.num_tokens(formatted_response, self._token_encoder)
             if total_tokens > self._data_max_tokens:
                 warnings.warn("Data exceeds maximum token limit", _errors.GraphRAGWarning)
@@ -497,7 +887,7 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
             data.append(formatted_response)
 
         report_data = '\n\n'.join(data)
-        prompt = jinja2.Template(reduce_sys_prompt or self._reduce_sys_prompt).render(report_data=report_data)
+        prompt = _utils.get_prompt_template(reduce_sys_prompt or self._reduce_sys_prompt).render(report_data=report_data)
         if self._allow_general_knowledge:
             prompt += f'\n{general_knowledge_sys_prompt or self._general_knowledge_sys_prompt}'
         msg = [{"role": "system", "content": prompt}, {"role": "user", "content": query}]
@@ -521,6 +911,8 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
                 map_result=map_results,
                 reduce_context_data=None,
                 reduce_context_text=report_data,
+                cache_usage=_map_cache.total_cache_usage(map_results),
+                reduce_usage=reduce_usage,
             )
         else:
             result = typing.cast(_llm.ChatResponse_T, result)
@@ -533,6 +925,8 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
                 map_result=map_results,
                 reduce_context_data=None,
                 reduce_context_text=report_data,
+                cache_usage=_map_cache.total_cache_usage(map_results),
+                reduce_usage=reduce_usage,
             )
 
     @typing_extensions.override
@@ -552,7 +946,12 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
             f"{'...' if len(self._general_knowledge_sys_prompt) > 50 else ''}, \n"
             f"\tno_data_answer={self._no_data_answer.__repr__()}, \n"
             f"\tjson_mode={self._json_mode}, \n"
-            f"\tdata_max_tokens={self._data_max_tokens} \n"
+            f"\tdata_max_tokens={self._data_max_tokens}, \n"
+            f"\tmap_workers={self._map_workers}, \n"
+            f"\tmap_cache={self._map_cache}, \n"
+            f"\tcommunity_prefilter={self._community_prefilter}, \n"
+            f"\treduce_fan_in={self._reduce_fan_in}, \n"
+            f"\treduce_concurrency={self._reduce_concurrency} \n"
             f")"
         )
 
@@ -561,6 +960,54 @@ class GlobalSearchEngine(_base_engine.QueryEngine):
         return self.__str__()
 
 
+def _usage(response: _llm.ChatResponse_T) -> typing.Optional[_types.Usage]:
+    return _types.Usage(
+        completion_tokens=response.usage.completion_tokens,
+        prompt_tokens=response.usage.prompt_tokens,
+        total_tokens=response.usage.total_tokens,
+    ) if response.usage else None
+
+
+def _prefilter_metrics(
+    *,
+    map_results: typing.List[_types.SearchResult_T],
+    kept: typing.List[int],
+    answer_vectors: typing.Sequence[typing.Sequence[float]],
+) -> typing.Dict[str, float]:
+    """
+    Summarizes a community pre-filter evaluation.
+
+    Args:
+        map_results: The map results of every community batch.
+        kept: The positions of the batches the pre-filter keeps.
+        answer_vectors:
+            The embeddings of the answers reduced from all map results and
+            from the kept ones.
+
+    Returns:
+        See `GlobalSearchEngine.evaluate_prefilter`.
+    """
+    def _scores(results: typing.List[_types.SearchResult_T]) -> typing.List[float]:
+        return [
+            point["score"]
+            for result in results if isinstance(result.choice.message.content, list)
+            for point in result.choice.message.content
+            if isinstance(point, dict) and isinstance(point.get("score"), (int, float)) and point["score"] > 0
+        ]
+
+    all_scores, kept_scores = _scores(map_results), _scores([map_results[index] for index in kept])
+    vectors = [np.asarray(vector, dtype=np.float64) for vector in answer_vectors]
+    norms = float(np.linalg.norm(vectors[0]) * np.linalg.norm(vectors[1]))
+    return {
+        "map_calls":             float(len(map_results)),
+        "prefiltered_map_calls": float(len(kept)),
+        "map_calls_saved":       1 - len(kept) / len(map_results) if map_results else 0.0,
+        "key_point_recall":      len(kept_scores) / len(all_scores) if all_scores else 1.0,
+        "score_recall":          sum(kept_scores) / sum(all_scores) if all_scores else 1.0,
+        "answer_similarity":     float(vectors[0] @ vectors[1]) / norms if norms else 0.0,
+    }
+
+
 class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
     """
     AsyncGlobalSearchEngine implements the AsyncQueryEngine and is responsible
@@ -606,6 +1053,32 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
         _data_max_tokens:
             The maximum number of tokens allowed for input context during the
             map phase.
+        _map_deadline:
+            If set, the number of seconds after which the reduce phase starts
+            with the map results received so far.
+        _map_quorum:
+            If set, the fraction of community batches whose successful map
+            results are enough to start the reduce phase.
+        _map_cache:
+            Optional cache of map results, keyed by the community batch, the
+            normalized query, the map prompt and the model.
+        _community_prefilter:
+            Whether community batches unrelated to the query, judged by the
+            embeddings of their report summaries, are skipped in the map phase.
+        _reduce_fan_in:
+            If set, the key points that do not fit `_data_max_tokens` are
+            condensed in a tree of intermediate reduce calls, each taking at
+            most this many key points.
+        _reduce_concurrency:
+            The maximum number of intermediate reduce calls in flight per tree
+            level, 16 by default.
+        _intermediate_reduce_sys_prompt:
+            The prompt of the intermediate reduce calls. Must include the
+            placeholder '{{ report_data }}' and ask for key points formatted
+            like the map responses.
+        _map_parse_stats:
+            Counters of how the map responses were parsed: how often they
+            needed extracting or repairing, and the parse time.
     """
     _chat_llm: _llm.BaseAsyncChatLLM
     _embedding: _llm.BaseEmbedding
@@ -620,12 +1093,32 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
     _json_mode: bool
     _data_max_tokens: int
     _semaphore: asyncio.Semaphore
+    _map_deadline: typing.Optional[float]
+    _map_quorum: typing.Optional[float]
+    _map_cache: typing.Optional[_utils.BaseCache[_types.SearchResult]]
+    _community_prefilter: bool
+    _reduce_fan_in: typing.Optional[int]
+    _reduce_concurrency: int
+    _intermediate_reduce_sys_prompt: str
+    _map_parse_stats: _utils.JSONParseStats
 
     @typing_extensions.override
     @property
     def context_builder(self) -> _context.GlobalContextBuilder:
         return self._context_builder
 
+    @property
+    def map_cache(self) -> typing.Optional[_utils.BaseCache[_types.SearchResult]]:
+        return self._map_cache
+
+    @property
+    def map_cache_stats(self) -> typing.Optional[_utils.CacheStats]:
+        return self._map_cache.stats if self._map_cache is not None else None
+
+    @property
+    def map_parse_stats(self) -> _utils.JSONParseStats:
+        return self._map_parse_stats
+
     @typing_extensions.override
     @property
     def chat_llm(self) -> _llm.BaseAsyncChatLLM:
@@ -656,6 +1149,14 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
         max_data_tokens: typing.Optional[int] = None,
         encoding_model: typing.Optional[str] = None,
         concurrent_coroutines: typing.Optional[int] = None,
+        warm_up_context: typing.Optional[bool] = None,
+        map_deadline: typing.Optional[float] = None,
+        map_quorum: typing.Optional[float] = None,
+        map_cache: typing.Optional[_utils.BaseCache[_types.SearchResult]] = None,
+        community_prefilter: typing.Optional[bool] = None,
+        reduce_fan_in: typing.Optional[int] = None,
+        reduce_concurrency: typing.Optional[int] = None,
+        intermediate_reduce_sys_prompt: typing.Optional[str] = None,
 
         logger: typing.Optional[_base_engine.Logger] = None,
         **kwargs: typing.Any,
@@ -664,6 +1165,12 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
             logger.debug(f"Creating AsyncGlobalSearchEngine with context_loader: {context_loader}")
         if not context_builder and not context_loader:
             raise ValueError("Either context_builder or context_loader must be provided")
+        if map_deadline is not None and map_deadline <= 0:
+            raise ValueError("map_deadline must be positive")
+        if map_quorum is not None and not 0 < map_quorum <= 1:
+            raise ValueError("map_quorum must be in (0, 1]")
+        if reduce_fan_in is not None and reduce_fan_in < 2:
+            raise ValueError("reduce_fan_in must be at least 2")
 
         if context_loader:
             context_builder = context_loader.to_context_builder(
@@ -675,6 +1182,14 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
         if logger:
             logger.debug(f"Created AsyncGlobalSearchEngine with context_builder: {context_builder}")
         context_builder = typing.cast(_context.GlobalContextBuilder, context_builder)
+        if warm_up_context:
+            if logger:
+                logger.debug("Warming up the community context cache")
+            context_builder.warm_up(**kwargs)
+        if community_prefilter:
+            if logger:
+                logger.debug("Building the community report index")
+            context_builder.build_report_index(embedding)
         super().__init__(
             chat_llm=chat_llm,
             embedding=embedding,
@@ -692,6 +1207,17 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
         self._token_encoder = tiktoken.get_encoding(encoding_model or _defaults.DEFAULT__ENCODING_MODEL)
         self._logger = logger
         self._semaphore = asyncio.Semaphore(concurrent_coroutines or _defaults.DEFAULT__CONCURRENT_COROUTINES)
+        self._map_deadline = map_deadline
+        self._map_quorum = map_quorum
+        self._map_cache = map_cache
+        self._community_prefilter = bool(community_prefilter)
+        self._reduce_fan_in = reduce_fan_in
+        self._reduce_concurrency = reduce_concurrency or _defaults.DEFAULT__GLOBAL_SEARCH__REDUCE_CONCURRENCY
+        self._intermediate_reduce_sys_prompt = (intermediate_reduce_sys_prompt or
+                                                _defaults.GLOBAL_SEARCH__REDUCE__INTERMEDIATE_SYS_PROMPT)
+        for prompt in (self._map_sys_prompt, self._reduce_sys_prompt, self._intermediate_reduce_sys_prompt):
+            _utils.get_prompt_template(prompt)
+        self._map_parse_stats = _utils.JSONParseStats()
 
     @typing_extensions.override
     async def asearch(
@@ -717,6 +1243,14 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
         2. Reduce phase: The individual community answers are aggregated into a
                          global answer.
 
+        If a map deadline or quorum is configured, the reduce phase starts as
+        soon as the deadline passes, the quorum of map results is reached or the
+        key points scoring above the median score of those received so far
+        fill `data_max_tokens`, whichever comes first. The map calls still
+        running then are cancelled, and the verbose `map_result` holds only the
+        results received, so its positions no longer match the community
+        batches.
+
         Args:
             query: The query string for the search.
             conversation_history:
@@ -752,6 +1286,7 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
             A search result object or a stream of search result chunks,
             depending on the value of `stream`.
         """
+        chat_llm = chat_llm or self._chat_llm
         created = time.time()
         self._logger.info(f"Starting search for query: {query} at {created}") if self._logger else None
 
@@ -760,21 +1295,19 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
         elif isinstance(conversation_history, list):
             conversation_history = _context.ConversationHistory.from_list(conversation_history)
 
+        if self._community_prefilter:
+            kwargs["query_embedding"] = await asyncio.to_thread(self._embedding.embed, query)
         context_chunks, context_records = self._context_builder.build_context(
             conversation_history=conversation_history,
             **kwargs,
         )
-        map_results = list(
-            await asyncio.gather(
-                *[self._map(
-                    query=query,
-                    context=context,
-                    verbose=verbose,
-                    map_sys_prompt=map_sys_prompt,
-                    chat_llm=chat_llm,
-                    **kwargs
-                ) for context in context_chunks]
-            )
+        map_results = await self._map_batches(
+            context_chunks=context_chunks,
+            query=query,
+            verbose=verbose,
+            sys_prompt=map_sys_prompt,
+            chat_llm=chat_llm,
+            **kwargs
         )
         return await self._reduce(
             map_results=map_results,
@@ -787,6 +1320,228 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
             **kwargs
         )
 
+    async def evaluate_prefilter(
+        self,
+        query: str,
+        *,
+        conversation_history: _types.ConversationHistory_T = None,
+        chat_llm: _llm.BaseAsyncChatLLM = None,
+        **kwargs: typing.Any,
+    ) -> typing.Dict[str, float]:
+        """
+        Measures what the community pre-filter saves and how much it changes
+        the answer to a sample query, asynchronously.
+
+        The map phase runs once over every community batch, regardless of the
+        map deadline and quorum; the pre-filtered search is the subset of
+        those map results from the batches the filter keeps. Both sets are
+        then reduced, and the two answers are compared by the cosine
+        similarity of their embeddings.
+
+        Args:
+            query: A sample query.
+            conversation_history:
+                The conversation history, which can be passed in as a list
+                or a ConversationHistory object.
+            chat_llm:
+                A temporary chat language model to override the default chat
+                language model.
+            **kwargs: The same keyword arguments as for `asearch`.
+
+        Returns:
+            The same metrics as `GlobalSearchEngine.evaluate_prefilter`.
+        """
+        chat_llm = chat_llm or self._chat_llm
+        if self._context_builder.report_index is None:
+            await asyncio.to_thread(self._context_builder.build_report_index, self._embedding)
+        if conversation_history is None:
+            conversation_history = _context.ConversationHistory()
+        elif isinstance(conversation_history, list):
+            conversation_history = _context.ConversationHistory.from_list(conversation_history)
+        kwargs.pop("query_embedding", None)
+
+        context_chunks, _ = self._context_builder.build_context(conversation_history=conversation_history, **kwargs)
+        kept_chunks, _ = self._context_builder.build_context(
+            conversation_history=conversation_history,
+            query_embedding=await asyncio.to_thread(self._embedding.embed, query),
+            **kwargs
+        )
+        kept_set = set(kept_chunks)
+        kept = [index for index, context in enumerate(context_chunks) if context in kept_set]
+
+        # every batch is mapped, so the results line up with `context_chunks`
+        outcomes = await asyncio.gather(*(
+            self._map(query=query, context=context, verbose=False, chat_llm=chat_llm, **kwargs)
+            for context in context_chunks
+        ), return_exceptions=True)
+        map_results = [
+            self._failed_map(context=context, verbose=False, chat_llm=chat_llm)
+            if isinstance(outcome, BaseException) else outcome
+            for context, outcome in zip(context_chunks, outcomes)
+        ]
+        kept_results = [map_results[index] for index in kept]
+
+        answers = [
+            typing.cast(_types.SearchResult, await self._reduce(
+                map_results=results, query=query, verbose=False, stream=False, chat_llm=chat_llm, **kwargs
+            )).choice.message.content or ""
+            for results in (map_results, kept_results)
+        ]
+        vectors = [await asyncio.to_thread(self._embedding.embed, str(answer)) for answer in answers]
+        return _prefilter_metrics(map_results=map_results, kept=kept, answer_vectors=vectors)
+
+    async def _map_batches(
+        self,
+        *,
+        context_chunks: typing.List[str],
+        query: str,
+        verbose: bool,
+        chat_llm: _llm.BaseAsyncChatLLM,
+        **kwargs: typing.Any
+    ) -> typing.List[_types.SearchResult_T]:
+        """
+        Runs the map phase over all community batches and collects the results
+        as they complete.
+
+        Without a map deadline or quorum, every map call is awaited. Otherwise
+        collecting stops once the deadline passes, the quorum is reached or the
+        key points scoring above the median score of those received so far
+        fill `self._data_max_tokens`, and the map calls still running are
+        cancelled. A pending batch would then have to beat the better half of
+        the received key points to change the reduce context; a flood of
+        low-score key points does not stop the map phase.
+
+        A failing map call only fails its own batch, which then contributes no
+        key points to the reduce phase. If every batch fails, the first error
+        is raised.
+
+        Args:
+            context_chunks: The context data of each community batch.
+            query: The query string for the search.
+            verbose:
+                If True, returns detailed SearchResultVerbose objects,
+                otherwise returns basic SearchResult objects.
+            chat_llm: The chat language model used for the map calls.
+            **kwargs: Additional keyword arguments passed to `self._map`.
+
+        Returns:
+            The map results received, in the same order as `context_chunks`.
+            The batches whose map calls were cancelled are left out, so the
+            positions no longer match the batch indices after an early stop.
+        """
+        if len(context_chunks) == 0:
+            return []
+
+        tasks = [
+            asyncio.ensure_future(
+                self._map(query=query, context=context, verbose=verbose, chat_llm=chat_llm, **kwargs)
+            ) for context in context_chunks
+        ]
+        positions = {task: idx for idx, task in enumerate(tasks)}
+        map_results: typing.Dict[int, _types.SearchResult_T] = {}
+        errors: typing.List[BaseException] = []
+
+        early_reduce = self._map_deadline is not None or self._map_quorum is not None
+        quorum = math.ceil(self._map_quorum * len(tasks)) if self._map_quorum is not None else len(tasks)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._map_deadline if self._map_deadline is not None else None
+        # (score, tokens) of the positive-score key points received, ascending
+        ranked_points: typing.List[typing.Tuple[float, int]] = []
+
+        pending: typing.Set[asyncio.Future[_types.SearchResult_T]] = set(tasks)
+        try:
+            while pending:
+                timeout = max(deadline - loop.time(), 0) if deadline is not None else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if self._logger:
+                        self._logger.info(f"Map deadline reached with {len(pending)} map calls pending")
+                    break
+
+                for task in done:
+                    idx = positions[task]
+                    error = task.exception()
+                    if error is not None:
+                        errors.append(error)
+                        if self._logger:
+                            self._logger.warning(f"Map call for batch {idx} failed: {error!r}")
+                        map_results[idx] = self._failed_map(
+                            context=context_chunks[idx], verbose=verbose, chat_llm=chat_llm
+                        )
+                        continue
+                    map_results[idx] = task.result()
+                    if early_reduce:
+                        for point in self._key_points(map_results[idx]):
+                            bisect.insort(ranked_points, (
+                                point["score"],
+                                _utils.num_tokens(self._format_key_point(idx, point), self._token_encoder),
+                            ))
+
+                if not early_reduce or not pending:
+                    continue
+                if len(map_results) - len(errors) >= quorum:
+                    if self._logger:
+                        self._logger.info(f"Map quorum reached with {len(pending)} map calls pending")
+                    break
+                if _upper_half_tokens(ranked_points) >= self._data_max_tokens:
+                    if self._logger:
+                        self._logger.info(f"Map key points fill the context with {len(pending)} map calls pending")
+                    break
+        finally:
+            # late map results are dropped
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        if len(errors) == len(tasks):
+            raise errors[0]
+        return [map_results[idx] for idx in sorted(map_results)]
+
+    @staticmethod
+    def _failed_map(*, context: str, verbose: bool, chat_llm: _llm.BaseAsyncChatLLM) -> _types.SearchResult_T:
+        """
+        Builds the placeholder map result of a batch whose map call failed.
+        """
+        created = time.time()
+        choice = _types.Choice(
+            finish_reason="error",
+            message=_types.Message(content=[{"answer": "", "score": 0}]),
+        )
+        if verbose:
+            return _types.SearchResultVerbose(
+                created=created.__int__(),
+                model=chat_llm.model,
+                choice=choice,
+                context_data=None,
+                context_text=context,
+                completion_time=0.0,
+                llm_calls=1,
+            )
+        return _types.SearchResult(created=created.__int__(), model=chat_llm.model, choice=choice)
+
+    @staticmethod
+    def _key_points(map_result: _types.SearchResult_T) -> typing.List[typing.Dict[str, typing.Any]]:
+        """
+        Extracts the key points with a positive score from a map result.
+        """
+        if not isinstance(map_result.choice.message.content, list):
+            return []
+        return [
+            ele for ele in map_result.choice.message.content
+            if isinstance(ele, dict) and "answer" in ele and "score" in ele
+            and isinstance(ele["score"], (int, float)) and ele["score"] > 0
+        ]
+
+    @staticmethod
+    def _format_key_point(analyst: int, key_point: typing.Dict[str, typing.Any]) -> str:
+        """
+        Formats a key point the way it is passed to the reduce phase.
+        """
+        return '\n'.join(
+            [f'----Analyst {analyst + 1}----', f'Importance score: {key_point["score"]}', key_point["answer"]]
+        )
+
     async def _map(
         self,
         *,
@@ -832,7 +1587,24 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
         if self._logger:
             self._logger.info(f"Starting map for query: {query} at {created}")
 
-        prompt = jinja2.Template(sys_prompt or self._map_sys_prompt).render(context_data=context, query=query)
+        chat_kwargs = _utils.filter_kwargs(chat_llm.achat, kwargs, prefix='map__')
+        cache_key: typing.Optional[str] = None
+        if self._map_cache is not None:
+            cache_key = _map_cache.make_map_cache_key(
+                model=chat_llm.model,
+                query=query,
+                prompt=sys_prompt or self._map_sys_prompt,
+                context=context,
+                json_mode=self._json_mode,
+                options=chat_kwargs,
+            )
+            cached = await self._map_cache.aget(cache_key)
+            if cached is not None:
+                if self._logger:
+                    self._logger.debug("Map result found in the map cache")
+                return _map_cache.from_cached_map_result(cached, context=context, verbose=verbose, created=created)
+
+        prompt = _utils.get_prompt_template(sys_prompt or self._map_sys_prompt).render(context_data=context, query=query)
         msg = [{"role": "system", "content": prompt}, {"role": "user", "content": query}]
 
         if self._logger:
@@ -843,19 +1615,17 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
                 _llm.ChatResponse_T, (await chat_llm.achat(
                     msg=typing.cast(_llm.MessageParam_T, msg),
                     stream=False,
-                    **_utils.filter_kwargs(chat_llm.achat, kwargs, prefix='map__')
+                    response_format={"type": "json_object"} if self._json_mode else openai.NOT_GIVEN,
+                    **chat_kwargs
                 ))
             )
-        result = self._parse_map(response)
+        result = self._parse_map(response, stats=self._map_parse_stats)
 
-        usage = _types.Usage(
-            completion_tokens=response.usage.completion_tokens,
-            prompt_tokens=response.usage.prompt_tokens,
-            total_tokens=response.usage.total_tokens,
-        ) if response.usage else None
+        usage = _usage(response)
 
+        map_result: _types.SearchResult_T
         if verbose:
-            return _types.SearchResultVerbose(
+            map_result = _types.SearchResultVerbose(
                 created=created.__int__(),
                 model=chat_llm.model,
                 system_fingerprint=response.system_fingerprint,
@@ -871,9 +1641,10 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
                 context_text=context,
                 completion_time=time.time() - created,
                 llm_calls=1,
+                cache_usage=_types.CacheUsage(misses=1) if cache_key is not None else None,
             )
         else:
-            return _types.SearchResult(
+            map_result = _types.SearchResult(
                 created=created.__int__(),
                 model=chat_llm.model,
                 system_fingerprint=response.system_fingerprint,
@@ -887,13 +1658,21 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
                 usage=usage,
             )
 
+        # truncated or filtered responses are not cached, the next query retries them
+        if self._map_cache is not None and cache_key is not None and response.choices[0].finish_reason == "stop":
+            await self._map_cache.aset(cache_key, _map_cache.to_cached_map_result(map_result))
+        return map_result
+
     @staticmethod
-    def _parse_map(response: _llm.ChatResponse_T) -> typing.List[typing.Dict[str, typing.Any]]:
+    def _parse_map(
+        response: _llm.ChatResponse_T,
+        stats: typing.Optional[_utils.JSONParseStats] = None,
+    ) -> typing.List[typing.Dict[str, typing.Any]]:
         """
         Converts the response from the map phase into a list of key points.
         """
         default = [{"answer": "", "score": 0}]
-        json_ = _utils.deserialize_json(response.choices[0].message.content or "")
+        json_ = _utils.deserialize_json(response.choices[0].message.content or "", stats=stats)
         if json_ == {}:
             return default
 
@@ -907,6 +1686,131 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
             if isinstance(point, dict) and "description" in point and "score" in point
         ]
 
+    async def _tree_reduce(
+        self,
+        *,
+        key_points: typing.List[typing.Dict[str, typing.Any]],
+        query: str,
+        chat_llm: _llm.BaseAsyncChatLLM,
+        **kwargs: typing.Any
+    ) -> typing.Tuple[typing.List[typing.Dict[str, typing.Any]], _types.ReduceUsage]:
+        """
+        Condenses the key points level by level until they fit
+        `self._data_max_tokens`.
+
+        The ranked key points are packed into groups of at most
+        `self._reduce_fan_in` points that fit `self._data_max_tokens`. Each
+        group is condensed into fewer key points by an intermediate reduce
+        call, with at most `self._reduce_concurrency` calls in flight, and the
+        condensed points form the next level. The number of levels, and so the
+        latency, grows logarithmically with the number of key points.
+
+        A group whose call fails keeps its key points. Condensing stops when a
+        level no longer shrinks the key points, which the final reduce then
+        truncates as usual.
+
+        Args:
+            key_points: The positive-score key points, ranked by score.
+            query: The query string for the search.
+            chat_llm: The chat language model used for the reduce calls.
+            **kwargs: Additional keyword arguments passed to `self._reduce_group`.
+
+        Returns:
+            The condensed key points, ranked by score, and the calls and token
+            usage of the intermediate reduce calls.
+        """
+        usage = _types.ReduceUsage()
+        previous_tokens: typing.Optional[int] = None
+        while True:
+            tokens = [
+                _utils.num_tokens(self._format_key_point(kp["analyst"], kp), self._token_encoder)
+                for kp in key_points
+            ]
+            total_tokens = sum(tokens)
+            # done once the points fit, or when the last level did not shrink them
+            if total_tokens <= self._data_max_tokens or total_tokens >= (previous_tokens or total_tokens + 1):
+                return key_points, usage
+            groups = _group_key_points(tokens, self._reduce_fan_in or 2, self._data_max_tokens)
+            if len(groups) == len(key_points):
+                return key_points, usage
+
+            usage.levels += 1
+            usage.llm_calls += len(groups)
+            level = usage.levels
+            if self._logger:
+                self._logger.info(
+                    f"Reduce level {level}: condensing {len(key_points)} key points ({total_tokens} tokens) "
+                    f"in {len(groups)} groups"
+                )
+            semaphore = asyncio.Semaphore(self._reduce_concurrency)
+
+            async def _reduce_group(
+                group: typing.List[int]
+            ) -> typing.Tuple[typing.List[typing.Dict[str, typing.Any]], typing.Optional[_types.Usage]]:
+                async with semaphore:
+                    return await self._reduce_group(
+                        key_points=[key_points[idx] for idx in group], query=query, chat_llm=chat_llm, **kwargs
+                    )
+
+            results = await asyncio.gather(*(_reduce_group(group) for group in groups), return_exceptions=True)
+
+            condensed: typing.List[typing.Dict[str, typing.Any]] = []
+            for analyst, (group, result) in enumerate(zip(groups, results)):
+                if isinstance(result, BaseException):
+                    if not isinstance(result, Exception):
+                        raise result
+                    if self._logger:
+                        self._logger.warning(f"Reduce call for group {analyst} at level {level} failed: {result!r}")
+                    usage.failed_calls += 1
+                    points = [key_points[idx] for idx in group]
+                else:
+                    points, call_usage = result
+                    usage.add(call_usage)
+                condensed.extend(
+                    {"analyst": analyst, "answer": point["answer"], "score": point["score"]}
+                    for point in points
+                    if isinstance(point["score"], (int, float)) and point["score"] > 0
+                )
+            previous_tokens = total_tokens
+            key_points = sorted(condensed, key=lambda kp: kp["score"], reverse=True)
+
+    async def _reduce_group(
+        self,
+        *,
+        key_points: typing.List[typing.Dict[str, typing.Any]],
+        query: str,
+        chat_llm: _llm.BaseAsyncChatLLM,
+        **kwargs: typing.Any
+    ) -> typing.Tuple[typing.List[typing.Dict[str, typing.Any]], typing.Optional[_types.Usage]]:
+        """
+        Condenses a group of key points into fewer key points with one
+        intermediate reduce call.
+
+        Args:
+            key_points: The key points of the group, ranked by score.
+            query: The query string for the search.
+            chat_llm: The chat language model used for the call.
+            **kwargs:
+                Additional keyword arguments. Should be prefixed with 'reduce__'
+                for `AsyncChatLLM.achat` method.
+
+        Returns:
+            The condensed key points and the token usage of the call.
+        """
+        report_data = '\n\n'.join(self._format_key_point(kp["analyst"], kp) for kp in key_points)
+        prompt = _utils.get_prompt_template(self._intermediate_reduce_sys_prompt).render(report_data=report_data)
+        msg = [{"role": "system", "content": prompt}, {"role": "user", "content": query}]
+        async with self._semaphore:
+            response = typing.cast(
+                _llm.ChatResponse_T, await chat_llm.achat(
+                    msg=typing.cast(_llm.MessageParam_T, msg),
+                    stream=False,
+                    response_format={"type": "json_object"} if self._json_mode else openai.NOT_GIVEN,
+                    **_utils.filter_kwargs(chat_llm.achat, kwargs, prefix='reduce__')
+                )
+            )
+        return self._parse_map(response), _usage(response)
+
     async def _reduce(
         self,
         *,
@@ -1005,6 +1909,7 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
                 ),
                 completion_time=time.time() - created,
                 llm_calls=0,
+                cache_usage=_map_cache.total_cache_usage(map_results),
             )
 
         key_points = sorted(
@@ -1015,12 +1920,16 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
         if self._logger:
             self._logger.info(f"Key points found: {key_points}")
 
+        reduce_usage: typing.Optional[_types.ReduceUsage] = None
+        if self._reduce_fan_in:
+            key_points, reduce_usage = await self._tree_reduce(
+                key_points=key_points, query=query, chat_llm=chat_llm, **kwargs
+            )
+
         data: typing.List[str] = []
         total_tokens = 0
         for kp in key_points:
-            formatted_response = '\n'.join(
-                [f'----Analyst {kp["analyst"] + 1}----', f'Importance score: {kp["score"]}', kp["answer"]]
-            )
+            formatted_response = self._format_key_point(kp["analyst"], kp)
             total_tokens += _utils.num_tokens(formatted_response, self._token_encoder)
             if total_tokens > self._data_max_tokens:
                 warnings.warn("Data exceeds maximum token limit", _errors.GraphRAGWarning)
@@ -1028,7 +1937,7 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
             data.append(formatted_response)
 
         report_data = '\n\n'.join(data)
-        prompt = jinja2.Template(reduce_sys_prompt or self._reduce_sys_prompt).render(report_data=report_data)
+        prompt = _utils.get_prompt_template(reduce_sys_prompt or self._reduce_sys_prompt).render(report_data=report_data)
         if self._allow_general_knowledge:
             prompt += f'\n{general_knowledge_sys_prompt or self._general_knowledge_sys_prompt}'
 
@@ -1054,6 +1963,8 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
                 map_result=map_results,
                 reduce_context_data=None,
                 reduce_context_text=report_data,
+                cache_usage=_map_cache.total_cache_usage(map_results),
+                reduce_usage=reduce_usage,
             )
         else:
             response = typing.cast(_llm.ChatResponse_T, response)
@@ -1066,6 +1977,8 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
                 map_result=map_results,
                 reduce_context_data=None,
                 reduce_context_text=report_data,
+                cache_usage=_map_cache.total_cache_usage(map_results),
+                reduce_usage=reduce_usage,
             )
 
     @typing_extensions.override
@@ -1085,10 +1998,52 @@ class AsyncGlobalSearchEngine(_base_engine.AsyncQueryEngine):
             f"{'...' if len(self._general_knowledge_sys_prompt) > 50 else ''}, \n"
             f"\tno_data_answer={self._no_data_answer.__repr__()}, \n"
             f"\tjson_mode={self._json_mode}, \n"
-            f"\tdata_max_tokens={self._data_max_tokens} \n"
+            f"\tdata_max_tokens={self._data_max_tokens}, \n"
+            f"\tmap_deadline={self._map_deadline}, \n"
+            f"\tmap_quorum={self._map_quorum}, \n"
+            f"\tmap_cache={self._map_cache}, \n"
+            f"\tcommunity_prefilter={self._community_prefilter}, \n"
+            f"\treduce_fan_in={self._reduce_fan_in}, \n"
+            f"\treduce_concurrency={self._reduce_concurrency} \n"
             f")"
         )
 
     @typing_extensions.override
     def __repr__(self) -> str:
         return self.__str__()
+
+
+def _upper_half_tokens(ranked_points: typing.List[typing.Tuple[float, int]]) -> int:
+    """
+    Sums the tokens of the key points scoring above the median score, given
+    the (score, tokens) pairs of the key points in ascending order.
+    """
+    if not ranked_points:
+        return 0
+    mid = len(ranked_points) // 2
+    median = ranked_points[mid][0] if len(ranked_points) % 2 else (
+        (ranked_points[mid - 1][0] + ranked_points[mid][0]) / 2
+    )
+    return sum(tokens for _, tokens in ranked_points[bisect.bisect_right(ranked_points, (median, math.inf)):])
+
+
+def _group_key_points(tokens: typing.List[int], fan_in: int, max_tokens: int) -> typing.List[typing.List[int]]:
+    """
+    Packs ranked key points, given their token counts, into consecutive groups
+    of at most `fan_in` points and `max_tokens` tokens.
+
+    Returns:
+        The indices of the key points of each group.
+    """
+    groups: typing.List[typing.List[int]] = []
+    group: typing.List[int] = []
+    group_tokens = 0
+    for idx, count in enumerate(tokens):
+        if group and (len(group) >= fan_in or group_tokens + count > max_tokens):
+            groups.append(group)
+            group, group_tokens = [], 0
+        group.append(idx)
+        group_tokens += count
+    if group:
+        groups.append(group)
+    return groups
@@ -5,7 +5,6 @@ import time
 import typing
 import warnings
 
-import jinja2
 import typing_extensions
 
 from . import _base_engine
@@ -15,7 +14,10 @@ from .. import (
     _llm,
     _types,
 )
-from ... import errors as _errors
+from ... import (
+    _utils,
+    errors as _errors,
+)
 
 
 class LocalSearchEngine(_base_engine.QueryEngine):
@@ -112,6 +114,7 @@ class LocalSearchEngine(_base_engine.QueryEngine):
             warnings.warn('Local Search\'s System Prompt does not contain "{context_data}"', _errors.GraphRAGWarning)
             if self._logger:
                 self._logger.warning('Local Search\'s System Prompt does not contain "{context_data}"')
+        _utils.get_prompt_template(self._sys_prompt)
 
     @typing_extensions.override
     def search(
@@ -177,7 +180,9 @@ class LocalSearchEngine(_base_engine.QueryEngine):
             conversation_history=conversation_history,
             **kwargs,
         )
-        prompt = jinja2.Template(sys_prompt or self._sys_prompt).render(context_data=context_text)
+        if self._logger and isinstance(context_records, _context.ContextRecords):
+            self._logger.debug(f"Context section timings (seconds): {context_records.timings}")
+        prompt = _utils.get_prompt_template(sys_prompt or self._sys_prompt).render(context_data=context_text)
         messages = ([{"role": "system", "content": prompt}] +
                     conversation_history.to_dict() +
                     [{"role": "user", "content": query}])
@@ -239,6 +244,10 @@ class AsyncLocalSearchEngine(_base_engine.AsyncQueryEngine):
             search process.
         _embedding:
             The embedding model used for vectorizing query and context data.
+        _async_embedding:
+            Optional asynchronous embedding model used to embed the query
+            without blocking the event loop. If omitted, `_embedding` is run in
+            a worker thread instead.
         _context_builder:
             A specialized LocalContextBuilder responsible for building context
             specific to local search.
@@ -252,6 +261,7 @@ class AsyncLocalSearchEngine(_base_engine.AsyncQueryEngine):
     """
     _chat_llm: _llm.BaseAsyncChatLLM
     _embedding: _llm.BaseEmbedding
+    _async_embedding: typing.Optional[_llm.BaseAsyncEmbedding]
     _context_builder: _context.LocalContextBuilder
     _logger: typing.Optional[_base_engine.Logger]
     _sys_prompt: str
@@ -277,6 +287,7 @@ class AsyncLocalSearchEngine(_base_engine.AsyncQueryEngine):
         *,
         chat_llm: _llm.BaseAsyncChatLLM,
         embedding: _llm.BaseEmbedding,
+        async_embedding: typing.Optional[_llm.BaseAsyncEmbedding] = None,
 
         context_loader: typing.Optional[_context.LocalContextLoader] = None,
         context_builder: typing.Optional[_context.LocalContextBuilder] = None,
@@ -299,6 +310,7 @@ class AsyncLocalSearchEngine(_base_engine.AsyncQueryEngine):
         if context_loader:
             context_builder = context_loader.to_context_builder(
                 embedder=embedding,
+                async_embedder=async_embedding,
                 community_level=community_level or _defaults.DEFAULT__LOCAL_SEARCH__COMMUNITY_LEVEL,
                 store_coll_name=store_coll_name or _defaults.DEFAULT__VECTOR_STORE__COLLECTION_NAME,
                 store_uri=store_uri or _defaults.DEFAULT__VECTOR_STORE__URI,
@@ -309,17 +321,21 @@ class AsyncLocalSearchEngine(_base_engine.AsyncQueryEngine):
         if logger:
             logger.debug(f"Created AsyncLocalSearchEngine with context_builder: {context_builder}")
         context_builder = typing.cast(_context.LocalContextBuilder, context_builder)
+        if async_embedding and context_builder.async_text_embedder is None:
+            context_builder.async_text_embedder = async_embedding
         super().__init__(
             chat_llm=chat_llm,
             embedding=embedding,
             context_builder=context_builder,
             logger=logger,
         )
+        self._async_embedding = async_embedding
         self._sys_prompt = sys_prompt or _defaults.LOCAL_SEARCH__SYS_PROMPT
         if '{context_data}' not in self._sys_prompt:
             warnings.warn('Local Search\'s System Prompt does not contain "{context_data}"', _errors.GraphRAGWarning)
             if self._logger:
                 self._logger.warning('Local Search\'s System Prompt does not contain "{context_data}"')
+        _utils.get_prompt_template(self._sys_prompt)
 
     @typing_extensions.override
     async def asearch(
@@ -364,7 +380,7 @@ class AsyncLocalSearchEngine(_base_engine.AsyncQueryEngine):
                 language model for this search.
             **kwargs:
                 Additional keyword arguments for
-                `LocalContextBuilder.build_context` or `ChatLLM.chat`. See
+                `LocalContextBuilder.abuild_context` or `ChatLLM.chat`. See
                 details in the specific method documentation and source code.
 
         Returns:
@@ -382,12 +398,14 @@ class AsyncLocalSearchEngine(_base_engine.AsyncQueryEngine):
         elif isinstance(conversation_history, list):
             conversation_history = _context.ConversationHistory.from_list(conversation_history)
 
-        context_text, context_records = self._context_builder.build_context(
+        context_text, context_records = await self._context_builder.abuild_context(
             query=query,
             conversation_history=conversation_history,
             **kwargs,
         )
-        prompt = jinja2.Template(sys_prompt or self._sys_prompt).render(context_data=context_text)
+        if self._logger and isinstance(context_records, _context.ContextRecords):
+            self._logger.debug(f"Context section timings (seconds): {context_records.timings}")
+        prompt = _utils.get_prompt_template(sys_prompt or self._sys_prompt).render(context_data=context_text)
         messages = ([{"role": "system", "content": prompt}] +
                     conversation_history.to_dict() +
                     [{"role": "user", "content": query}])
@@ -418,6 +436,12 @@ class AsyncLocalSearchEngine(_base_engine.AsyncQueryEngine):
                 context_text=context_text
             )
 
+    @typing_extensions.override
+    async def aclose(self) -> None:
+        await super().aclose()
+        if self._async_embedding:
+            await self._async_embedding.aclose()
+
     @typing_extensions.override
     def __str__(self) -> str:
         return (
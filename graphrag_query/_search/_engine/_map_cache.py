@@ -0,0 +1,170 @@
+"""
+Module for caching the map-phase responses of the GraphRAG global search.
+
+The community report batches of a global search do not depend on the query, so
+a repeated (or trivially respelled) question sends the very same map requests.
+Their parsed results are cached, keyed by the request content.
+
+Classes:
+    SQLiteMapResultCache: On-disk backend for map results.
+
+Functions:
+    make_map_cache_key: Builds the cache key of a map request.
+    to_cached_map_result: Strips a map result down to what is cached.
+    from_cached_map_result: Rebuilds a map result from a cached one.
+    total_cache_usage: Sums the cache usage of map results.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+import typing
+
+from .. import _types
+from ... import _utils
+
+
+def make_map_cache_key(
+    *,
+    model: str,
+    query: str,
+    prompt: str,
+    context: str,
+    json_mode: bool,
+    options: typing.Optional[typing.Mapping[str, typing.Any]] = None,
+) -> str:
+    """
+    Builds the cache key of a map request.
+
+    The sync and async engines build their keys here alike, so one map cache
+    can be shared by both.
+
+    Args:
+        model: The chat model identifier.
+        query: The query string; whitespace is normalized.
+        prompt: The (unrendered) map system prompt.
+        context: The context data of the community batch.
+        json_mode: Whether the request asks for a JSON object response.
+        options: Other request options that change the response, e.g. `temperature`.
+
+    Returns:
+        A hex digest identifying the request.
+    """
+    payload = "\x00".join([model, _utils.normalize_text(query), prompt, context])
+    payload += "\x00" + json.dumps({"json_mode": json_mode, **(options or {})}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteMapResultCache(_utils.SQLiteCache[_types.SearchResult]):
+    """
+    On-disk map result cache backend. Results are stored as JSON in a SQLite
+    database that can be shared by several worker processes.
+    """
+
+    def __init__(
+        self,
+        path: typing.Union[str, os.PathLike[str]],
+        *,
+        max_size: int = 100_000,
+        ttl: typing.Optional[float] = None,
+        timeout: float = 30.0,
+    ) -> None:
+        """
+        Args:
+            path: The path of the SQLite database file; created if missing.
+            max_size: The maximum number of map results kept on disk.
+            ttl: Optional number of seconds after which a map result is stale.
+            timeout:
+                How long (in seconds) a writer waits for another process
+                holding the write lock.
+        """
+        super().__init__(
+            path,
+            encode=lambda result: result.model_dump_json().encode("utf-8"),
+            decode=_types.SearchResult.model_validate_json,
+            max_size=max_size,
+            ttl=ttl,
+            timeout=timeout,
+        )
+
+
+def to_cached_map_result(result: _types.SearchResult_T) -> _types.SearchResult:
+    """
+    Strips a map result down to the fields that are cached.
+    """
+    return _types.SearchResult(
+        created=result.created,
+        model=result.model,
+        system_fingerprint=result.system_fingerprint,
+        choice=result.choice.model_copy(deep=True),
+        usage=result.usage,
+    )
+
+
+def from_cached_map_result(
+    cached: _types.SearchResult,
+    *,
+    context: str,
+    verbose: bool,
+    created: float,
+) -> _types.SearchResult_T:
+    """
+    Rebuilds the map result of a cache hit. No tokens were used, so the usage
+    is empty; the tokens of the original call are reported as saved.
+
+    Args:
+        cached: The cached map result.
+        context: The context data of the community batch.
+        verbose:
+            If True, returns a detailed SearchResultVerbose object, otherwise
+            returns a basic SearchResult object.
+        created: The timestamp when the map call was started.
+
+    Returns:
+        A SearchResult or SearchResultVerbose object, depending on the
+        verbosity setting.
+    """
+    if not verbose:
+        return _types.SearchResult(
+            created=created.__int__(),
+            model=cached.model,
+            system_fingerprint=cached.system_fingerprint,
+            choice=cached.choice.model_copy(deep=True),
+        )
+    return _types.SearchResultVerbose(
+        created=created.__int__(),
+        model=cached.model,
+        system_fingerprint=cached.system_fingerprint,
+        choice=cached.choice.model_copy(deep=True),
+        context_data=None,
+        context_text=context,
+        completion_time=time.time() - created,
+        llm_calls=0,
+        cache_usage=_types.CacheUsage(
+            hits=1,
+            saved_tokens=cached.usage.total_tokens if cached.usage else 0,
+        ),
+    )
+
+
+def total_cache_usage(map_results: typing.Iterable[_types.SearchResult_T]) -> typing.Optional[_types.CacheUsage]:
+    """
+    Sums the cache usage of (verbose) map results.
+
+    Returns:
+        The total cache usage, or None if no map result went through a cache.
+    """
+    usages = [
+        result.cache_usage for result in map_results
+        if isinstance(result, _types.SearchResultVerbose) and result.cache_usage is not None
+    ]
+    if len(usages) == 0:
+        return None
+    return _types.CacheUsage(
+        hits=sum(usage.hits for usage in usages),
+        misses=sum(usage.misses for usage in usages),
+        saved_tokens=sum(usage.saved_tokens for usage in usages),
+    )
@@ -9,7 +9,7 @@ from ... import _model
 
 def get_candidate_communities(
     selected_entities: typing.List[_model.Entity],
-    community_reports: typing.List[_model.CommunityReport],
+    community_reports: typing.Iterable[_model.CommunityReport],
     include_community_rank: bool = False,
     use_community_summary: bool = False,
 ) -> pd.DataFrame:
@@ -17,9 +17,9 @@ def get_candidate_communities(
     selected_community_ids_ = [
         entity.community_ids for entity in selected_entities if entity.community_ids
     ]
-    selected_community_ids = [
+    selected_community_ids = {
         item for sublist in selected_community_ids_ for item in sublist
-    ]
+    }
     selected_reports = [
         community
         for community in community_reports if community.id in selected_community_ids
@@ -9,10 +9,10 @@ from ... import _model
 
 def get_candidate_covariates(
     selected_entities: typing.List[_model.Entity],
-    covariates: typing.List[_model.Covariate],
+    covariates: typing.Iterable[_model.Covariate],
 ) -> typing.List[_model.Covariate]:
     """Get all covariates that are related to selected entities."""
-    selected_entity_names = [entity.title for entity in selected_entities]
+    selected_entity_names = {entity.title for entity in selected_entities}
     return [
         covariate
         for covariate in covariates
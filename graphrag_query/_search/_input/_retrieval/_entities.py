@@ -12,11 +12,13 @@ def get_entity_by_key(
     entities: typing.Iterable[_model.Entity], key: str, value: str | int
 ) -> typing.Optional[_model.Entity]:
     """Get entity by key."""
-    for entity in entities:
-        if isinstance(value, str) and is_valid_uuid(value):
-            if getattr(entity, key) == value or getattr(entity, key) == value.replace("-", ""):
+    if isinstance(value, str) and is_valid_uuid(value):
+        values = {value, value.replace("-", "")}
+        for entity in entities:
+            if getattr(entity, key) in values:
                 return entity
-        else:
+    else:
+        for entity in entities:
             if getattr(entity, key) == value:
                 return entity
     return None
@@ -9,11 +9,11 @@ from ... import _model
 
 def get_in_network_relationships(
     selected_entities: typing.List[_model.Entity],
-    relationships: typing.List[_model.Relationship],
+    relationships: typing.Iterable[_model.Relationship],
     ranking_attribute: str = "rank",
 ) -> typing.List[_model.Relationship]:
     """Get all directed relationships between selected entities, sorted by ranking_attribute."""
-    selected_entity_names = [entity.title for entity in selected_entities]
+    selected_entity_names = {entity.title for entity in selected_entities}
     selected_relationships = [
         relationship
         for relationship in relationships
@@ -30,22 +30,19 @@ def get_in_network_relationships(
 
 def get_out_network_relationships(
     selected_entities: typing.List[_model.Entity],
-    relationships: typing.List[_model.Relationship],
+    relationships: typing.Iterable[_model.Relationship],
     ranking_attribute: str = "rank",
 ) -> typing.List[_model.Relationship]:
     """Get relationships from selected entities to other entities that are not within the selected entities,
     sorted by ranking_attribute."""
-    selected_entity_names = [entity.title for entity in selected_entities]
-    source_relationships = [
-        relationship
-        for relationship in relationships
-        if relationship.source in selected_entity_names and relationship.target not in selected_entity_names
-    ]
-    target_relationships = [
-        relationship
-        for relationship in relationships
-        if relationship.target in selected_entity_names and relationship.source not in selected_entity_names
-    ]
+    selected_entity_names = {entity.title for entity in selected_entities}
+    source_relationships = []
+    target_relationships = []
+    for relationship in relationships:
+        if relationship.source in selected_entity_names and relationship.target not in selected_entity_names:
+            source_relationships.append(relationship)
+        elif relationship.target in selected_entity_names and relationship.source not in selected_entity_names:
+            target_relationships.append(relationship)
     selected_relationships = source_relationships + target_relationships
     return sort_relationships_by_ranking_attribute(
         selected_relationships, selected_entities, ranking_attribute
@@ -54,10 +51,10 @@ def get_out_network_relationships(
 
 def get_candidate_relationships(
     selected_entities: typing.List[_model.Entity],
-    relationships: typing.List[_model.Relationship],
+    relationships: typing.Iterable[_model.Relationship],
 ) -> typing.List[_model.Relationship]:
     """Get all relationships that are associated with the selected entities."""
-    selected_entity_names = [entity.title for entity in selected_entities]
+    selected_entity_names = {entity.title for entity in selected_entities}
     return [
         relationship
         for relationship in relationships
@@ -66,32 +63,36 @@ def get_candidate_relationships(
 
 
 def get_entities_from_relationships(
-    relationships: typing.List[_model.Relationship], entities: typing.List[_model.Entity]
+    relationships: typing.List[_model.Relationship], entities: typing.Iterable[_model.Entity]
 ) -> typing.List[_model.Entity]:
     """Get all entities that are associated with the selected relationships."""
-    selected_entity_names = [relationship.source for relationship in relationships] + [
+    selected_entity_names = {relationship.source for relationship in relationships} | {
         relationship.target for relationship in relationships
-    ]
+    }
     return [entity for entity in entities if entity.title in selected_entity_names]
 
 
-def calculate_relationship_combined_rank(
+def get_relationship_ranker(
     relationships: typing.List[_model.Relationship],
     entities: typing.List[_model.Entity],
     ranking_attribute: str = "rank",
-) -> typing.List[_model.Relationship]:
-    """Calculate default rank for a relationship based on the combined rank of source and target entities."""
-    entity_mappings = {entity.title: entity for entity in entities}
+) -> typing.Callable[[_model.Relationship], float]:
+    """
+    Get the key ranking relationships by a ranking_attribute.
 
-    for relationship in relationships:
-        if relationship.attributes is None:
-            relationship.attributes = {}
-        source = entity_mappings.get(relationship.source)
-        target = entity_mappings.get(relationship.target)
-        source_rank = source.rank if source and source.rank else 0
-        target_rank = target.rank if target and target.rank else 0
-        relationship.attributes[ranking_attribute] = source_rank + target_rank  # type: ignore
-    return relationships
+    If no ranking attribute exists, relationships are ranked by the combined rank of their source and target
+    entities, which is computed here without being stored on the relationships.
+    """
+    attribute_names = (
+        list(relationships[0].attributes.keys()) if relationships and relationships[0].attributes else []
+    )
+    if ranking_attribute in attribute_names:
+        return lambda x: int(x.attributes[ranking_attribute]) if x.attributes else 0
+    if ranking_attribute == "weight":
+        return lambda x: x.weight if x.weight else 0.0
+    # ranking attribute do not exist, calculate rank = combined ranks of source and target
+    entity_ranks = {entity.title: entity.rank or 0 for entity in entities}
+    return lambda x: entity_ranks.get(x.source, 0) + entity_ranks.get(x.target, 0)
 
 
 def sort_relationships_by_ranking_attribute(
@@ -107,26 +108,7 @@ def sort_relationships_by_ranking_attribute(
     if len(relationships) == 0:
         return relationships
 
-    # sort by ranking attribute
-    attribute_names = (
-        list(relationships[0].attributes.keys()) if relationships[0].attributes else []
-    )
-    if ranking_attribute in attribute_names:
-        relationships.sort(
-            key=lambda x: int(x.attributes[ranking_attribute]) if x.attributes else 0,
-            reverse=True,
-        )
-    elif ranking_attribute == "weight":
-        relationships.sort(key=lambda x: x.weight if x.weight else 0.0, reverse=True)
-    else:
-        # ranking attribute do not exist, calculate rank = combined ranks of source and target
-        relationships = calculate_relationship_combined_rank(
-            relationships, entities, ranking_attribute
-        )
-        relationships.sort(
-            key=lambda x: int(x.attributes[ranking_attribute]) if x.attributes else 0,
-            reverse=True,
-        )
+    relationships.sort(key=get_relationship_ranker(relationships, entities, ranking_attribute), reverse=True)
     return relationships
 
 
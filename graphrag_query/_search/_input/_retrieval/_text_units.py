@@ -9,13 +9,13 @@ from ... import _model
 
 def get_candidate_text_units(
     selected_entities: typing.List[_model.Entity],
-    text_units: typing.List[_model.TextUnit],
+    text_units: typing.Iterable[_model.TextUnit],
 ) -> pd.DataFrame:
     """Get all text units that are associated to selected entities."""
     selected_text_ids_ = [
         entity.text_unit_ids for entity in selected_entities if entity.text_unit_ids
     ]
-    selected_text_ids = [item for sublist in selected_text_ids_ for item in sublist]
+    selected_text_ids = {item for sublist in selected_text_ids_ for item in sublist}
     selected_text_units = [unit for unit in text_units if unit.id in selected_text_ids]
     return to_text_unit_dataframe(selected_text_units)
 
@@ -6,6 +6,11 @@ from ._base_llm import (
     BaseChatLLM,
     BaseEmbedding,
 )
+from ._cached_embedding import (
+    AsyncCachedEmbedding,
+    CachedEmbedding,
+    SQLiteEmbeddingCache,
+)
 from ._chat import (
     AsyncChatLLM,
     ChatLLM,
@@ -31,6 +36,9 @@ __all__ = [
     "AsyncChatLLM",
     "Embedding",
     "AsyncEmbedding",
+    "CachedEmbedding",
+    "AsyncCachedEmbedding",
+    "SQLiteEmbeddingCache",
     "AsyncChatStreamResponse_T",
     "ChatResponse_T",
     "EmbeddingResponse_T",
@@ -139,6 +139,21 @@ class BaseEmbedding(abc.ABC):
         """
         ...
 
+    def embed_many(self, texts: typing.Sequence[str], **kwargs: typing.Any) -> typing.List[_types.EmbeddingResponse_T]:
+        """
+        Generates embeddings for several texts. The default implementation
+        embeds them one by one; implementations backed by a batch endpoint
+        should override it.
+
+        Args:
+            texts: The texts to embed.
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            One embedding per input text, in input order.
+        """
+        return [self.embed(text, **kwargs) for text in texts]
+
     @abc.abstractmethod
     def close(self) -> None:
         """
@@ -182,6 +197,25 @@ class BaseAsyncEmbedding(abc.ABC):
         """
         ...
 
+    async def aembed_many(
+        self,
+        texts: typing.Sequence[str],
+        **kwargs: typing.Any
+    ) -> typing.List[_types.EmbeddingResponse_T]:
+        """
+        Asynchronously generates embeddings for several texts. The default
+        implementation embeds them one by one; implementations backed by a
+        batch endpoint should override it.
+
+        Args:
+            texts: The texts to embed.
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            One embedding per input text, in input order.
+        """
+        return [await self.aembed(text, **kwargs) for text in texts]
+
     @abc.abstractmethod
     async def aclose(self) -> None:
         """
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import typing
+
+import numpy as np
+import typing_extensions
+
+from . import _base_llm, _types
+from ... import _utils
+
+
+def make_cache_key(model: str, text: str, **kwargs: typing.Any) -> str:
+    """
+    Build the cache key of an embedding request.
+
+    Args:
+        model: The embedding model identifier.
+        text: The (already normalized) text to embed.
+        **kwargs:
+            Request options that change the resulting vector, e.g.
+            `dimensions`.
+
+    Returns:
+        A hex digest identifying the model, text and options.
+    """
+    payload = f"{model}\x00{text}"
+    if kwargs:
+        payload += "\x00" + json.dumps(kwargs, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteEmbeddingCache(_utils.SQLiteCache[typing.List[float]]):
+    """
+    On-disk embedding cache backend. Vectors are stored as float32 blobs in a
+    SQLite database that can be shared by several worker processes, so a
+    restarted worker starts with the hot query set already embedded.
+    """
+
+    def __init__(
+        self,
+        path: typing.Union[str, os.PathLike[str]],
+        *,
+        max_size: int = 100_000,
+        ttl: typing.Optional[float] = None,
+        timeout: float = 30.0,
+    ) -> None:
+        """
+        Args:
+            path: The path of the SQLite database file; created if missing.
+            max_size: The maximum number of vectors kept on disk.
+            ttl: Optional number of seconds after which a vector is stale.
+            timeout:
+                How long (in seconds) a writer waits for another process
+                holding the write lock.
+        """
+        super().__init__(
+            path,
+            encode=lambda vector: np.asarray(vector, dtype=np.float32).tobytes(),
+            decode=lambda blob: np.frombuffer(blob, dtype=np.float32).tolist(),
+            max_size=max_size,
+            ttl=ttl,
+            timeout=timeout,
+        )
+
+
+class CachedEmbedding(_base_llm.BaseEmbedding):
+    """
+    Wraps a BaseEmbedding with a cache keyed by model and normalized text, so
+    repeated queries skip the embedding round trip.
+
+    Attributes:
+        _embedding: The wrapped embedding model.
+        _cache: The cache backend storing embedding vectors.
+    """
+    _embedding: _base_llm.BaseEmbedding
+    _cache: _utils.BaseCache[typing.List[float]]
+
+    @property
+    @typing_extensions.override
+    def model(self) -> str:
+        return self._embedding.model
+
+    @model.setter
+    @typing_extensions.override
+    def model(self, value: str) -> None:
+        self._embedding.model = value
+
+    @property
+    def embedding(self) -> _base_llm.BaseEmbedding:
+        return self._embedding
+
+    @property
+    def cache(self) -> _utils.BaseCache[typing.List[float]]:
+        return self._cache
+
+    @property
+    def cache_stats(self) -> _utils.CacheStats:
+        return self._cache.stats
+
+    def __init__(
+        self,
+        embedding: _base_llm.BaseEmbedding,
+        cache: typing.Optional[_utils.BaseCache[typing.List[float]]] = None,
+    ) -> None:
+        """
+        Args:
+            embedding: The embedding model to wrap.
+            cache:
+                The cache backend. Defaults to an in-memory LRU cache with
+                1024 entries and no TTL.
+        """
+        self._embedding = embedding
+        self._cache = cache if cache is not None else _utils.LRUCache()
+
+    @typing_extensions.override
+    def embed(self, text: str, **kwargs: typing.Any) -> _types.EmbeddingResponse_T:
+        text = _utils.normalize_text(text)
+        key = make_cache_key(self.model, text, **kwargs)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return list(cached)
+        embedding = self._embedding.embed(text, **kwargs)
+        self._cache.set(key, embedding)
+        return list(embedding)
+
+    @typing_extensions.override
+    def embed_many(self, texts: typing.Sequence[str], **kwargs: typing.Any) -> typing.List[_types.EmbeddingResponse_T]:
+        """Embed several texts, sending only the cache misses to the wrapped model in one batch."""
+        texts = [_utils.normalize_text(text) for text in texts]
+        keys = [make_cache_key(self.model, text, **kwargs) for text in texts]
+        results = self._cache.get_many(keys)
+        misses = [index for index, result in enumerate(results) if result is None]
+        if misses:
+            embeddings = self._embedding.embed_many([texts[i] for i in misses], **kwargs)
+            self._cache.set_many([(keys[index], embedding) for index, embedding in zip(misses, embeddings)])
+            for index, embedding in zip(misses, embeddings):
+                results[index] = embedding
+        return [list(typing.cast(typing.List[float], result)) for result in results]
+
+    @typing_extensions.override
+    def close(self) -> None:
+        self._embedding.close()
+
+    @typing_extensions.override
+    def __str__(self) -> str:
+        return f"CachedEmbedding(embedding={self._embedding}, cache={self._cache})"
+
+
+class AsyncCachedEmbedding(_base_llm.BaseAsyncEmbedding):
+    """
+    Wraps a BaseAsyncEmbedding with a cache keyed by model and normalized
+    text, so repeated queries skip the embedding round trip.
+
+    Attributes:
+        _embedding: The wrapped asynchronous embedding model.
+        _cache: The cache backend storing embedding vectors.
+    """
+    _embedding: _base_llm.BaseAsyncEmbedding
+    _cache: _utils.BaseCache[typing.List[float]]
+
+    @property
+    @typing_extensions.override
+    def model(self) -> str:
+        return self._embedding.model
+
+    @model.setter
+    @typing_extensions.override
+    def model(self, value: str) -> None:
+        self._embedding.model = value
+
+    @property
+    def embedding(self) -> _base_llm.BaseAsyncEmbedding:
+        return self._embedding
+
+    @property
+    def cache(self) -> _utils.BaseCache[typing.List[float]]:
+        return self._cache
+
+    @property
+    def cache_stats(self) -> _utils.CacheStats:
+        return self._cache.stats
+
+    def __init__(
+        self,
+        embedding: _base_llm.BaseAsyncEmbedding,
+        cache: typing.Optional[_utils.BaseCache[typing.List[float]]] = None,
+    ) -> None:
+        """
+        Args:
+            embedding: The asynchronous embedding model to wrap.
+            cache:
+                The cache backend, which may be shared with a CachedEmbedding.
+                Defaults to an in-memory LRU cache with 1024 entries and no TTL.
+        """
+        self._embedding = embedding
+        self._cache = cache if cache is not None else _utils.LRUCache()
+
+    @typing_extensions.override
+    async def aembed(self, text: str, **kwargs: typing.Any) -> _types.EmbeddingResponse_T:
+        text = _utils.normalize_text(text)
+        key = make_cache_key(self.model, text, **kwargs)
+        cached = await self._cache.aget(key)
+        if cached is not None:
+            return list(cached)
+        embedding = await self._embedding.aembed(text, **kwargs)
+        await self._cache.aset(key, embedding)
+        return list(embedding)
+
+    @typing_extensions.override
+    async def aembed_many(
+        self,
+        texts: typing.Sequence[str],
+        **kwargs: typing.Any
+    ) -> typing.List[_types.EmbeddingResponse_T]:
+        """Embed several texts, sending only the cache misses to the wrapped model in one batch."""
+        texts = [_utils.normalize_text(text) for text in texts]
+        keys = [make_cache_key(self.model, text, **kwargs) for text in texts]
+        results = await self._cache.aget_many(keys)
+        misses = [index for index, result in enumerate(results) if result is None]
+        if misses:
+            embeddings = await self._embedding.aembed_many([texts[i] for i in misses], **kwargs)
+            await self._cache.aset_many([(keys[index], embedding) for index, embedding in zip(misses, embeddings)])
+            for index, embedding in zip(misses, embeddings):
+                results[index] = embedding
+        return [list(typing.cast(typing.List[float], result)) for result in results]
+
+    @typing_extensions.override
+    async def aclose(self) -> None:
+        await self._embedding.aclose()
+
+    @typing_extensions.override
+    def __str__(self) -> str:
+        return f"AsyncCachedEmbedding(embedding={self._embedding}, cache={self._cache})"
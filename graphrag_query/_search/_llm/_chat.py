@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import asyncio
+import random
 import typing
 
 import httpx
 import openai
+import tiktoken
 import typing_extensions
 
 from . import _base_llm, _types
@@ -22,10 +25,17 @@ class ChatLLM(_base_llm.BaseChatLLM):
     Attributes:
         _model: The model identifier for the chat LLM.
         _client: The OpenAI client instance used to communicate with the LLM.
+        _rate_limiter: Optional RPM/TPM limiter, shared per quota.
+        _stream_usage:
+            Whether streams ask for the usage chunk that reconciles the rate
+            limiter.
     """
 
     _model: str
     _client: openai.OpenAI
+    _rate_limiter: typing.Optional[_utils.RateLimiter]
+    _token_encoder: typing.Optional[tiktoken.Encoding]
+    _stream_usage: bool
 
     @property
     @typing_extensions.override
@@ -47,6 +57,9 @@ class ChatLLM(_base_llm.BaseChatLLM):
         timeout: typing.Optional[float] = None,
         max_retries: typing.Optional[int] = None,
         http_client: typing.Optional[httpx.Client] = None,
+        rate_limiter: typing.Optional[_utils.RateLimiter] = None,
+        token_encoder: typing.Optional[tiktoken.Encoding] = None,
+        stream_usage: bool = True,
         **kwargs: typing.Any
     ) -> None:
         """
@@ -62,6 +75,17 @@ class ChatLLM(_base_llm.BaseChatLLM):
                 Optional. The maximum number of retries for failed requests.
             http_client:
                 Optional. The HTTP client to use for making synchronous requests.
+            rate_limiter:
+                Optional. An RPM/TPM limiter every request reserves capacity
+                from before it is sent.
+            token_encoder:
+                Optional. The token encoder used to estimate prompt tokens for
+                the rate limiter. Defaults to cl100k_base.
+            stream_usage:
+                Optional. Whether streams ask for the usage chunk
+                (`stream_options`) that reconciles the rate limiter's estimate.
+                It is turned off for good, keeping the estimate, the first time
+                the backend rejects `stream_options`. Defaults to True.
             **kwargs: Additional keyword arguments for `openai.OpenAI`.
         """
         self._client = openai.OpenAI(
@@ -69,11 +93,18 @@ class ChatLLM(_base_llm.BaseChatLLM):
             organization=organization,
             base_url=base_url,
             timeout=timeout,
-            max_retries=max_retries or 3,
+            max_retries=3 if max_retries is None else max_retries,
             http_client=http_client,
             **_utils.filter_kwargs(openai.OpenAI, kwargs)
         )
         self._model = model
+        self._rate_limiter = rate_limiter
+        self._token_encoder = token_encoder
+        self._stream_usage = stream_usage
+
+    @property
+    def rate_limiter(self) -> typing.Optional[_utils.RateLimiter]:
+        return self._rate_limiter
 
     @typing_extensions.override
     def chat(
@@ -100,17 +131,52 @@ class ChatLLM(_base_llm.BaseChatLLM):
         Raises:
             OpenAIAPIError: If openai.APIError occurs while sending the message.
         """
+        create_kwargs = _utils.filter_kwargs(self._client.chat.completions.create, kwargs)
+        tokens = _estimate_tokens(msg, self._token_encoder, create_kwargs) if self._rate_limiter else 0
+        usage_requested = (
+            self._rate_limiter is not None and stream and self._stream_usage and _request_stream_usage(create_kwargs)
+        )
         try:
-            response = self._client.chat.completions.create(
-                model=self._model,
-                messages=msg,
-                stream=stream,
-                **_utils.filter_kwargs(self._client.chat.completions.create, kwargs)
-            )
+            try:
+                response, reservation = self._create(
+                    tokens, model=self._model, messages=msg, stream=stream, **create_kwargs
+                )
+            except openai.BadRequestError as e:
+                if not (usage_requested and _rejects_stream_options(e)):
+                    raise
+                # the backend does not support stream_options: keep the estimates from now on
+                self._stream_usage = usage_requested = False
+                del create_kwargs["stream_options"]
+                response, reservation = self._create(
+                    tokens, model=self._model, messages=msg, stream=stream, **create_kwargs
+                )
         except openai.APIError as e:
             raise _errors.OpenAIAPIError(e) from e
-        return typing.cast(_types.ChatCompletion, response) \
-            if not stream else (typing.cast(_types.ChatCompletionChunk, c) for c in response)
+        if reservation and not stream:
+            _reconcile(typing.cast(_utils.RateLimiter, self._rate_limiter), reservation, response)
+        return typing.cast(_types.ChatCompletion, response) if not stream else _iter_stream(
+            typing.cast(openai.Stream[_types.ChatCompletionChunk], response),
+            self._rate_limiter if reservation else None,
+            reservation,
+            hide_usage=usage_requested,
+        )
+
+    def _create(
+        self,
+        tokens: int,
+        **kwargs: typing.Any
+    ) -> typing.Tuple[typing.Any, typing.Optional[_utils.RateReservation]]:
+        """
+        Creates a chat completion after reserving `tokens` from the rate
+        limiter, if any, and settles the reservation if the request fails.
+        """
+        reservation = self._rate_limiter.acquire(tokens) if self._rate_limiter else None
+        try:
+            return self._client.chat.completions.create(**kwargs), reservation
+        except openai.APIError as e:
+            if reservation:
+                _settle_failed(typing.cast(_utils.RateLimiter, self._rate_limiter), reservation, e)
+            raise
 
     @typing_extensions.override
     def close(self) -> None:
@@ -131,8 +197,19 @@ class AsyncChatLLM(_base_llm.BaseAsyncChatLLM):
         _aclient:
             The asynchronous OpenAI client instance used to communicate with
             the LLM.
+        _concurrency_limiter:
+            Optional adaptive limiter shared by every caller of this LLM.
+        _rate_limiter: Optional RPM/TPM limiter, shared per quota.
+        _stream_usage:
+            Whether streams ask for the usage chunk that reconciles the rate
+            limiter.
     """
 
+    _concurrency_limiter: typing.Optional[_utils.AdaptiveConcurrencyLimiter]
+    _rate_limiter: typing.Optional[_utils.RateLimiter]
+    _token_encoder: typing.Optional[tiktoken.Encoding]
+    _stream_usage: bool
+
     @property
     @typing_extensions.override
     def model(self) -> str:
@@ -153,6 +230,10 @@ class AsyncChatLLM(_base_llm.BaseAsyncChatLLM):
         timeout: typing.Optional[float] = None,
         max_retries: typing.Optional[int] = None,
         http_client: typing.Optional[httpx.AsyncClient] = None,
+        concurrency_limiter: typing.Optional[_utils.AdaptiveConcurrencyLimiter] = None,
+        rate_limiter: typing.Optional[_utils.RateLimiter] = None,
+        token_encoder: typing.Optional[tiktoken.Encoding] = None,
+        stream_usage: bool = True,
         **kwargs: typing.Any
     ) -> None:
         """
@@ -170,6 +251,22 @@ class AsyncChatLLM(_base_llm.BaseAsyncChatLLM):
             http_client:
                 Optional. The HTTP client to use for making asynchronous
                 requests.
+            concurrency_limiter:
+                Optional. An adaptive limiter bounding the requests in flight.
+                It learns from rate-limit responses, their retry-after headers
+                and timeouts; such requests are then retried here instead of
+                inside the OpenAI client.
+            rate_limiter:
+                Optional. An RPM/TPM limiter every request reserves capacity
+                from before it is sent.
+            token_encoder:
+                Optional. The token encoder used to estimate prompt tokens for
+                the rate limiter. Defaults to cl100k_base.
+            stream_usage:
+                Optional. Whether streams ask for the usage chunk
+                (`stream_options`) that reconciles the rate limiter's estimate.
+                It is turned off for good, keeping the estimate, the first time
+                the backend rejects `stream_options`. Defaults to True.
             **kwargs: Additional keyword arguments for `openai.AsyncOpenAI`.
         """
         self._aclient = openai.AsyncOpenAI(
@@ -177,11 +274,29 @@ class AsyncChatLLM(_base_llm.BaseAsyncChatLLM):
             organization=organization,
             base_url=base_url,
             timeout=timeout,
-            max_retries=max_retries or 3,
+            max_retries=3 if max_retries is None else max_retries,
             http_client=http_client,
             **_utils.filter_kwargs(openai.AsyncOpenAI, kwargs)
         )
         self._model = model
+        self._max_retries = 3 if max_retries is None else max_retries
+        self._concurrency_limiter = concurrency_limiter
+        self._rate_limiter = rate_limiter
+        self._token_encoder = token_encoder
+        self._stream_usage = stream_usage
+
+    @property
+    def rate_limiter(self) -> typing.Optional[_utils.RateLimiter]:
+        return self._rate_limiter
+
+    @property
+    def concurrency_limiter(self) -> typing.Optional[_utils.AdaptiveConcurrencyLimiter]:
+        return self._concurrency_limiter
+
+    @property
+    def concurrency_limit(self) -> typing.Optional[int]:
+        """The current adaptive concurrency limit, or None without a limiter."""
+        return self._concurrency_limiter.limit if self._concurrency_limiter else None
 
     @typing_extensions.override
     async def achat(
@@ -209,20 +324,226 @@ class AsyncChatLLM(_base_llm.BaseAsyncChatLLM):
         Raises:
             OpenAIAPIError: If openai.APIError occurs while sending the message.
         """
+        create_kwargs = _utils.filter_kwargs(self._aclient.chat.completions.create, kwargs)
+        tokens = _estimate_tokens(msg, self._token_encoder, create_kwargs) if self._rate_limiter else 0
+        usage_requested = (
+            self._rate_limiter is not None and stream and self._stream_usage and _request_stream_usage(create_kwargs)
+        )
         try:
-            response = await self._aclient.chat.completions.create(
-                model=self._model,
-                messages=msg,
-                stream=stream,
-                **_utils.filter_kwargs(self._aclient.chat.completions.create, kwargs)
-            )
+            try:
+                response, reservation = await self._create(
+                    tokens, model=self._model, messages=msg, stream=stream, **create_kwargs
+                )
+            except openai.BadRequestError as e:
+                if not (usage_requested and _rejects_stream_options(e)):
+                    raise
+                # the backend does not support stream_options: keep the estimates from now on
+                self._stream_usage = usage_requested = False
+                del create_kwargs["stream_options"]
+                response, reservation = await self._create(
+                    tokens, model=self._model, messages=msg, stream=stream, **create_kwargs
+                )
         except openai.APIError as e:
             raise _errors.OpenAIAPIError(e) from e
+        if reservation and not stream:
+            _reconcile(typing.cast(_utils.RateLimiter, self._rate_limiter), reservation, response)
 
-        return typing.cast(_types.ChatCompletion, response) if not stream else (
-            c async for c in typing.cast(_types.AsyncChatStreamResponse_T, response)
+        return typing.cast(_types.ChatCompletion, response) if not stream else _aiter_stream(
+            typing.cast(openai.AsyncStream[_types.ChatCompletionChunk], response),
+            self._rate_limiter if reservation else None,
+            reservation,
+            hide_usage=usage_requested,
         )
 
+    async def _create(
+        self,
+        tokens: int,
+        **kwargs: typing.Any
+    ) -> typing.Tuple[typing.Any, typing.Optional[_utils.RateReservation]]:
+        """
+        Creates a chat completion after reserving `tokens` from the rate
+        limiter, if any, and settles the reservation if the request fails.
+        With a concurrency limiter, the request goes through
+        `self._limited_create` instead.
+        """
+        if self._concurrency_limiter is not None:
+            return await self._limited_create(self._concurrency_limiter, tokens, **kwargs)
+        reservation = await self._rate_limiter.aacquire(tokens) if self._rate_limiter else None
+        try:
+            return await self._aclient.chat.completions.create(**kwargs), reservation
+        except openai.APIError as e:
+            if reservation:
+                _settle_failed(typing.cast(_utils.RateLimiter, self._rate_limiter), reservation, e)
+            raise
+
+    async def _limited_create(
+        self,
+        limiter: _utils.AdaptiveConcurrencyLimiter,
+        tokens: int,
+        **kwargs: typing.Any
+    ) -> typing.Tuple[typing.Any, typing.Optional[_utils.RateReservation]]:
+        """
+        Creates a chat completion within a slot of the concurrency limiter.
+        Rate-limited and timed out requests are reported to the limiter and
+        retried after the server's retry-after hint, or an exponential backoff
+        without one. Streams hold their slot until the response headers arrive.
+
+        Every attempt reserves `tokens` from the rate limiter, if any, before
+        it is sent; the response is returned with the reservation of the
+        attempt that succeeded.
+        """
+        client = self._aclient.with_options(max_retries=0)
+        for attempt in range(self._max_retries + 1):
+            reservation = await self._rate_limiter.aacquire(tokens) if self._rate_limiter else None
+            retry_after = None
+            async with limiter:
+                sent_at = limiter.clock()
+                try:
+                    response = await client.chat.completions.create(**kwargs)
+                except openai.APIError as e:
+                    if reservation:
+                        _settle_failed(typing.cast(_utils.RateLimiter, self._rate_limiter), reservation, e)
+                    if isinstance(e, openai.RateLimitError):
+                        retry_after = _retry_after(e.response)
+                        limiter.on_rate_limited(retry_after, sent_at=sent_at)
+                    elif isinstance(e, openai.APITimeoutError):
+                        limiter.on_timeout(sent_at=sent_at)
+                    else:
+                        raise
+                    if attempt == self._max_retries:
+                        raise
+                else:
+                    limiter.on_success()
+                    return response, reservation
+            await asyncio.sleep(
+                retry_after if retry_after is not None else min(0.5 * 2 ** attempt, 8.0) * (0.75 + random.random() / 2)
+            )
+        raise AssertionError("unreachable")
+
     @typing_extensions.override
     async def aclose(self) -> None:
         await self._aclient.close()
+
+
+def _iter_stream(
+    stream: openai.Stream[_types.ChatCompletionChunk],
+    limiter: typing.Optional[_utils.RateLimiter] = None,
+    reservation: typing.Optional[_utils.RateReservation] = None,
+    *,
+    hide_usage: bool = False,
+) -> _types.SyncChatStreamResponse_T:
+    """
+    Iterates a response stream, closing the upstream connection when the
+    consumer stops early. The reservation is reconciled with the usage chunk
+    that ends the stream; the usage chunk is not passed on if `hide_usage`.
+    """
+    usage = None
+    try:
+        for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if not (hide_usage and not chunk.choices):
+                yield chunk
+    finally:
+        stream.close()
+        if limiter is not None and reservation is not None and usage is not None:
+            limiter.reconcile(reservation, usage.total_tokens)
+
+
+async def _aiter_stream(
+    stream: openai.AsyncStream[_types.ChatCompletionChunk],
+    limiter: typing.Optional[_utils.RateLimiter] = None,
+    reservation: typing.Optional[_utils.RateReservation] = None,
+    *,
+    hide_usage: bool = False,
+) -> _types.AsyncChatStreamResponse_T:
+    """
+    Iterates a response stream, closing the upstream connection when the
+    consumer stops early. The reservation is reconciled with the usage chunk
+    that ends the stream; the usage chunk is not passed on if `hide_usage`.
+    """
+    usage = None
+    try:
+        async for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if not (hide_usage and not chunk.choices):
+                yield chunk
+    finally:
+        await stream.close()
+        if limiter is not None and reservation is not None and usage is not None:
+            limiter.reconcile(reservation, usage.total_tokens)
+
+
+def _request_stream_usage(create_kwargs: typing.Dict[str, typing.Any]) -> bool:
+    """
+    Asks for the usage chunk at the end of a stream, so that the rate limiter
+    can be reconciled. Returns whether it was added here, i.e. the caller did
+    not ask for it and the chunk is to be hidden from them.
+    """
+    if create_kwargs.get("stream_options"):
+        return False
+    create_kwargs["stream_options"] = {"include_usage": True}
+    return True
+
+
+def _rejects_stream_options(error: openai.BadRequestError) -> bool:
+    """Tells whether a request was rejected for its `stream_options`, which some OpenAI-compatible backends lack."""
+    return "stream_options" in f"{error.message} {error.body}"
+
+
+def _estimate_tokens(
+    msg: _types.MessageParam_T,
+    token_encoder: typing.Optional[tiktoken.Encoding],
+    kwargs: typing.Mapping[str, typing.Any],
+) -> int:
+    """
+    Estimates the tokens a chat request counts against a TPM quota: the prompt
+    plus the completion allowance, which providers reserve up front as well.
+    """
+    text = []
+    for message in msg:
+        content = typing.cast(typing.Mapping[str, typing.Any], message).get("content")
+        if isinstance(content, str):
+            text.append(content)
+        elif content:
+            text.extend(part.get("text", "") for part in content if isinstance(part, typing.Mapping))
+    # every message is framed by a few extra tokens
+    tokens = _utils.num_tokens("\n".join(text), token_encoder) + 4 * len(msg) + 3
+    return tokens + (kwargs.get("max_completion_tokens") or kwargs.get("max_tokens") or 0)
+
+
+def _reconcile(limiter: _utils.RateLimiter, reservation: _utils.RateReservation, response: typing.Any) -> None:
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        limiter.reconcile(reservation, usage.total_tokens)
+
+
+def _settle_failed(
+    limiter: _utils.RateLimiter,
+    reservation: _utils.RateReservation,
+    error: openai.APIError,
+) -> None:
+    """
+    Settles the reservation of a failed request. A rate-limited request is
+    rejected before it counts against the quota, so its tokens are given
+    back; any other failure may have been processed (e.g. a server error
+    mid-completion), so the estimate stands.
+    """
+    if isinstance(error, openai.RateLimitError):
+        limiter.reconcile(reservation, 0)
+    else:
+        limiter.reconcile(reservation, reservation.tokens)
+
+
+def _retry_after(response: httpx.Response) -> typing.Optional[float]:
+    """Reads the retry delay (in seconds) from the headers of a rate-limited response."""
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+import concurrent.futures
 import typing
 
 import httpx
@@ -10,6 +12,90 @@ import typing_extensions
 from . import _base_llm, _types
 from ... import _utils, errors as _errors
 
+# Limits of the OpenAI embeddings endpoint for a single request
+_DEFAULT_BATCH_SIZE = 2048
+_DEFAULT_BATCH_MAX_TOKENS = 300_000
+_DEFAULT_CONCURRENCY = 4
+
+
+class _ChunkPlan(typing.NamedTuple):
+    """Chunks of a group of texts, split into request-sized batches."""
+
+    batches: typing.List[typing.List[str]]
+    """chunk texts, grouped into batches that fit the request limits"""
+
+    owners: typing.List[int]
+    """index of the input text each chunk (in batch order) belongs to"""
+
+    lengths: typing.List[int]
+    """character length of each chunk, used as its weight when combining"""
+
+    batch_tokens: typing.List[int]
+    """number of tokens of each batch"""
+
+
+def _plan_chunks(
+    texts: typing.Sequence[str],
+    max_tokens: int,
+    token_encoder: tiktoken.Encoding,
+    batch_size: int,
+    batch_max_tokens: int,
+) -> _ChunkPlan:
+    batches: typing.List[typing.List[str]] = []
+    owners: typing.List[int] = []
+    lengths: typing.List[int] = []
+    all_batch_tokens: typing.List[int] = []
+    batch: typing.List[str] = []
+    batch_tokens = 0
+    for owner, text in enumerate(texts):
+        tokens = token_encoder.encode(text)
+        for start in range(0, len(tokens), max_tokens):
+            chunk_tokens = tokens[start:start + max_tokens]
+            if batch and (len(batch) >= batch_size or batch_tokens + len(chunk_tokens) > batch_max_tokens):
+                batches.append(batch)
+                all_batch_tokens.append(batch_tokens)
+                batch, batch_tokens = [], 0
+            chunk = token_encoder.decode(chunk_tokens)
+            batch.append(chunk)
+            batch_tokens += len(chunk_tokens)
+            owners.append(owner)
+            lengths.append(chunk.__len__() or 0)
+    if batch:
+        batches.append(batch)
+        all_batch_tokens.append(batch_tokens)
+    return _ChunkPlan(batches=batches, owners=owners, lengths=lengths, batch_tokens=all_batch_tokens)
+
+
+def _combine_chunks(
+    num_texts: int,
+    plan: _ChunkPlan,
+    batch_embeddings: typing.List[typing.List[typing.List[float]]],
+) -> typing.List[_types.EmbeddingResponse_T]:
+    chunk_embeddings: typing.List[typing.List[typing.List[float]]] = [[] for _ in range(num_texts)]
+    chunk_lens: typing.List[typing.List[int]] = [[] for _ in range(num_texts)]
+    chunk_iter = iter(zip(plan.owners, plan.lengths))
+    for embeddings in batch_embeddings:
+        for embedding, (owner, length) in zip(embeddings, chunk_iter):
+            chunk_embeddings[owner].append(embedding)
+            chunk_lens[owner].append(length)
+    return [
+        _utils.combine_embeddings(embeddings, lens) if embeddings else []
+        for embeddings, lens in zip(chunk_embeddings, chunk_lens)
+    ]
+
+
+def _sorted_embeddings(response: openai.types.CreateEmbeddingResponse) -> typing.List[typing.List[float]]:
+    return [item.embedding or [] for item in sorted(response.data, key=lambda item: item.index)]
+
+
+def _reconcile(
+    limiter: _utils.RateLimiter,
+    reservation: _utils.RateReservation,
+    response: openai.types.CreateEmbeddingResponse,
+) -> None:
+    if response.usage is not None:
+        limiter.reconcile(reservation, response.usage.total_tokens)
+
 
 class Embedding(_base_llm.BaseEmbedding):
     """
@@ -28,11 +114,21 @@ class Embedding(_base_llm.BaseEmbedding):
             one request.
         _token_encoder:
             The token encoder used to calculate token counts for input text.
+        _batch_size: The maximum number of chunks sent in one request.
+        _batch_max_tokens: The maximum number of tokens sent in one request.
+        _concurrency:
+            The maximum number of requests in flight when the chunks do not fit
+            in one request.
+        _rate_limiter: Optional RPM/TPM limiter, shared per quota.
     """
     _model: str
     _client: openai.OpenAI
     _max_tokens: int
     _token_encoder: tiktoken.Encoding
+    _batch_size: int
+    _batch_max_tokens: int
+    _concurrency: int
+    _rate_limiter: typing.Optional[_utils.RateLimiter]
 
     @property
     @typing_extensions.override
@@ -56,6 +152,10 @@ class Embedding(_base_llm.BaseEmbedding):
         http_client: typing.Optional[httpx.Client] = None,
         max_tokens: typing.Optional[int] = None,
         token_encoder: typing.Optional[tiktoken.Encoding] = None,
+        batch_size: typing.Optional[int] = None,
+        batch_max_tokens: typing.Optional[int] = None,
+        concurrency: typing.Optional[int] = None,
+        rate_limiter: typing.Optional[_utils.RateLimiter] = None,
         **kwargs: typing.Any
     ) -> None:
         """
@@ -75,6 +175,18 @@ class Embedding(_base_llm.BaseEmbedding):
                 Optional. The maximum number of tokens that can be processed in
                 one request.
             token_encoder: Optional. The token encoder used for tokenizing text.
+            batch_size:
+                Optional. The maximum number of chunks sent in one request.
+                Defaults to 2048, the OpenAI limit.
+            batch_max_tokens:
+                Optional. The maximum number of tokens sent in one request.
+                Defaults to 300,000, the OpenAI limit.
+            concurrency:
+                Optional. The maximum number of concurrent requests used when
+                the input exceeds one batch. Defaults to 4.
+            rate_limiter:
+                Optional. An RPM/TPM limiter every request reserves capacity
+                from before it is sent.
             **kwargs: Additional keyword arguments for customization.
         """
         self._client = openai.OpenAI(
@@ -82,20 +194,28 @@ class Embedding(_base_llm.BaseEmbedding):
             organization=organization,
             base_url=base_url,
             timeout=timeout,
-            max_retries=max_retries or 3,
+            max_retries=3 if max_retries is None else max_retries,
             http_client=http_client,
             **_utils.filter_kwargs(openai.OpenAI, kwargs)
         )
         self._model = model
         self._max_tokens = max_tokens or 8191
         self._token_encoder = token_encoder or tiktoken.get_encoding("cl100k_base")
+        self._batch_size = batch_size or _DEFAULT_BATCH_SIZE
+        self._batch_max_tokens = max(batch_max_tokens or _DEFAULT_BATCH_MAX_TOKENS, self._max_tokens)
+        self._concurrency = concurrency or _DEFAULT_CONCURRENCY
+        self._rate_limiter = rate_limiter
+
+    @property
+    def rate_limiter(self) -> typing.Optional[_utils.RateLimiter]:
+        return self._rate_limiter
 
     @typing_extensions.override
     def embed(self, text: str, **kwargs: typing.Any) -> _types.EmbeddingResponse_T:
         """
         Generates an embedding for the given text. If the text is too long, it
-        is chunked, and embeddings are generated for each chunk. The results are
-        combined into a single embedding.
+        is chunked, all chunks are embedded in one batched request, and the
+        results are combined into a single embedding.
 
         Args:
             text: The text to generate an embedding for.
@@ -104,20 +224,47 @@ class Embedding(_base_llm.BaseEmbedding):
         Returns:
             An EmbeddingResponse containing the generated embeddings.
         """
-        chunk_embeddings: typing.List[typing.List[float]] = []
-        chunk_lens: typing.List[int] = []
-        for chunk in _utils.chunk_text(text, self._max_tokens):
+        return self.embed_many([text], **kwargs)[0]
+
+    @typing_extensions.override
+    def embed_many(self, texts: typing.Sequence[str], **kwargs: typing.Any) -> typing.List[_types.EmbeddingResponse_T]:
+        """
+        Generates embeddings for several texts. Every text is chunked to the
+        model's token limit, the chunks are sent as list inputs in as few
+        requests as the batch limits allow (concurrently if more than one is
+        needed), and each text's chunk embeddings are combined.
+
+        Args:
+            texts: The texts to generate embeddings for.
+            **kwargs: Additional keyword arguments for customization.
+
+        Returns:
+            One embedding per input text, in input order. Empty texts yield an
+            empty list.
+        """
+        plan = _plan_chunks(texts, self._max_tokens, self._token_encoder, self._batch_size, self._batch_max_tokens)
+        create_kwargs = _utils.filter_kwargs(self._client.embeddings.create, kwargs)
+
+        def _embed_batch(batch: typing.List[str], tokens: int) -> typing.List[typing.List[float]]:
+            reservation = self._rate_limiter.acquire(tokens) if self._rate_limiter else None
             try:
-                embedding = self._client.embeddings.create(
-                    input=chunk,
-                    model=self._model,
-                    **_utils.filter_kwargs(self._client.embeddings.create, kwargs)
-                ).data[0].embedding or []
+                response = self._client.embeddings.create(input=batch, model=self._model, **create_kwargs)
             except openai.APIError as e:
+                if reservation:
+                    typing.cast(_utils.RateLimiter, self._rate_limiter).reconcile(reservation, 0)
                 raise _errors.OpenAIAPIError(e) from e
-            chunk_embeddings.append(embedding)
-            chunk_lens.append(chunk.__len__() or 0)
-        return _utils.combine_embeddings(chunk_embeddings, chunk_lens)
+            if reservation:
+                _reconcile(typing.cast(_utils.RateLimiter, self._rate_limiter), reservation, response)
+            return _sorted_embeddings(response)
+
+        if len(plan.batches) <= 1:
+            batch_embeddings = [_embed_batch(batch, tokens) for batch, tokens in zip(plan.batches, plan.batch_tokens)]
+        else:
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(self._concurrency, len(plan.batches))
+            ) as executor:
+                batch_embeddings = list(executor.map(_embed_batch, plan.batches, plan.batch_tokens))
+        return _combine_chunks(len(texts), plan, batch_embeddings)
 
     @typing_extensions.override
     def close(self) -> None:
@@ -142,11 +289,21 @@ class AsyncEmbedding(_base_llm.BaseAsyncEmbedding):
             one request.
         _token_encoder:
             The token encoder used to calculate token counts for input text.
+        _batch_size: The maximum number of chunks sent in one request.
+        _batch_max_tokens: The maximum number of tokens sent in one request.
+        _concurrency:
+            The maximum number of requests in flight when the chunks do not fit
+            in one request.
+        _rate_limiter: Optional RPM/TPM limiter, shared per quota.
     """
     _model: str
     _aclient: openai.AsyncOpenAI
     _max_tokens: int
     _token_encoder: tiktoken.Encoding
+    _batch_size: int
+    _batch_max_tokens: int
+    _concurrency: int
+    _rate_limiter: typing.Optional[_utils.RateLimiter]
 
     @property
     @typing_extensions.override
@@ -170,6 +327,10 @@ class AsyncEmbedding(_base_llm.BaseAsyncEmbedding):
         http_client: typing.Optional[httpx.AsyncClient] = None,
         max_tokens: typing.Optional[int] = None,
         token_encoder: typing.Optional[tiktoken.Encoding] = None,
+        batch_size: typing.Optional[int] = None,
+        batch_max_tokens: typing.Optional[int] = None,
+        concurrency: typing.Optional[int] = None,
+        rate_limiter: typing.Optional[_utils.RateLimiter] = None,
         **kwargs: typing.Any
     ) -> None:
         """
@@ -191,6 +352,18 @@ class AsyncEmbedding(_base_llm.BaseAsyncEmbedding):
                 Optional. The maximum number of tokens that can be processed in
                 one request.
             token_encoder: Optional. The token encoder used for tokenizing text.
+            batch_size:
+                Optional. The maximum number of chunks sent in one request.
+                Defaults to 2048, the OpenAI limit.
+            batch_max_tokens:
+                Optional. The maximum number of tokens sent in one request.
+                Defaults to 300,000, the OpenAI limit.
+            concurrency:
+                Optional. The maximum number of concurrent requests used when
+                the input exceeds one batch. Defaults to 4.
+            rate_limiter:
+                Optional. An RPM/TPM limiter every request reserves capacity
+                from before it is sent.
             **kwargs: Additional keyword arguments for customization.
         """
         self._aclient = openai.AsyncOpenAI(
@@ -198,20 +371,28 @@ class AsyncEmbedding(_base_llm.BaseAsyncEmbedding):
             organization=organization,
             base_url=base_url,
             timeout=timeout,
-            max_retries=max_retries or 3,
+            max_retries=3 if max_retries is None else max_retries,
             http_client=http_client,
             **_utils.filter_kwargs(openai.AsyncOpenAI, kwargs)
         )
         self._model = model
         self._max_tokens = max_tokens or 8191
         self._token_encoder = token_encoder or tiktoken.get_encoding("cl100k_base")
+        self._batch_size = batch_size or _DEFAULT_BATCH_SIZE
+        self._batch_max_tokens = max(batch_max_tokens or _DEFAULT_BATCH_MAX_TOKENS, self._max_tokens)
+        self._concurrency = concurrency or _DEFAULT_CONCURRENCY
+        self._rate_limiter = rate_limiter
+
+    @property
+    def rate_limiter(self) -> typing.Optional[_utils.RateLimiter]:
+        return self._rate_limiter
 
     @typing_extensions.override
     async def aembed(self, text: str, **kwargs: typing.Any) -> typing.List[float]:
         """
         Asynchronously generates an embedding for the given text. If the text is
-        too long, it is chunked, and embeddings are generated for each chunk.
-        The results are combined into a single embedding.
+        too long, it is chunked, all chunks are embedded in one batched request,
+        and the results are combined into a single embedding.
 
         Args:
             text: The text to generate an embedding for.
@@ -220,20 +401,49 @@ class AsyncEmbedding(_base_llm.BaseAsyncEmbedding):
         Returns:
             A list of floats representing the combined embeddings.
         """
-        chunk_embeddings: typing.List[typing.List[float]] = []
-        chunk_lens: typing.List[int] = []
-        for chunk in _utils.chunk_text(text, self._max_tokens):
-            try:
-                embedding = (await self._aclient.embeddings.create(
-                    input=chunk,
-                    model=self._model,
-                    **_utils.filter_kwargs(self._aclient.embeddings.create, kwargs)
-                )).data[0].embedding or []
-            except openai.APIError as e:
-                raise _errors.OpenAIAPIError(e) from e
-            chunk_embeddings.append(embedding)
-            chunk_lens.append(chunk.__len__() or 0)
-        return _utils.combine_embeddings(chunk_embeddings, chunk_lens)
+        return (await self.aembed_many([text], **kwargs))[0]
+
+    @typing_extensions.override
+    async def aembed_many(
+        self,
+        texts: typing.Sequence[str],
+        **kwargs: typing.Any
+    ) -> typing.List[_types.EmbeddingResponse_T]:
+        """
+        Asynchronously generates embeddings for several texts. Every text is
+        chunked to the model's token limit, the chunks are sent as list inputs
+        in as few requests as the batch limits allow (concurrently if more than
+        one is needed), and each text's chunk embeddings are combined.
+
+        Args:
+            texts: The texts to generate embeddings for.
+            **kwargs: Additional keyword arguments for customization.
+
+        Returns:
+            One embedding per input text, in input order. Empty texts yield an
+            empty list.
+        """
+        plan = _plan_chunks(texts, self._max_tokens, self._token_encoder, self._batch_size, self._batch_max_tokens)
+        create_kwargs = _utils.filter_kwargs(self._aclient.embeddings.create, kwargs)
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def _embed_batch(batch: typing.List[str], tokens: int) -> typing.List[typing.List[float]]:
+            async with semaphore:
+                reservation = await self._rate_limiter.aacquire(tokens) if self._rate_limiter else None
+                try:
+                    response = await self._aclient.embeddings.create(input=batch, model=self._model, **create_kwargs)
+                except openai.APIError as e:
+                    if reservation:
+                        typing.cast(_utils.RateLimiter, self._rate_limiter).reconcile(reservation, 0)
+                    raise _errors.OpenAIAPIError(e) from e
+                if reservation:
+                    _reconcile(typing.cast(_utils.RateLimiter, self._rate_limiter), reservation, response)
+                return _sorted_embeddings(response)
+
+        batch_embeddings = list(await asyncio.gather(
+            *(_embed_batch(batch, tokens) for batch, tokens in zip(plan.batches, plan.batch_tokens))
+        ))
+        return _combine_chunks(len(texts), plan, batch_embeddings)
 
     @typing_extensions.override
     async def aclose(self) -> None:
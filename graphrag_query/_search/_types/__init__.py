@@ -3,8 +3,10 @@ from __future__ import annotations
 import typing
 
 from ._search import (
+    CacheUsage,
     Choice,
     Message,
+    ReduceUsage,
     SearchResult,
     Usage,
 )
@@ -22,6 +24,8 @@ __all__ = [
     "Choice",
     "Message",
     "Usage",
+    "CacheUsage",
+    "ReduceUsage",
     "SearchResultChunk",
     "ChunkChoice",
     "Delta",
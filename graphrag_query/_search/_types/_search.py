@@ -16,6 +16,45 @@ class Usage(pydantic.BaseModel):
     """Total number of tokens used in the request (prompt + completion)."""
 
 
+class CacheUsage(pydantic.BaseModel):
+    hits: int = 0
+    """Number of LLM calls answered from the cache."""
+
+    misses: int = 0
+    """Number of LLM calls that were not found in the cache."""
+
+    saved_tokens: int = 0
+    """Total number of tokens the cached responses originally used."""
+
+
+class ReduceUsage(pydantic.BaseModel):
+    levels: int = 0
+    """Number of levels of intermediate reduce calls."""
+
+    llm_calls: int = 0
+    """Number of intermediate reduce calls, failed ones included."""
+
+    failed_calls: int = 0
+    """Number of intermediate reduce calls that failed."""
+
+    completion_tokens: int = 0
+    """Number of tokens in the intermediate completions."""
+
+    prompt_tokens: int = 0
+    """Number of tokens in the intermediate prompts."""
+
+    total_tokens: int = 0
+    """Total number of tokens used by the intermediate reduce calls."""
+
+    def add(self, usage: typing.Optional[Usage]) -> None:
+        """Adds the token usage of one intermediate reduce call."""
+        if usage is None:
+            return
+        self.completion_tokens += usage.completion_tokens
+        self.prompt_tokens += usage.prompt_tokens
+        self.total_tokens += usage.total_tokens
+
+
 class Message(pydantic.BaseModel):
     content: typing.Union[str, typing.Dict[str, typing.Any], typing.List[typing.Dict[str, typing.Any]], None] = None
     """The contents of the message."""
@@ -21,3 +21,7 @@ class SearchResultChunkVerbose(_search_chunk.SearchResultChunk):
     ] = None
 
     reduce_context_text: typing.Optional[typing.Union[str, typing.List[str], typing.Dict[str, str]]] = None
+
+    cache_usage: typing.Optional[_search.CacheUsage] = None
+
+    reduce_usage: typing.Optional[_search.ReduceUsage] = None
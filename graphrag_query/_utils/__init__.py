@@ -1,21 +1,59 @@
 from __future__ import annotations
 
 from . import _text as text
+from ._cache import (
+    BaseCache,
+    CacheStats,
+    LRUCache,
+    SQLiteCache,
+)
+from ._limiters import (
+    AdaptiveConcurrencyLimiter,
+    LimiterStats,
+    RateLimiter,
+    RateLimiterStats,
+    RateReservation,
+    get_rate_limiter,
+)
+from ._templates import (
+    PromptTemplate,
+    get_prompt_template,
+)
 from ._text import (
+    RenderedRow,
+    RenderedRows,
     chunk_text,
     combine_embeddings,
+    normalize_text,
     num_tokens,
 )
 from ._utils import (
+    JSONParseStats,
     deserialize_json,
     filter_kwargs,
 )
 
 __all__ = [
     "text",
+    "BaseCache",
+    "CacheStats",
+    "LRUCache",
+    "SQLiteCache",
+    "AdaptiveConcurrencyLimiter",
+    "LimiterStats",
+    "RateLimiter",
+    "RateLimiterStats",
+    "RateReservation",
+    "get_rate_limiter",
+    "PromptTemplate",
+    "get_prompt_template",
+    "RenderedRow",
+    "RenderedRows",
+    "JSONParseStats",
     "deserialize_json",
     "filter_kwargs",
     "chunk_text",
     "combine_embeddings",
+    "normalize_text",
     "num_tokens",
 ]
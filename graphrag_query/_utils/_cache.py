@@ -0,0 +1,372 @@
+from __future__ import annotations
+
+import abc
+import asyncio
+import collections
+import dataclasses
+import os
+import sqlite3
+import threading
+import time
+import typing
+
+_V = typing.TypeVar("_V")
+
+
+@dataclasses.dataclass
+class CacheStats:
+    """Counters describing how a cache has been used."""
+
+    hits: int = 0
+    """number of lookups answered from the cache"""
+
+    misses: int = 0
+    """number of lookups that found no (live) entry"""
+
+    evictions: int = 0
+    """number of entries dropped to respect the size cap"""
+
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of lookups answered from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class BaseCache(abc.ABC, typing.Generic[_V]):
+    """
+    The base class for key-value caches with hit/miss accounting.
+
+    The async methods run the sync ones on a worker thread when the backend
+    does blocking I/O (`blocking`), so a slow disk or a busy lock never stalls
+    the event loop, and inline otherwise.
+    """
+
+    # whether lookups and stores may block, e.g. on disk I/O or a file lock
+    blocking: typing.ClassVar[bool] = False
+
+    @abc.abstractmethod
+    def get(self, key: str) -> typing.Optional[_V]:
+        """Return the cached value for `key`, or None on a miss."""
+        ...
+
+    @abc.abstractmethod
+    def set(self, key: str, value: _V) -> None:
+        """Store `value` under `key`, evicting entries if the cache is full."""
+        ...
+
+    def get_many(self, keys: typing.Sequence[str]) -> typing.List[typing.Optional[_V]]:
+        """Return the cached values for `keys`, with None for each miss."""
+        return [self.get(key) for key in keys]
+
+    def set_many(self, items: typing.Sequence[typing.Tuple[str, _V]]) -> None:
+        """Store several key-value pairs."""
+        for key, value in items:
+            self.set(key, value)
+
+    async def aget(self, key: str) -> typing.Optional[_V]:
+        """Asynchronous version of `get`."""
+        if self.blocking:
+            return await asyncio.to_thread(self.get, key)
+        return self.get(key)
+
+    async def aset(self, key: str, value: _V) -> None:
+        """Asynchronous version of `set`."""
+        if self.blocking:
+            await asyncio.to_thread(self.set, key, value)
+        else:
+            self.set(key, value)
+
+    async def aget_many(self, keys: typing.Sequence[str]) -> typing.List[typing.Optional[_V]]:
+        """Asynchronous version of `get_many`."""
+        if self.blocking:
+            return await asyncio.to_thread(self.get_many, keys)
+        return self.get_many(keys)
+
+    async def aset_many(self, items: typing.Sequence[typing.Tuple[str, _V]]) -> None:
+        """Asynchronous version of `set_many`."""
+        if self.blocking:
+            await asyncio.to_thread(self.set_many, items)
+        else:
+            self.set_many(items)
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        ...
+
+    @property
+    @abc.abstractmethod
+    def stats(self) -> CacheStats:
+        """A snapshot of the hit/miss/eviction counters."""
+        ...
+
+    @abc.abstractmethod
+    def __len__(self) -> int: ...
+
+
+class LRUCache(BaseCache[_V]):
+    """
+    Thread-safe in-memory cache bounded by entry count, with least recently
+    used eviction and an optional time-to-live.
+
+    Attributes:
+        max_size: The maximum number of entries kept in memory.
+        ttl:
+            Optional number of seconds after which an entry is considered
+            stale and is dropped on the next lookup.
+    """
+    max_size: int
+    ttl: typing.Optional[float]
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: typing.Optional[float] = None,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: collections.OrderedDict[str, typing.Tuple[float, _V]] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def get(self, key: str) -> typing.Optional[_V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (self.ttl is not None and self._clock() - entry[0] > self.ttl):
+                if entry is not None:
+                    del self._entries[key]
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: _V) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats = CacheStats()
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return dataclasses.replace(self._stats)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(max_size={self.max_size}, ttl={self.ttl}, size={len(self)})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+class SQLiteCache(BaseCache[_V]):
+    """
+    On-disk cache stored in a SQLite database, shared by every process that
+    opens the same file.
+
+    The database runs in WAL mode, so readers never block each other or the
+    single writer, and a busy timeout serializes concurrent writers across
+    worker processes. Each thread (and each forked process) uses its own
+    connection. Entries are evicted least recently used first once the row
+    count exceeds `max_size`; the check is amortized over inserts, so the table
+    may briefly overshoot the cap by about one percent. Hit/miss counters are
+    local to the current process. The async methods run on worker threads.
+
+    Attributes:
+        path: The path of the SQLite database file.
+        max_size: The maximum number of entries kept on disk.
+        ttl:
+            Optional number of seconds after which an entry is considered
+            stale and is dropped on the next lookup.
+    """
+    path: str
+    max_size: int
+    ttl: typing.Optional[float]
+
+    blocking: typing.ClassVar[bool] = True
+
+    # Refreshing the access time is a write, so it is skipped for entries touched recently
+    _TOUCH_INTERVAL: typing.ClassVar[float] = 60.0
+    # Stays below SQLITE_MAX_VARIABLE_NUMBER of older SQLite builds
+    _MAX_VARIABLES: typing.ClassVar[int] = 900
+
+    def __init__(
+        self,
+        path: typing.Union[str, os.PathLike[str]],
+        *,
+        encode: typing.Callable[[_V], bytes],
+        decode: typing.Callable[[bytes], _V],
+        max_size: int = 100_000,
+        ttl: typing.Optional[float] = None,
+        timeout: float = 30.0,
+        clock: typing.Callable[[], float] = time.time,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.path = os.fspath(path)
+        self.max_size = max_size
+        self.ttl = ttl
+        self._encode = encode
+        self._decode = decode
+        self._timeout = timeout
+        self._clock = clock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+        self._inserts = 0
+        self._evict_every = max(1, max_size // 100)
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at);
+            """
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self._timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key: str) -> typing.Optional[_V]:
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT value, created_at, accessed_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        now = self._clock()
+        if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+            connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+            row = None
+        with self._lock:
+            if row is None:
+                self._stats.misses += 1
+                return None
+            self._stats.hits += 1
+        if now - row[2] > self._TOUCH_INTERVAL:
+            connection.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return self._decode(row[0])
+
+    def get_many(self, keys: typing.Sequence[str]) -> typing.List[typing.Optional[_V]]:
+        """Return the cached values for `keys` with one query per few hundred keys."""
+        connection = self._connection()
+        unique = list(dict.fromkeys(keys))
+        rows: typing.Dict[str, typing.Tuple[bytes, float, float]] = {}
+        for i in range(0, len(unique), self._MAX_VARIABLES):
+            chunk = unique[i:i + self._MAX_VARIABLES]
+            rows.update(
+                (row[0], row[1:]) for row in connection.execute(
+                    f"SELECT key, value, created_at, accessed_at FROM cache "
+                    f"WHERE key IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+        now = self._clock()
+        if self.ttl is not None:
+            stale = [key for key, row in rows.items() if now - row[1] > self.ttl]
+            if stale:
+                connection.executemany("DELETE FROM cache WHERE key = ?", ((key,) for key in stale))
+                for key in stale:
+                    del rows[key]
+        touched = [key for key, row in rows.items() if now - row[2] > self._TOUCH_INTERVAL]
+        if touched:
+            connection.executemany("UPDATE cache SET accessed_at = ? WHERE key = ?", ((now, key) for key in touched))
+        hits = sum(key in rows for key in keys)
+        with self._lock:
+            self._stats.hits += hits
+            self._stats.misses += len(keys) - hits
+        decoded = {key: self._decode(row[0]) for key, row in rows.items()}
+        return [decoded.get(key) for key in keys]
+
+    def set(self, key: str, value: _V) -> None:
+        now = self._clock()
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, sqlite3.Binary(self._encode(value)), now, now),
+        )
+        self._maybe_evict(connection, 1)
+
+    def set_many(self, items: typing.Sequence[typing.Tuple[str, _V]]) -> None:
+        """Store several key-value pairs in one transaction."""
+        if not items:
+            return
+        now = self._clock()
+        rows = [(key, sqlite3.Binary(self._encode(value)), now, now) for key, value in items]
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)", rows
+            )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        self._maybe_evict(connection, len(rows))
+
+    def _maybe_evict(self, connection: sqlite3.Connection, inserted: int) -> None:
+        with self._lock:
+            before = self._inserts
+            self._inserts += inserted
+            evict = self._inserts // self._evict_every > before // self._evict_every
+        if evict:
+            evicted = connection.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,),
+            ).rowcount
+            with self._lock:
+                self._stats.evictions += max(evicted, 0)
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM cache")
+        with self._lock:
+            self._stats = CacheStats()
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return dataclasses.replace(self._stats)
+
+    def close(self) -> None:
+        """Close the connection held by the current thread."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(path={self.path}, max_size={self.max_size}, ttl={self.ttl})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
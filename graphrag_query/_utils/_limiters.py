@@ -0,0 +1,404 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import dataclasses
+import threading
+import time
+import typing
+
+
+@dataclasses.dataclass
+class LimiterStats:
+    """A snapshot of an adaptive concurrency limiter."""
+
+    limit: int
+    """the current concurrency limit"""
+
+    in_flight: int
+    """number of requests holding a slot"""
+
+    waiting: int
+    """number of requests waiting for a slot"""
+
+    rate_limited: int
+    """number of rate-limited (429) responses seen"""
+
+    decreases: int
+    """number of times the limit was cut"""
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Asyncio concurrency limiter whose limit follows the capacity of the
+    upstream service with additive-increase/multiplicative-decrease (AIMD).
+
+    Every successful request raises the limit by `increase / limit`, that is by
+    about `increase` per round of `limit` requests. The limit is cut by
+    `decrease_factor` when a request is rate limited or times out. Failures of
+    requests sent before the last cut belong to the round that caused it and
+    do not cut again, so a burst of failures counts once. A retry-after hint
+    also pauses every new request until it expires.
+
+    Latency is not a congestion signal here: the latency of an LLM request
+    mostly follows the length of its output, so it varies widely on a healthy
+    service.
+
+    The limiter is meant to be shared by everything that calls the same
+    upstream service, e.g. by being attached to the chat LLM.
+
+    Attributes:
+        min_limit: The lowest concurrency limit.
+        max_limit: The highest concurrency limit.
+        increase: The additive increase per round of requests.
+        decrease_factor: The multiplicative decrease on congestion.
+        clock:
+            The monotonic clock of the limiter, which also tells when a
+            request was sent.
+    """
+    min_limit: int
+    max_limit: int
+    increase: float
+    decrease_factor: float
+    clock: typing.Callable[[], float]
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("Expected 1 <= min_limit <= initial_limit <= max_limit")
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor must be in (0, 1)")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.clock = clock
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._waiters: typing.Deque[asyncio.Future[None]] = collections.deque()
+        self._blocked_until = 0.0
+        self._last_decrease = -float("inf")
+        self._rate_limited = 0
+        self._decreases = 0
+
+    @property
+    def limit(self) -> int:
+        """The current concurrency limit."""
+        return int(self._limit)
+
+    @property
+    def stats(self) -> LimiterStats:
+        return LimiterStats(
+            limit=self.limit,
+            in_flight=self._in_flight,
+            waiting=len(self._waiters),
+            rate_limited=self._rate_limited,
+            decreases=self._decreases,
+        )
+
+    async def acquire(self) -> None:
+        """Wait for a free slot (and for any retry-after pause to expire)."""
+        while True:
+            delay = self._blocked_until - self.clock()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            if self._in_flight < self.limit and not self._waiters:
+                self._in_flight += 1
+                return
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                self._waiters.remove(waiter)
+                # a wake-up this waiter can no longer use goes to the next one
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+            self._waiters.remove(waiter)
+            if self._blocked_until <= self.clock() and self._in_flight < self.limit:
+                self._in_flight += 1
+                return
+            # woken up but the slot is gone, e.g. the limit was cut meanwhile
+            self._wake()
+
+    def release(self) -> None:
+        """Free a slot taken by `acquire`."""
+        self._in_flight -= 1
+        self._wake()
+
+    def on_success(self) -> None:
+        """Record a successful request."""
+        self._limit = min(self._limit + self.increase / self._limit, float(self.max_limit))
+        self._wake()
+
+    def on_rate_limited(
+        self,
+        retry_after: typing.Optional[float] = None,
+        *,
+        sent_at: typing.Optional[float] = None,
+    ) -> None:
+        """
+        Record a rate-limited request.
+
+        Args:
+            retry_after: The server's retry-after hint in seconds, if any.
+            sent_at:
+                When the request was sent, read from `clock`; None counts it
+                as sent after the last cut.
+        """
+        self._rate_limited += 1
+        if retry_after is not None and retry_after > 0:
+            self._blocked_until = max(self._blocked_until, self.clock() + retry_after)
+        self._decrease(sent_at)
+
+    def on_timeout(self, *, sent_at: typing.Optional[float] = None) -> None:
+        """
+        Record a request that timed out.
+
+        Args:
+            sent_at: See `on_rate_limited`.
+        """
+        self._decrease(sent_at)
+
+    def _decrease(self, sent_at: typing.Optional[float]) -> None:
+        if sent_at is not None and sent_at <= self._last_decrease:
+            return
+        self._last_decrease = self.clock()
+        self._decreases += 1
+        self._limit = max(self._limit * self.decrease_factor, float(self.min_limit))
+
+    def _wake(self) -> None:
+        free = self.limit - self._in_flight
+        for waiter in list(self._waiters)[:max(free, 0)]:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, *args: typing.Any) -> None:
+        self.release()
+
+    def __str__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(limit={self.limit}, min_limit={self.min_limit}, "
+            f"max_limit={self.max_limit})"
+        )
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+@dataclasses.dataclass(frozen=True)
+class RateReservation:
+    """Capacity reserved from a rate limiter for one request."""
+
+    tokens: int
+    """the tokens reserved, capped to the per-minute quota"""
+
+    delay: float
+    """seconds to wait before sending the request"""
+
+
+@dataclasses.dataclass
+class RateLimiterStats:
+    """A snapshot of a rate limiter."""
+
+    requests: int
+    """number of reservations made"""
+
+    reserved_tokens: int
+    """tokens reserved before sending, i.e. the estimates"""
+
+    used_tokens: int
+    """tokens reported back after the responses"""
+
+    waited: float
+    """total seconds requests were told to wait"""
+
+
+class _TokenBucket:
+    __slots__ = ("capacity", "rate", "level", "updated")
+
+    def __init__(self, per_minute: int, now: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60
+        self.level = self.capacity
+        self.updated = now
+
+    def take(self, amount: float, now: float) -> float:
+        """Takes `amount`, going into debt if needed; returns the wait until the debt is paid."""
+        self.level = min(self.level + (now - self.updated) * self.rate, self.capacity)
+        self.updated = now
+        self.level -= amount
+        return max(-self.level / self.rate, 0.0)
+
+    def give(self, amount: float) -> None:
+        self.level = min(self.level + amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    Client-side limiter for requests-per-minute (RPM) and tokens-per-minute
+    (TPM) quotas, made of two token buckets that refill continuously.
+
+    A request reserves one request and its estimated tokens up front. When the
+    buckets run dry, the reservation still succeeds but tells the caller how
+    long to wait, so concurrent callers queue in reservation order without
+    polling. Once the response arrives, `reconcile` corrects the token bucket
+    with the actual usage.
+
+    The state is guarded by a lock, so one limiter can be shared by threads
+    and event loops alike; see `get_rate_limiter` for sharing it process-wide.
+
+    Attributes:
+        requests_per_minute: The RPM quota, or None for no request limit.
+        tokens_per_minute: The TPM quota, or None for no token limit.
+    """
+    requests_per_minute: typing.Optional[int]
+    tokens_per_minute: typing.Optional[int]
+
+    def __init__(
+        self,
+        requests_per_minute: typing.Optional[int] = None,
+        tokens_per_minute: typing.Optional[int] = None,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        if requests_per_minute is not None and requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        if tokens_per_minute is not None and tokens_per_minute <= 0:
+            raise ValueError("tokens_per_minute must be positive")
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._clock = clock
+        self._lock = threading.Lock()
+        now = clock()
+        self._requests = _TokenBucket(requests_per_minute, now) if requests_per_minute else None
+        self._tokens = _TokenBucket(tokens_per_minute, now) if tokens_per_minute else None
+        self._stats = RateLimiterStats(requests=0, reserved_tokens=0, used_tokens=0, waited=0.0)
+
+    @property
+    def stats(self) -> RateLimiterStats:
+        with self._lock:
+            return dataclasses.replace(self._stats)
+
+    def reserve(self, tokens: int = 0) -> RateReservation:
+        """
+        Reserves capacity for one request without waiting.
+
+        Args:
+            tokens: The estimated number of tokens of the request.
+
+        Returns:
+            The reservation, telling how long to wait before sending.
+        """
+        with self._lock:
+            now = self._clock()
+            if self.tokens_per_minute is not None:
+                # a request larger than the quota would never fit, it waits for a full bucket instead
+                tokens = min(tokens, self.tokens_per_minute)
+            delay = 0.0
+            if self._requests is not None:
+                delay = self._requests.take(1, now)
+            if self._tokens is not None:
+                delay = max(delay, self._tokens.take(tokens, now))
+            self._stats.requests += 1
+            self._stats.reserved_tokens += tokens
+            self._stats.waited += delay
+            return RateReservation(tokens=tokens, delay=delay)
+
+    def reconcile(self, reservation: RateReservation, used_tokens: int) -> None:
+        """
+        Corrects the token bucket once the actual usage of a request is known.
+
+        Args:
+            reservation: The reservation of the request.
+            used_tokens: The tokens the request actually used.
+        """
+        with self._lock:
+            self._stats.used_tokens += used_tokens
+            if self._tokens is not None:
+                self._tokens.give(reservation.tokens - used_tokens)
+
+    def cancel(self, reservation: RateReservation) -> None:
+        """Returns the capacity of a reservation whose request was never sent."""
+        with self._lock:
+            if self._requests is not None:
+                self._requests.give(1)
+            if self._tokens is not None:
+                self._tokens.give(reservation.tokens)
+
+    def acquire(self, tokens: int = 0, sleep: typing.Callable[[float], None] = time.sleep) -> RateReservation:
+        """Reserves capacity for one request and blocks until it may be sent."""
+        reservation = self.reserve(tokens)
+        if reservation.delay > 0:
+            try:
+                sleep(reservation.delay)
+            except BaseException:
+                self.cancel(reservation)
+                raise
+        return reservation
+
+    async def aacquire(self, tokens: int = 0) -> RateReservation:
+        """Reserves capacity for one request and waits until it may be sent."""
+        reservation = self.reserve(tokens)
+        if reservation.delay > 0:
+            try:
+                await asyncio.sleep(reservation.delay)
+            except BaseException:
+                self.cancel(reservation)
+                raise
+        return reservation
+
+    def __str__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(requests_per_minute={self.requests_per_minute}, "
+            f"tokens_per_minute={self.tokens_per_minute})"
+        )
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+_rate_limiters: typing.Dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    key: str,
+    *,
+    requests_per_minute: typing.Optional[int] = None,
+    tokens_per_minute: typing.Optional[int] = None,
+) -> RateLimiter:
+    """
+    Returns the process-wide rate limiter of a quota, creating it on first use.
+
+    Quotas are enforced per account and model by the provider, so every client
+    of the process calling the same model should draw from the same limiter.
+    The quotas given on first use win.
+
+    Args:
+        key: The quota identifier, e.g. the base URL and model.
+        requests_per_minute: The RPM quota, or None for no request limit.
+        tokens_per_minute: The TPM quota, or None for no token limit.
+
+    Returns:
+        The shared rate limiter.
+    """
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(key)
+        if limiter is None:
+            limiter = _rate_limiters[key] = RateLimiter(
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
+            )
+        return limiter
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import functools
+import re
+import typing
+
+import jinja2
+
+# a prompt made only of literal text and `{{ name }}` placeholders
+_PLACEHOLDER = re.compile(r"{{\s*([A-Za-z_][A-Za-z0-9_]*)\s*}}")
+_JINJA_SYNTAX = re.compile(r"{{|{%|{#|\r")
+
+
+class PromptTemplate:
+    """
+    A prompt template compiled once and rendered many times.
+
+    Prompts that only substitute plain `{{ name }}` placeholders are split into
+    literal parts at compile time and rendered by joining them with the
+    values, which gives the same text as Jinja without going through it. Any
+    other prompt is compiled into a `jinja2.Template`.
+
+    Attributes:
+        source: The template source.
+    """
+    source: str
+
+    __slots__ = ("source", "_literals", "_names", "_template")
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self._literals: typing.Optional[typing.List[str]] = None
+        self._names: typing.List[str] = []
+        self._template: typing.Optional[jinja2.Template] = None
+
+        literals = _PLACEHOLDER.split(source)
+        # split() alternates literal text and captured names
+        if any(_JINJA_SYNTAX.search(literal) for literal in literals[::2]):
+            self._template = jinja2.Template(source)
+            return
+        self._literals = literals[::2]
+        self._names = literals[1::2]
+        # like Jinja, drop a single trailing newline
+        if self._literals[-1].endswith("\n"):
+            self._literals[-1] = self._literals[-1][:-1]
+
+    @property
+    def is_simple(self) -> bool:
+        """Whether the template renders without Jinja."""
+        return self._template is None
+
+    def render(self, **variables: typing.Any) -> str:
+        """
+        Renders the template.
+
+        Args:
+            **variables: The values of the template variables; missing ones render as an empty string.
+
+        Returns:
+            The rendered prompt.
+        """
+        if self._template is not None:
+            return self._template.render(**variables)
+        literals = typing.cast(typing.List[str], self._literals)
+        parts = [literals[0]]
+        for name, literal in zip(self._names, literals[1:]):
+            value = variables.get(name)
+            parts.append("" if value is None and name not in variables else str(value))
+            parts.append(literal)
+        return "".join(parts)
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(source={self.source[:50]!r}{'...' if len(self.source) > 50 else ''})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+@functools.lru_cache(maxsize=256)
+def get_prompt_template(source: str) -> PromptTemplate:
+    """
+    Returns the compiled template of a prompt, compiling it on first use.
+
+    The registry is process-wide and keyed by the prompt text, so engines
+    sharing a prompt share its compiled template, and prompts overridden per
+    search are compiled once as well.
+
+    Args:
+        source: The template source.
+
+    Returns:
+        The compiled template.
+    """
+    return PromptTemplate(source)
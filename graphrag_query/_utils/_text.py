@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import threading
 import typing
 import itertools
 
@@ -35,7 +36,106 @@ def combine_embeddings(embeddings: typing.List[typing.List[float]], lengths: typ
     return embeddings_.tolist()
 
 
+def normalize_text(text: str) -> str:
+    """Collapse runs of whitespace and strip the ends, so trivially different
+    spellings of the same text share a cache entry."""
+    return " ".join(text.split())
+
+
 def num_tokens(text: str, token_encoder: typing.Optional[tiktoken.Encoding] = None) -> int:
     """Return the number of tokens in the given text."""
     token_encoder = token_encoder or tiktoken.get_encoding("cl100k_base")
     return token_encoder.encode(text).__len__()
+
+
+class RenderedRow(typing.NamedTuple):
+    """A context table row rendered from a static record."""
+
+    record: typing.List[str]
+    """the column values"""
+
+    text: str
+    """the rendered line, ending with a newline"""
+
+    tokens: int
+    """the number of tokens of `text`"""
+
+
+class RenderedRows:
+    """
+    The rendered rows of the static records of a context builder and their
+    token counts, keyed by record ID.
+
+    Context tables are made of rows rendered from static index data. Each
+    table of rows is rendered once per token encoder, column delimiter and
+    set of column settings: the builder renders its default tables when it
+    loads the data, and a query with other settings renders a table the
+    first time. Packing a row into a token budget afterwards is a lookup by
+    record ID. Tables are never modified once built, so lookups take no lock.
+
+    Attributes:
+        token_encoder: The token encoder, or None for cl100k_base.
+    """
+    token_encoder: typing.Optional[tiktoken.Encoding]
+
+    def __init__(
+        self,
+        sources: typing.Mapping[str, typing.Sequence[typing.Any]],
+        token_encoder: typing.Optional[tiktoken.Encoding] = None,
+    ) -> None:
+        """
+        Args:
+            sources:
+                The static records of each kind of table (e.g. "entities"),
+                each record having an `id`.
+            token_encoder: The token encoder, or None for cl100k_base.
+        """
+        self.token_encoder = token_encoder
+        self._sources = sources
+        self._tables: typing.Dict[typing.Hashable, typing.Dict[str, RenderedRow]] = {}
+        self._lock = threading.Lock()
+
+    def table(
+        self,
+        kind: str,
+        settings: typing.Hashable,
+        column_delimiter: str,
+        render: typing.Callable[[typing.Any], typing.List[str]],
+    ) -> typing.Mapping[str, RenderedRow]:
+        """
+        Returns the rows of the records of `kind`, rendering them the first
+        time the table is asked for with `settings`.
+
+        Args:
+            kind: The kind of records, a key of `sources`.
+            settings:
+                The column settings `render` depends on, besides the column
+                delimiter.
+            column_delimiter: The delimiter that joins the column values.
+            render: Returns the column values of a record.
+
+        Returns:
+            The rows keyed by record ID; empty for an unknown kind.
+        """
+        key = (kind, column_delimiter, settings)
+        rows = self._tables.get(key)
+        if rows is None:
+            with self._lock:
+                rows = self._tables.get(key)
+                if rows is None:
+                    rows = {}
+                    for record in self._sources.get(kind, ()):
+                        values = render(record)
+                        text = column_delimiter.join(values) + "\n"
+                        rows[record.id] = RenderedRow(values, text, num_tokens(text, self.token_encoder))
+                    self._tables[key] = rows
+        return rows
+
+    def __str__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(token_encoder={self.token_encoder}, "
+            f"sources={ {kind: len(records) for kind, records in self._sources.items()} }, tables={len(self._tables)})"
+        )
+
+    def __repr__(self) -> str:
+        return self.__str__()
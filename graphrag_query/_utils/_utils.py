@@ -1,12 +1,21 @@
 from __future__ import annotations
 
+import dataclasses
 import inspect
 import json
+import re
+import threading
+import time
 import typing
 import warnings
 
 import json_repair
 
+try:
+    import orjson as _orjson
+except ImportError:  # optional faster decoder
+    _orjson = None
+
 
 def filter_kwargs(
     func: typing.Callable,
@@ -40,31 +49,143 @@ def filter_kwargs(
     }
 
 
-def deserialize_json(json_: str) -> typing.Dict[str, typing.Any]:
+@dataclasses.dataclass
+class JSONParseStats:
+    """Counters describing how LLM responses were parsed as JSON."""
+
+    parsed: int = 0
+    """number of responses parsed"""
+
+    direct: int = 0
+    """responses that were valid JSON as they are"""
+
+    extracted: int = 0
+    """responses whose JSON object was cut out of fenced or surrounding text"""
+
+    salvaged: int = 0
+    """truncated responses whose complete `points` were pulled out one by one"""
+
+    repaired: int = 0
+    """responses that needed json_repair"""
+
+    failed: int = 0
+    """responses no JSON object could be read from"""
+
+    parse_time: float = 0.0
+    """total seconds spent parsing"""
+
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def repair_rate(self) -> float:
+        """Fraction of responses that needed json_repair."""
+        return self.repaired / self.parsed if self.parsed else 0.0
+
+    @property
+    def mean_parse_time(self) -> float:
+        """Mean seconds spent parsing a response."""
+        return self.parse_time / self.parsed if self.parsed else 0.0
+
+    def record(self, method: str, elapsed: float) -> None:
+        with self._lock:
+            self.parsed += 1
+            setattr(self, method, getattr(self, method) + 1)
+            self.parse_time += elapsed
+
+
+_FENCE = re.compile(r"```[A-Za-z]*\s*(.*?)```", re.DOTALL)
+_POINTS_ARRAY = re.compile(r'"points"\s*:\s*\[')
+_decoder = json.JSONDecoder()
+
+
+def _loads(json_: str) -> typing.Any:
+    return _orjson.loads(json_) if _orjson is not None else json.loads(json_)
+
+
+def _extract_object(json_: str) -> typing.Optional[typing.Dict[str, typing.Any]]:
+    """Decodes the first complete JSON object of a fenced block, or of the text after a prefix."""
+    fenced = _FENCE.search(json_)
+    candidates = [fenced.group(1), json_] if fenced else [json_]
+    for text in candidates:
+        start = text.find("{")
+        while start != -1:
+            try:
+                result, _ = _decoder.raw_decode(text, start)
+            except json.JSONDecodeError as e:
+                # objects nested in the broken one are not candidates
+                start = text.find("{", max(e.pos, start + 1))
+                continue
+            if isinstance(result, dict):
+                return result
+            start = text.find("{", start + 1)
+    return None
+
+
+def _salvage_points(json_: str) -> typing.Optional[typing.Dict[str, typing.Any]]:
+    """Decodes the complete elements of a (possibly truncated) `points` array one by one."""
+    match = _POINTS_ARRAY.search(json_)
+    if match is None:
+        return None
+    points = []
+    idx = match.end()
+    while True:
+        while idx < len(json_) and json_[idx] in " \t\r\n,":
+            idx += 1
+        if idx >= len(json_) or json_[idx] == "]":
+            break
+        try:
+            point, idx = _decoder.raw_decode(json_, idx)
+        except json.JSONDecodeError:
+            break
+        points.append(point)
+    return {"points": points} if points else None
+
+
+def deserialize_json(json_: str, stats: typing.Optional[JSONParseStats] = None) -> typing.Dict[str, typing.Any]:
     """
     Deserialize a JSON string, repairing it if necessary.
 
-    This function deserializes a JSON string, repairing it if necessary. If the JSON string
-    is malformed, it is repaired using the provided repair_json function. The repaired JSON
-    string is then deserialized and returned as a dictionary.
+    The cheapest decoding that works is used:
+
+    1. the whole string, with orjson if it is installed;
+    2. the first complete object of a fenced code block, or after a prefix
+       (trailing text is ignored);
+    3. the complete elements of a truncated `points` array;
+    4. json_repair, as a last resort.
 
     Args:
         json_: The JSON string to deserialize.
+        stats: Optional counters updated with the decoding used and its time.
 
     Returns:
         The deserialized JSON string as a dictionary.
     """
-
+    start = time.perf_counter()
+    method = "direct"
+    result: typing.Any
     try:
-        result = json.loads(json_)
-    except json.JSONDecodeError:
-        # Fixup potentially malformed json string using json_repair.
-        try:
-            result = json_repair.repair_json(json_str=json_, return_objects=True)
-        except json.JSONDecodeError:
-            warnings.warn(f"Error loading JSON: {json_}", RuntimeWarning)
-            return {}
+        result = _loads(json_)
+    except ValueError:  # json.JSONDecodeError and orjson.JSONDecodeError
+        result = _extract_object(json_)
+        method = "extracted"
+        if result is None:
+            result = _salvage_points(json_)
+            method = "salvaged"
+        if result is None:
+            # Fixup potentially malformed json string using json_repair.
+            method = "repaired"
+            try:
+                result = json_repair.repair_json(json_str=json_, return_objects=True)
+            except json.JSONDecodeError:
+                result = None
     if not isinstance(result, dict):
-        warnings.warn(f"Unexpected type: {type(result)}", RuntimeWarning)
+        if result is None:
+            warnings.warn(f"Error loading JSON: {json_}", RuntimeWarning)
+        else:
+            warnings.warn(f"Unexpected type: {type(result)}", RuntimeWarning)
+        if stats is not None:
+            stats.record("failed", time.perf_counter() - start)
         return {}
+    if stats is not None:
+        stats.record(method, time.perf_counter() - start)
     return result
@@ -5,11 +5,13 @@ from ._base_vector_store import (
     VectorStoreDocument,
     VectorStoreSearchResult,
 )
+from ._in_memory import InMemoryVectorStore
 from ._lancedb import LanceDBVectorStore
 
 __all__ = [
     "BaseVectorStore",
     "VectorStoreDocument",
     "VectorStoreSearchResult",
+    "InMemoryVectorStore",
     "LanceDBVectorStore",
 ]
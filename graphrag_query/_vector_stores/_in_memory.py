@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import time
+import typing
+
+import numpy as np
+import typing_extensions
+
+from . import _base_vector_store
+
+Quantization_T = typing.Literal["int8", "binary"]
+
+# int8 codes are converted to float32 in blocks of about this size, small
+# enough to stay in cache between the conversion and the matmul
+_SCAN_BLOCK_BYTES = 1 << 20
+
+# candidates per requested result taken for re-ranking; sign bits rank
+# coarsely, so binary codes need a deeper candidate list
+_DEFAULT_OVERSAMPLE: typing.Dict[str, int] = {"int8": 4, "binary": 16}
+
+
+class InMemoryVectorStore(_base_vector_store.BaseVectorStore):
+    """
+    In-process vector storage with an optional quantized index.
+
+    Vectors are L2-normalized and kept as float32, so scores are cosine
+    similarities. With `quantization` set, searches first scan a compact code
+    matrix (int8 scalar codes, or one sign bit per dimension for "binary") to
+    pick `k * oversample_scaler` candidates, and only those candidates are
+    re-ranked exactly against the float32 vectors. The scan touches 4x (int8)
+    or 32x (binary) fewer bytes than a float32 scan.
+
+    Re-ranking needs the float32 vectors, so the codes come on top of them and
+    the store grows rather than shrinks. With `rerank=False` the float32
+    vectors are dropped once the codes are built, cutting the resident size to
+    about 1/4 (int8) or 1/32 (binary) at the cost of recall; the scores are
+    then estimated from the codes.
+
+    The two modes serve different ends. "binary" with re-ranking is the fast
+    mode: its scan reads 32x fewer bytes and, with the default oversampling,
+    keeps the exact top k. "int8" is a memory mode, meant for `rerank=False`:
+    numpy has no integer matmul fast path, so its scan converts the codes back
+    to float32 block by block and runs no faster than the exact scan.
+
+    Attributes:
+        quantization: The quantization mode, or None for an exact float scan.
+        oversample_scaler:
+            How many candidates per requested result are taken from the
+            quantized scan for exact re-ranking; defaults to 4 for int8 and 16
+            for binary codes.
+        rerank:
+            Whether to keep the float32 vectors and re-rank the candidates of
+            the quantized scan exactly.
+    """
+    collection_name: str
+    quantization: typing.Optional[Quantization_T]
+    oversample_scaler: int
+    rerank: bool
+    query_filter: typing.Optional[typing.Set[str]] = None
+
+    def __init__(
+        self,
+        collection_name: str,
+        quantization: typing.Optional[Quantization_T] = None,
+        oversample_scaler: typing.Optional[int] = None,
+        rerank: bool = True,
+        **kwargs: typing.Any,
+    ) -> None:
+        """Initialize the in-memory vector storage."""
+        if quantization not in (None, "int8", "binary"):
+            raise ValueError(f"Invalid quantization: {quantization}")
+        if oversample_scaler is None:
+            oversample_scaler = _DEFAULT_OVERSAMPLE.get(quantization or "", 1)
+        if oversample_scaler < 1:
+            raise ValueError("oversample_scaler must be at least 1")
+        if not rerank and quantization is None:
+            raise ValueError("rerank=False requires a quantization mode")
+        super().__init__(collection_name, **kwargs)
+        self.quantization = quantization
+        self.oversample_scaler = oversample_scaler
+        self.rerank = rerank
+        self._documents: typing.List[_base_vector_store.VectorStoreDocument] = []
+        self._dim = 0
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._codes = np.empty((0, 0), dtype=np.int8)
+        self._scales = np.empty((0,), dtype=np.float32)
+        self._filter_mask: typing.Optional[np.ndarray] = None
+
+    @typing_extensions.override
+    def load_documents(
+        self, documents: typing.List[_base_vector_store.VectorStoreDocument], overwrite: bool = True
+    ) -> None:
+        """Load documents into vector storage and (re)build the quantized index."""
+        documents = [document for document in documents if document.vector is not None]
+        vectors = (
+            np.asarray([document.vector for document in documents], dtype=np.float32)
+            if documents else np.empty((0, self._dim), dtype=np.float32)
+        )
+        if vectors.size:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        stored = [
+            _base_vector_store.VectorStoreDocument(
+                id=str(document.id), text=document.text, vector=None, attributes=document.attributes
+            ) for document in documents
+        ]
+        if overwrite or not self._documents:
+            self._documents = stored
+        else:
+            self._documents = self._documents + stored
+            # without the float32 vectors, the stored ones come back from their codes
+            vectors = np.vstack([self._vectors if self.rerank else self._decode(), vectors])
+        self._dim = vectors.shape[1]
+        self._vectors = vectors
+        self._build_codes()
+        if not self.rerank:
+            self._vectors = np.empty((0, self._dim), dtype=np.float32)
+        self.filter_by_id(list(self.query_filter or []))
+
+    @typing_extensions.override
+    def filter_by_id(self, include_ids: typing.Union[typing.List[str], typing.List[int]]) -> typing.Optional[str]:
+        """Restrict subsequent searches to the given document ids."""
+        if len(include_ids) == 0:
+            self.query_filter = None
+            self._filter_mask = None
+            return None
+        self.query_filter = {str(id_) for id_ in include_ids}
+        self._filter_mask = np.fromiter(
+            (document.id in self.query_filter for document in self._documents), dtype=bool, count=len(self._documents)
+        )
+        return f"id in ({', '.join(sorted(self.query_filter))})"
+
+    @typing_extensions.override
+    def similarity_search_by_vector(
+        self, query_embedding: typing.List[float], k: int = 10, **kwargs: typing.Any
+    ) -> typing.List[_base_vector_store.VectorStoreSearchResult]:
+        """Perform a vector-based similarity search."""
+        indices, scores = self._search(self._normalize(query_embedding), k)
+        return [
+            _base_vector_store.VectorStoreSearchResult(
+                document=_base_vector_store.VectorStoreDocument(
+                    id=self._documents[index].id,
+                    text=self._documents[index].text,
+                    vector=self._vector(index),
+                    attributes=self._documents[index].attributes,
+                ),
+                score=float(score),
+            ) for index, score in zip(indices, scores)
+        ]
+
+    @typing_extensions.override
+    def similarity_search_by_text(
+        self,
+        text: str,
+        text_embedder: typing.Callable[[str], typing.List[float]],
+        k: int = 10,
+        **kwargs: typing.Any
+    ) -> typing.List[_base_vector_store.VectorStoreSearchResult]:
+        """Perform a similarity search using a given input text."""
+        query_embedding = text_embedder(text)
+        if query_embedding:
+            return self.similarity_search_by_vector(query_embedding, k)
+        return []
+
+    @property
+    def nbytes(self) -> int:
+        """The resident size of the index (vectors, codes and scales) in bytes."""
+        return self._vectors.nbytes + self._codes.nbytes + self._scales.nbytes
+
+    def evaluate(
+        self,
+        query_embeddings: typing.Sequence[typing.Sequence[float]],
+        k: int = 10,
+        rerank: typing.Optional[bool] = None,
+    ) -> typing.Dict[str, float]:
+        """
+        Compare the quantized search against the exact float32 baseline.
+
+        The baseline needs the float32 vectors, so the store must keep them
+        (`rerank=True`); the search without re-ranking can still be measured
+        by passing `rerank=False` here.
+
+        Args:
+            query_embeddings: Sample query vectors to search with.
+            k: The number of results per query.
+            rerank: Whether the measured search re-ranks its candidates; defaults to the store setting.
+
+        Returns:
+            A dict with the mean recall@k of the quantized search, the mean
+            per-query latency (in seconds) of both searches and the resident
+            size of the index in bytes.
+        """
+        if not self.rerank:
+            raise ValueError("evaluate needs the float32 vectors, which are dropped with rerank=False")
+        rerank = self.rerank if rerank is None else rerank
+        recall, quantized_latency, exact_latency = 0.0, 0.0, 0.0
+        for query_embedding in query_embeddings:
+            query = self._normalize(query_embedding)
+
+            start = time.perf_counter()
+            exact, _ = self._top_k(self._masked(self._vectors @ query), k)
+            exact_latency += time.perf_counter() - start
+
+            start = time.perf_counter()
+            approx, _ = self._search(query, k, rerank=rerank)
+            quantized_latency += time.perf_counter() - start
+
+            if len(exact):
+                recall += len(set(exact.tolist()) & set(approx.tolist())) / len(exact)
+
+        n = max(len(query_embeddings), 1)
+        return {
+            "recall":            recall / n,
+            "quantized_latency": quantized_latency / n,
+            "exact_latency":     exact_latency / n,
+            "nbytes":            float(self.nbytes),
+        }
+
+    def _build_codes(self) -> None:
+        if self.quantization is None or self._vectors.size == 0:
+            self._codes = np.empty((0, 0), dtype=np.int8)
+            self._scales = np.empty((0,), dtype=np.float32)
+        elif self.quantization == "int8":
+            # symmetric per-dimension scalar quantization
+            max_abs = np.abs(self._vectors).max(axis=0)
+            self._scales = np.where(max_abs == 0, 1, max_abs / 127).astype(np.float32)
+            self._codes = np.round(self._vectors / self._scales).astype(np.int8)
+        else:
+            self._codes = np.packbits(self._vectors > 0, axis=1)
+
+    def _decode(self) -> np.ndarray:
+        """Approximates the float32 vectors from their codes."""
+        if self.quantization == "int8":
+            return self._codes.astype(np.float32) * self._scales
+        signs = np.unpackbits(self._codes, axis=1, count=self._dim).astype(np.float32) * 2 - 1
+        return signs / np.sqrt(max(self._dim, 1))
+
+    def _vector(self, index: int) -> typing.Optional[typing.List[float]]:
+        if self.rerank:
+            return self._vectors[index].tolist()
+        if self.quantization == "int8":
+            return (self._codes[index].astype(np.float32) * self._scales).tolist()
+        # sign bits say nothing about magnitudes
+        return None
+
+    def _normalize(self, query_embedding: typing.Sequence[float]) -> np.ndarray:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def _masked(self, scores: np.ndarray) -> np.ndarray:
+        if self._filter_mask is not None:
+            scores = np.where(self._filter_mask, scores, -np.inf)
+        return scores
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> typing.Tuple[np.ndarray, np.ndarray]:
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return np.empty((0,), dtype=np.int64), np.empty((0,), dtype=scores.dtype)
+        indices = np.argpartition(-scores, k - 1)[:k]
+        indices = indices[np.argsort(-scores[indices], kind="stable")]
+        return indices, scores[indices]
+
+    def _scan(self, query: np.ndarray) -> np.ndarray:
+        if self.quantization == "int8":
+            scaled = query * self._scales
+            rows = max(_SCAN_BLOCK_BYTES // (4 * max(self._dim, 1)), 1)
+            return np.concatenate([
+                self._codes[i:i + rows].astype(np.float32) @ scaled
+                for i in range(0, len(self._codes), rows)
+            ])
+        # binary: fewer differing sign bits means a smaller angle
+        query_bits = np.packbits(query > 0)
+        hamming = np.bitwise_count(np.bitwise_xor(self._codes, query_bits)).sum(axis=1, dtype=np.int32)
+        return -hamming.astype(np.float32)
+
+    def _estimate(self, scores: np.ndarray) -> np.ndarray:
+        """Turns scan scores into cosine similarity estimates."""
+        if self.quantization == "int8":
+            return scores
+        # the share of differing sign bits estimates the angle between the vectors
+        return np.cos(np.pi * -scores / max(self._dim, 1)).astype(np.float32)
+
+    def _search(
+        self, query: np.ndarray, k: int, rerank: typing.Optional[bool] = None
+    ) -> typing.Tuple[np.ndarray, np.ndarray]:
+        if not self._documents or k <= 0:
+            return np.empty((0,), dtype=np.int64), np.empty((0,), dtype=np.float32)
+        if self.quantization is None:
+            return self._top_k(self._masked(self._vectors @ query), k)
+        if not (self.rerank if rerank is None else rerank):
+            indices, scores = self._top_k(self._masked(self._scan(query)), k)
+            return indices, self._estimate(scores)
+
+        candidates, _ = self._top_k(self._masked(self._scan(query)), k * self.oversample_scaler)
+        exact_scores = self._vectors[candidates] @ query
+        order = np.argsort(-exact_scores, kind="stable")[:k]
+        return candidates[order], exact_scores[order]
+
+    @typing_extensions.override
+    def __str__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(collection_name={self.collection_name}, "
+            f"quantization={self.quantization}, rerank={self.rerank}, num_documents={len(self._documents)})"
+        )
@@ -42,3 +42,6 @@ class Constants:
 
     # Cache Splitter
     CACHE_SPLITTER = ':'
+
+    # Seconds between checks for a disconnected client while a search runs
+    DISCONNECT_POLL_INTERVAL = 0.5
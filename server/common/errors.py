@@ -96,3 +96,14 @@ class TooManyRequestsError(BaseAppError):
 class InternalServerError(BaseAppError):
     def __init__(self, message: str = http.HTTPStatus.INTERNAL_SERVER_ERROR.phrase):
         super().__init__(message, http.HTTPStatus.INTERNAL_SERVER_ERROR.value)
+
+
+class ClientClosedRequestError(BaseAppError):
+    # 499 is the nginx convention for a request abandoned by the client; it has no HTTPStatus member
+    def __init__(self, message: str = "Client Closed Request"):
+        super().__init__(message, 499)
+
+
+class GatewayTimeoutError(BaseAppError):
+    def __init__(self, message: str = http.HTTPStatus.GATEWAY_TIMEOUT.phrase):
+        super().__init__(message, http.HTTPStatus.GATEWAY_TIMEOUT.value)
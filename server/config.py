@@ -52,6 +52,12 @@ class Config(pydantic_settings.BaseSettings):
         pydantic.Field(..., min_items=1, repr=False)
     ] = []
 
+    # Request Configurations
+    request_timeout: typing.Annotated[
+        typing.Optional[float],
+        pydantic.Field(..., gt=0)
+    ] = None
+
     # GraphRAG Configurations
     graphrag_config_file: typing.Annotated[
         typing.Optional[str],
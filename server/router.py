@@ -3,52 +3,92 @@
 
 from __future__ import annotations
 
+import asyncio
 import typing
 
 import fastapi
 import openai
 
 import graphrag_query
-from server import dto
+from server import config, dto
 from server.common import const, context, errors, graphrag, utils
 
 _root = fastapi.APIRouter()
 
+_T = typing.TypeVar('_T')
 
-async def _parse_stream_response(response: graphrag_query.types.AsyncStreamResponse_T) -> typing.AsyncIterator[str]:
+
+async def _until_disconnected(
+    awaitable: typing.Awaitable[_T],
+    http_request: fastapi.Request,
+    timeout: typing.Optional[float] = None,
+) -> _T:
+    """
+    Awaits a search while watching the client. If the client disconnects or the timeout passes, the search is
+    cancelled, which cancels its in-flight LLM calls and semaphore waits.
+    """
+    task = asyncio.ensure_future(awaitable)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout is not None else None
+    try:
+        while True:
+            wait = const.Constants.DISCONNECT_POLL_INTERVAL
+            if deadline is not None:
+                wait = max(min(wait, deadline - loop.time()), 0)
+            done, _ = await asyncio.wait({task}, timeout=wait)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                raise errors.ClientClosedRequestError()
+            if deadline is not None and loop.time() >= deadline:
+                raise errors.GatewayTimeoutError()
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+async def _parse_stream_response(
+    response: graphrag_query.types.AsyncStreamResponse_T,
+) -> typing.AsyncIterator[str]:
     id_ = utils.gen_id(const.Constants.CHAT_ID_PREFIX)
-    async for chunk in response:
-        chunk = typing.cast(graphrag_query.SearchResultChunk, chunk)
-        data = dto.ChatCompletionChunkResponse(
-            id=id_,
-            choices=[dto.ChunkChoice(
-                finish_reason=chunk.choice.finish_reason,
-                index=0,
-                delta=dto.ChatCompletionMessage(
-                    content=chunk.choice.delta.content,
-                    refusal=chunk.choice.delta.refusal,
-                    role='assistant',
-                    function_call=None,
-                    tool_calls=None
-                ),
-            )],
-            created=chunk.created,
-            model=chunk.model,
-            object='chat.completion.chunk',
-            system_fingerprint=chunk.system_fingerprint,
-            usage=chunk.usage,
-        ).model_dump_json(exclude_none=True).__str__()
-        yield f'data: {data}\n\n'
+    try:
+        async for chunk in response:
+            chunk = typing.cast(graphrag_query.SearchResultChunk, chunk)
+            data = dto.ChatCompletionChunkResponse(
+                id=id_,
+                choices=[dto.ChunkChoice(
+                    finish_reason=chunk.choice.finish_reason,
+                    index=0,
+                    delta=dto.ChatCompletionMessage(
+                        content=chunk.choice.delta.content,
+                        refusal=chunk.choice.delta.refusal,
+                        role='assistant',
+                        function_call=None,
+                        tool_calls=None
+                    ),
+                )],
+                created=chunk.created,
+                model=chunk.model,
+                object='chat.completion.chunk',
+                system_fingerprint=chunk.system_fingerprint,
+                usage=chunk.usage,
+            ).model_dump_json(exclude_none=True).__str__()
+            yield f'data: {data}\n\n'
 
-    yield 'data: [DONE]\n\n'
+        yield 'data: [DONE]\n\n'
+    finally:
+        # Starlette stops this generator once the client is gone (it cancels it, or closes it after a failed send),
+        # which closes the upstream LLM stream without polling the client per chunk
+        await typing.cast(typing.AsyncGenerator, response).aclose()
 
 
 @_root.post('/chat/completions')
-async def chat_completions(request: dto.CompletionCreateRequest):
+async def chat_completions(request: dto.CompletionCreateRequest, http_request: fastapi.Request):
     logger = context.get_logger_with_context(tag=const.Constants.ROUTER_LOGGING_TAG)
     with logger.catch(reraise=True, message="Failed to execute chat completions", exclude=errors.BaseAppError):
         client = graphrag.get_client(logger)
-        response = await client.chat(
+        response = await _until_disconnected(client.chat(
             engine='local',
             message=request.messages,
             stream=request.stream,
@@ -76,7 +116,7 @@ async def chat_completions(request: dto.CompletionCreateRequest):
             top_logprobs=request.top_logprobs or openai.NOT_GIVEN,
             top_p=request.top_p or openai.NOT_GIVEN,
             user=request.user or openai.NOT_GIVEN
-        )
+        ), http_request, timeout=config.get_config().request_timeout)
         if request.stream:
             return fastapi.responses.StreamingResponse(
                 _parse_stream_response(response),
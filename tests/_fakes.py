@@ -0,0 +1,210 @@
+# Copyright (c) 2024 Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""In-process stand-ins for the chat and embedding services, used by the engine tests."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+import typing
+
+import numpy as np
+from openai.types import chat as openai_chat
+
+from graphrag_query._search import _llm, _model
+
+
+def chat_completion(content: str, finish_reason: str = "stop") -> openai_chat.ChatCompletion:
+    return openai_chat.ChatCompletion.model_validate({
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "fake",
+        "choices": [{
+            "index": 0,
+            "finish_reason": finish_reason,
+            "message": {"role": "assistant", "content": content},
+        }],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    })
+
+
+def answer(msg: typing.Sequence[typing.Mapping[str, typing.Any]]) -> str:
+    """Answers key point prompts (map and intermediate reduce) with one key point, and the final reduce with prose."""
+    system = msg[0]["content"]
+    if '"points"' in system:
+        digest = hashlib.sha256(system.encode()).hexdigest()[:8]
+        return json.dumps({"points": [{"description": f"point {digest}", "score": 50}]})
+    return "final answer: " + " ".join(f"word{i}" for i in range(40))
+
+
+class FakeChatLLM(_llm.BaseChatLLM):
+    def __init__(self) -> None:
+        self.calls: typing.List[typing.Dict[str, typing.Any]] = []
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+    @model.setter
+    def model(self, value: str) -> None:
+        pass
+
+    def chat(self, msg, *, stream: bool, **kwargs: typing.Any):
+        self.calls.append({"msg": msg, **kwargs})
+        return chat_completion(answer(msg))
+
+    def close(self) -> None:
+        pass
+
+
+class FakeAsyncChatLLM(_llm.BaseAsyncChatLLM):
+    """Answers like FakeChatLLM after `latency` seconds, counting started and finished calls."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls: typing.List[typing.Dict[str, typing.Any]] = []
+        self.started = 0
+        self.finished = 0
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+    @model.setter
+    def model(self, value: str) -> None:
+        pass
+
+    async def achat(self, msg, *, stream: bool, **kwargs: typing.Any):
+        self.calls.append({"msg": msg, **kwargs})
+        self.started += 1
+        await asyncio.sleep(self.latency)
+        self.finished += 1
+        return chat_completion(answer(msg))
+
+    async def aclose(self) -> None:
+        pass
+
+
+class HashEmbedding(_llm.BaseEmbedding):
+    """Deterministic embeddings derived from a hash of the text."""
+
+    @property
+    def model(self) -> str:
+        return "hash"
+
+    @model.setter
+    def model(self, value: str) -> None:
+        pass
+
+    def embed(self, text: str, **kwargs: typing.Any) -> typing.List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(16).tolist()
+
+    def close(self) -> None:
+        pass
+
+
+def make_index(n: int = 300, num_reports: int = 30):
+    """A small random index: entities, relationships, community reports and text units."""
+    rng = random.Random(1)
+    entities = [
+        _model.Entity(
+            id=f"e{i}", short_id=str(i), title=f"E{i}", description="d " * (i % 9), rank=rng.randint(0, 9),
+            community_ids=[str(i % num_reports)], text_unit_ids=[f"t{rng.randrange(200)}" for _ in range(3)],
+        ) for i in range(n)
+    ]
+    relationships = [
+        _model.Relationship(
+            id=f"r{i}", short_id=str(i), source=f"E{rng.randrange(n)}", target=f"E{rng.randrange(n)}",
+            description="rel", weight=rng.random(), text_unit_ids=[f"t{rng.randrange(200)}"],
+        ) for i in range(1500)
+    ]
+    reports = [
+        _model.CommunityReport(
+            id=str(i), short_id=str(i), title=f"C{i}", community_id=str(i), summary="s " * i,
+            full_content="full " * 5, rank=float(i % 5),
+        ) for i in range(num_reports)
+    ]
+    text_units = [_model.TextUnit(id=f"t{i}", short_id=str(i), text="text " * (i % 13)) for i in range(200)]
+    return entities, relationships, reports, text_units
+
+
+class FakeLLMServer:
+    """
+    A chat completions server on localhost that generates its answers one
+    token every `token_latency` seconds, like an LLM server, and stops
+    generating as soon as the client disconnects. It counts the tokens it
+    generated, so tests can measure the tokens wasted after a search is
+    abandoned.
+    """
+
+    def __init__(self, token_latency: float = 0.01) -> None:
+        self.token_latency = token_latency
+        self.requests = 0
+        self.tokens_served = 0
+        self.active = 0
+        self._server: typing.Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = typing.cast(asyncio.AbstractServer, self._server).sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/v1"
+
+    async def __aenter__(self) -> FakeLLMServer:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *args: typing.Any) -> None:
+        server = typing.cast(asyncio.AbstractServer, self._server)
+        server.close()
+        await server.wait_closed()
+
+    async def _generate(self, reader: asyncio.StreamReader) -> None:
+        await asyncio.sleep(self.token_latency)
+        if reader.at_eof():
+            raise ConnectionResetError("client disconnected")
+        self.tokens_served += 1
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.active += 1
+        try:
+            head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+            length = int(re.search(r"(?im)^content-length:\s*(\d+)", head).group(1))
+            request = json.loads(await reader.readexactly(length))
+            self.requests += 1
+            tokens = re.findall(r"\S+\s*", answer(request["messages"]))
+            if not request.get("stream"):
+                for _ in tokens:
+                    await self._generate(reader)
+                body = chat_completion("".join(tokens)).model_dump_json().encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\nconnection: close\r\n"
+                    b"content-length: %d\r\n\r\n%s" % (len(body), body)
+                )
+                await writer.drain()
+                return
+            writer.write(b"HTTP/1.1 200 OK\r\ncontent-type: text/event-stream\r\nconnection: close\r\n\r\n")
+            for index, token in enumerate(tokens):
+                await self._generate(reader)
+                chunk = {
+                    "id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": "fake",
+                    "choices": [{
+                        "index": 0, "delta": {"role": "assistant", "content": token},
+                        "finish_reason": "stop" if index == len(tokens) - 1 else None,
+                    }],
+                }
+                writer.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                await writer.drain()
+            writer.write(b"data: [DONE]\n\n")
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.active -= 1
+            writer.close()
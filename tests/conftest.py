@@ -1,2 +1,23 @@
 # Copyright (c) 2024 Microsoft Corporation.
 # Licensed under the MIT License.
+
+import pytest
+import tiktoken
+
+
+@pytest.fixture(scope="session")
+def token_encoder() -> tiktoken.Encoding:
+    """A byte-level tiktoken encoding, so the tests need no downloaded BPE ranks."""
+    return tiktoken.Encoding(
+        name="test_bytes",
+        pat_str=r"\S+|\s+",
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={},
+    )
+
+
+@pytest.fixture
+def offline_tiktoken(monkeypatch: pytest.MonkeyPatch, token_encoder: tiktoken.Encoding) -> tiktoken.Encoding:
+    """Serves `token_encoder` for every named encoding, so engines can be built without downloading BPE ranks."""
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda name: token_encoder)
+    return token_encoder
@@ -0,0 +1,113 @@
+# Copyright (c) 2024 Microsoft Corporation.
+# Licensed under the MIT License.
+
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import typing
+
+import pytest
+
+from graphrag_query._search._llm import _base_llm
+from graphrag_query._search._llm._cached_embedding import AsyncCachedEmbedding, SQLiteEmbeddingCache
+from graphrag_query._utils import LRUCache
+
+
+class _FakeAsyncEmbedding(_base_llm.BaseAsyncEmbedding):
+    def __init__(self) -> None:
+        self.calls: typing.List[typing.List[str]] = []
+        self._model = "fake"
+
+    @property
+    def model(self) -> str:
+        return self._model
+
+    @model.setter
+    def model(self, value: str) -> None:
+        self._model = value
+
+    async def aembed(self, text: str, **kwargs: typing.Any) -> typing.List[float]:
+        return (await self.aembed_many([text]))[0]
+
+    async def aembed_many(self, texts: typing.Sequence[str], **kwargs: typing.Any) -> typing.List[typing.List[float]]:
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    async def aclose(self) -> None:
+        pass
+
+
+def test_sqlite_get_many_matches_get(tmp_path):
+    cache = SQLiteEmbeddingCache(tmp_path / "cache.db")
+    cache.set_many([("a", [1.0]), ("b", [2.0])])
+
+    assert cache.get_many(["a", "missing", "b", "a"]) == [[1.0], None, [2.0], [1.0]]
+    assert (cache.stats.hits, cache.stats.misses) == (3, 1)
+    assert cache.get_many([]) == []
+
+
+def test_sqlite_get_many_drops_stale_entries(tmp_path):
+    now = [1000.0]
+    cache = SQLiteEmbeddingCache(tmp_path / "cache.db", ttl=10)
+    cache._clock = lambda: now[0]
+    cache.set_many([("a", [1.0]), ("b", [2.0])])
+    now[0] += 5
+    cache.set("b", [3.0])
+    now[0] += 6
+
+    assert cache.get_many(["a", "b"]) == [None, [3.0]]
+    assert len(cache) == 1
+
+
+def test_sqlite_set_many_evicts(tmp_path):
+    cache = SQLiteEmbeddingCache(tmp_path / "cache.db", max_size=100)
+    cache.set_many([(str(i), [float(i)]) for i in range(150)])
+
+    assert len(cache) == 100
+    assert cache.stats.evictions == 50
+
+
+def test_async_lookups_do_not_block_the_loop(tmp_path):
+    path = tmp_path / "cache.db"
+    cache = SQLiteEmbeddingCache(path, timeout=0.5)
+    # another process holding the write lock makes the cache write wait for its busy timeout
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN EXCLUSIVE")
+
+    async def main() -> int:
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        with pytest.raises(sqlite3.OperationalError):
+            await cache.aset("a", [1.0])
+        ticker.cancel()
+        return ticks
+
+    try:
+        assert asyncio.run(main()) >= 10
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+
+
+@pytest.mark.parametrize("backend", ["lru", "sqlite"])
+def test_aembed_many_batches_lookups_and_misses(tmp_path, backend):
+    cache = LRUCache() if backend == "lru" else SQLiteEmbeddingCache(tmp_path / "cache.db")
+    embedding = _FakeAsyncEmbedding()
+    cached = AsyncCachedEmbedding(embedding, cache=cache)
+
+    async def main() -> None:
+        assert await cached.aembed_many(["a", "bb"]) == [[1.0, 1.0], [2.0, 1.0]]
+        assert await cached.aembed_many(["a", " bb ", "ccc"]) == [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0]]
+        assert await cached.aembed("ccc") == [3.0, 1.0]
+
+    asyncio.run(main())
+    assert embedding.calls == [["a", "bb"], ["ccc"]]
+    assert (cache.stats.hits, cache.stats.misses) == (3, 3)
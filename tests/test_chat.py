@@ -0,0 +1,200 @@
+# Copyright (c) 2024 Microsoft Corporation.
+# Licensed under the MIT License.
+
+from __future__ import annotations
+
+import asyncio
+import json
+import typing
+
+import httpx
+import pytest
+
+from graphrag_query import _utils, errors
+from graphrag_query._search import _llm
+from tests._fakes import chat_completion
+
+# the rate limiter estimates prompt tokens with the default encoding
+pytestmark = pytest.mark.usefixtures("offline_tiktoken")
+
+
+@pytest.mark.parametrize("max_retries, expected", [(None, 3), (0, 0), (5, 5)])
+def test_max_retries(max_retries, expected):
+    llm = _llm.AsyncChatLLM(model="fake", api_key="fake", max_retries=max_retries)
+    assert llm._max_retries == expected
+    assert llm._aclient.max_retries == expected
+    assert _llm.ChatLLM(model="fake", api_key="fake", max_retries=max_retries)._client.max_retries == expected
+
+
+def _completion_body(usage: typing.Optional[int] = 42) -> typing.Dict[str, typing.Any]:
+    body = chat_completion("hi").model_dump(mode="json")
+    body["usage"] = {"prompt_tokens": usage - 2, "completion_tokens": 2, "total_tokens": usage} if usage else None
+    return body
+
+
+def _stream_body(usage: typing.Optional[int] = 42) -> bytes:
+    chunks = [
+        {"choices": [{"index": 0, "delta": {"role": "assistant", "content": "hi"}, "finish_reason": None}]},
+        {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]},
+    ]
+    if usage:
+        chunks.append(
+            {"choices": [], "usage": {"prompt_tokens": usage - 2, "completion_tokens": 2, "total_tokens": usage}}
+        )
+    events = [
+        "data: " + json.dumps({"id": "c", "object": "chat.completion.chunk", "created": 0, "model": "fake", **chunk})
+        for chunk in chunks
+    ]
+    return ("\n\n".join([*events, "data: [DONE]"]) + "\n\n").encode()
+
+
+class Server:
+    """Replies to chat completion requests with the queued status codes (0 times out), then with 200."""
+
+    def __init__(self, *statuses: int) -> None:
+        self.statuses = list(statuses)
+        self.requests: typing.List[typing.Dict[str, typing.Any]] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        self.requests.append(body)
+        if self.statuses:
+            status = self.statuses.pop(0)
+            if not status:
+                raise httpx.ReadTimeout("timed out", request=request)
+            return httpx.Response(status, json={"error": {"message": "nope"}}, headers={"retry-after-ms": "1"})
+        if body.get("stream"):
+            usage = 42 if (body.get("stream_options") or {}).get("include_usage") else None
+            return httpx.Response(200, content=_stream_body(usage), headers={"content-type": "text/event-stream"})
+        return httpx.Response(200, json=_completion_body())
+
+
+class NoStreamOptionsServer(Server):
+    """Rejects requests with stream_options, like some OpenAI-compatible backends."""
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if "stream_options" in json.loads(request.content):
+            self.requests.append(json.loads(request.content))
+            return httpx.Response(
+                400, json={"error": {"message": "Unrecognized request argument supplied: stream_options"}}
+            )
+        return super().__call__(request)
+
+
+def _sync_llm(server: Server, limiter: _utils.RateLimiter, **kwargs: typing.Any) -> _llm.ChatLLM:
+    return _llm.ChatLLM(
+        model="fake", api_key="fake", max_retries=0, rate_limiter=limiter,
+        http_client=httpx.Client(transport=httpx.MockTransport(server)), **kwargs
+    )
+
+
+def _async_llm(server: Server, limiter: _utils.RateLimiter, **kwargs: typing.Any) -> _llm.AsyncChatLLM:
+    return _llm.AsyncChatLLM(
+        model="fake", api_key="fake", max_retries=2, rate_limiter=limiter,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(server)), **kwargs
+    )
+
+
+MSG = [{"role": "user", "content": "hello"}]
+
+
+def test_stream_reconciles_rate_limiter():
+    limiter = _utils.RateLimiter(tokens_per_minute=10 ** 6)
+    server = Server()
+    llm = _sync_llm(server, limiter)
+
+    chunks = list(llm.chat(MSG, stream=True))
+    assert server.requests[0]["stream_options"] == {"include_usage": True}
+    # the usage chunk was asked for here, the caller does not see it
+    assert all(chunk.choices for chunk in chunks)
+    assert limiter.stats.used_tokens == 42
+
+    async def _astream() -> typing.List[typing.Any]:
+        stream = await _async_llm(server, limiter).achat(MSG, stream=True, stream_options={"include_usage": True})
+        return [chunk async for chunk in stream]
+
+    # the caller asked for the usage chunk, so it is passed on
+    assert not asyncio.run(_astream())[-1].choices
+    assert limiter.stats.used_tokens == 84
+
+
+def test_stream_usage_can_be_turned_off():
+    limiter = _utils.RateLimiter(tokens_per_minute=10 ** 6)
+    server = Server()
+
+    list(_sync_llm(server, limiter, stream_usage=False).chat(MSG, stream=True))
+    assert "stream_options" not in server.requests[0]
+    # without the usage chunk the reservation is not reconciled, its estimate stands
+    assert limiter.stats.reserved_tokens > 0
+    assert limiter.stats.used_tokens == 0
+
+
+@pytest.mark.parametrize("concurrency_limited", [False, True])
+def test_stream_falls_back_when_the_backend_rejects_stream_options(concurrency_limited):
+    limiter = _utils.RateLimiter(tokens_per_minute=10 ** 6)
+    server = NoStreamOptionsServer()
+    sync_llm = _sync_llm(server, limiter)
+
+    chunks = list(sync_llm.chat(MSG, stream=True))
+    assert [chunk.choices[0].delta.content for chunk in chunks[:1]] == ["hi"]
+    assert ["stream_options" in request for request in server.requests] == [True, False]
+    # the rejected request is settled at its estimate, the retry is not reconciled
+    stats = limiter.stats
+    assert stats.requests == 2
+    assert stats.used_tokens == stats.reserved_tokens // 2
+    # later streams no longer ask
+    list(sync_llm.chat(MSG, stream=True))
+    assert len(server.requests) == 3
+
+    kwargs = dict(concurrency_limiter=_utils.AdaptiveConcurrencyLimiter()) if concurrency_limited else {}
+    async_llm = _async_llm(server, limiter, **kwargs)
+
+    async def _astream() -> typing.List[typing.Any]:
+        return [chunk async for chunk in await async_llm.achat(MSG, stream=True)]
+
+    assert all(chunk.choices for chunk in asyncio.run(_astream()))
+    assert ["stream_options" in request for request in server.requests[3:]] == [True, False]
+    asyncio.run(_astream())
+    assert len(server.requests) == 6
+
+    # a caller's own stream_options are not dropped
+    with pytest.raises(errors.OpenAIAPIError):
+        sync_llm.chat(MSG, stream=True, stream_options={"include_usage": True})
+
+
+@pytest.mark.parametrize("status, refunded", [(429, True), (500, False), (400, False)])
+def test_failed_request_settles_reservation(status, refunded):
+    limiter = _utils.RateLimiter(tokens_per_minute=10 ** 6)
+    with pytest.raises(errors.OpenAIAPIError):
+        _sync_llm(Server(status), limiter).chat(MSG)
+    stats = limiter.stats
+    assert stats.used_tokens == (0 if refunded else stats.reserved_tokens)
+
+
+def test_rate_limited_retries_reserve_again():
+    limiter = _utils.RateLimiter(tokens_per_minute=10 ** 6)
+    server = Server(429, 429)
+    llm = _async_llm(server, limiter, concurrency_limiter=_utils.AdaptiveConcurrencyLimiter())
+
+    response = asyncio.run(llm.achat(MSG))
+    assert response.choices[0].message.content == "hi"
+    assert len(server.requests) == 3
+    stats = limiter.stats
+    assert stats.requests == 3
+    # the rejected attempts are refunded, the last one is reconciled with its usage
+    assert stats.used_tokens == 42
+
+    with pytest.raises(errors.OpenAIAPIError):
+        asyncio.run(_async_llm(Server(500), limiter, concurrency_limiter=_utils.AdaptiveConcurrencyLimiter()).achat(MSG))
+    assert limiter.stats.requests == 4
+
+
+def test_timeouts_cut_the_concurrency_limit_and_are_retried():
+    concurrency_limiter = _utils.AdaptiveConcurrencyLimiter(initial_limit=16)
+    server = Server(0, 0)
+    llm = _async_llm(server, _utils.RateLimiter(tokens_per_minute=10 ** 6), concurrency_limiter=concurrency_limiter)
+
+    assert asyncio.run(llm.achat(MSG)).choices[0].message.content == "hi"
+    assert len(server.requests) == 3
+    assert concurrency_limiter.stats.decreases == 2
+    assert concurrency_limiter.stats.rate_limited == 0
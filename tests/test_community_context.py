@@ -0,0 +1,58 @@
+# Copyright (c) 2024 Microsoft Corporation.
+# Licensed under the MIT License.
+
+from __future__ import annotations
+
+import math
+
+from graphrag_query._search._context._builders import _community_context
+from graphrag_query._search._model import CommunityReport, Entity
+
+
+def _reports(n: int = 30):
+    return [
+        CommunityReport(
+            id=f"report-{i}", short_id=str(i), title=f"Community {i}", community_id=str(i),
+            summary=f"summary {i}", rank=float(i % 3),
+        ) for i in range(n)
+    ]
+
+
+def _entities(n: int = 30):
+    # communities share weights in groups of five
+    return [Entity(id=f"entity-{i}", title=f"E{i}", community_ids=[str(i)], text_unit_ids=[
+        f"unit-{j}" for j in range(i // 5)
+    ]) for i in range(n)]
+
+
+def test_rank_report_records_breaks_ties_by_id():
+    header = ["id", "title", "occurrence weight", "summary", "rank"]
+    records = [
+        ["10", "a", "0.5", "", "1"],
+        ["2", "b", "0.5", "", "1"],
+        ["x", "c", "0.5", "", "1"],
+        ["3", "d", "nan", "", "1"],
+        ["1", "e", "0.9", "", "0"],
+        ["7", "f", "0.5", "", "2"],
+    ]
+    ranked = _community_context._rank_report_records(records, header, "occurrence weight", "rank")
+
+    assert [record[0] for record in ranked] == ["1", "7", "2", "10", "x", "3"]
+    assert math.isnan(ranked[-1][2])
+    for reordered in (records[::-1], records[3:] + records[:3]):
+        reranked = _community_context._rank_report_records(reordered, header, "occurrence weight", "rank")
+        assert [record[0] for record in reranked] == [record[0] for record in ranked]
+
+
+def test_context_order_does_not_depend_on_shuffle():
+    contexts = [
+        _community_context.build_community_context(
+            _reports(), entities=_entities(), include_community_rank=True, shuffle_data=True,
+            random_state=random_state, data_max_tokens=10 ** 6, token_counter=len,
+        )[0] for random_state in (1, 2, 86)
+    ]
+
+    assert contexts[0] == contexts[1] == contexts[2]
+    ids = [line.split("|")[0] for line in contexts[0][0].splitlines()[1:]]
+    # weight first, then rank, then id
+    assert ids[:6] == ["26", "29", "25", "28", "27", "20"]
@@ -0,0 +1,130 @@
+# Copyright (c) 2024 Microsoft Corporation.
+# Licensed under the MIT License.
+
+from __future__ import annotations
+
+import concurrent.futures
+import copy
+import typing
+
+import pytest
+
+from graphrag_query._search._context._builders._context_builders import GlobalContextBuilder, LocalContextBuilder
+from graphrag_query._vector_stores import InMemoryVectorStore, VectorStoreDocument
+from tests._fakes import HashEmbedding, make_index
+
+
+@pytest.fixture(scope="module")
+def data():
+    return make_index()
+
+
+def test_global_batch_cache_hands_out_copies(data, token_encoder):
+    entities, _, reports, _ = data
+    builder = GlobalContextBuilder(community_reports=reports, entities=entities, token_encoder=token_encoder)
+
+    context, records, batch_ids = builder._build_community_context(data_max_tokens=200)
+    expected = [list(ids) for ids in batch_ids]
+    context.append("extra")
+    records.transform("reports", lambda df: df.iloc[:0])
+    batch_ids[0].append("999")
+    batch_ids.reverse()
+
+    context_again, records_again, batch_ids_again = builder._build_community_context(data_max_tokens=200)
+    assert batch_ids_again == expected
+    assert "extra" not in context_again
+    assert len(records_again["reports"]) == len(reports)
+    assert builder.cache_stats.hits == 1
+
+
+def _local_builder(data, token_encoder, **kwargs: typing.Any) -> LocalContextBuilder:
+    entities, relationships, reports, text_units = data
+    embedding = HashEmbedding()
+    store = InMemoryVectorStore("entities")
+    store.load_documents([
+        VectorStoreDocument(id=entity.id, text=None, vector=embedding.embed(entity.title)) for entity in entities
+    ])
+    return LocalContextBuilder(
+        entities=entities,
+        entity_text_embeddings=store,
+        text_embedder=embedding,
+        text_units=text_units,
+        community_reports=reports,
+        relationships=relationships,
+        token_encoder=token_encoder,
+        **kwargs,
+    )
+
+
+def test_local_build_context_is_thread_safe(data, token_encoder):
+    entities, relationships, reports, text_units = data
+    models = [*entities, *relationships, *reports, *text_units]
+    snapshot = copy.deepcopy([model.model_dump() for model in models])
+
+    queries = [f"query {i}" for i in range(12)]
+    # no relationship carries the ranking attribute, so it is computed from the entity ranks
+    params = [dict(query=query, data_max_tokens=3000, return_candidate_context=i % 2 == 0)
+              for i, query in enumerate(queries)]
+
+    def _build(builder: LocalContextBuilder, kwargs: typing.Dict[str, typing.Any]):
+        text, records = builder.build_context(**kwargs)
+        return text, {key: records[key].to_csv() for key in records}
+
+    serial = [_build(_local_builder(data, token_encoder, context_cache_size=0), kwargs) for kwargs in params]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as sections:
+        builder = _local_builder(data, token_encoder, context_cache_size=0, section_executor=sections)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=16) as pool:
+            parallel = list(pool.map(lambda i: _build(builder, params[i % len(params)]), range(240)))
+
+    assert all(result == serial[i % len(params)] for i, result in enumerate(parallel))
+    assert any("relationships" in records for _, records in serial)
+    # the shared models are read, never written
+    assert [model.model_dump() for model in models] == snapshot
+
+
+def test_local_context_cache_hands_out_copies(data, token_encoder):
+    builder = _local_builder(data, token_encoder)
+    params = dict(query="query 1", data_max_tokens=3000, return_candidate_context=True)
+
+    text, records = builder.build_context(**params)
+    assert set(records.timings) == {"community", "local", "text_unit"}
+    expected = {key: records[key].copy() for key in records}
+    # the engines add columns to the returned tables
+    records["entities"]["score"] = 0.0
+    records["relationships"].drop(records["relationships"].index, inplace=True)
+
+    text_again, records_again = builder.build_context(**params)
+    assert builder.cache_stats.hits == 1
+    assert text_again == text
+    assert records_again.timings == {}
+    assert set(records_again) == set(expected)
+    for key, table in expected.items():
+        assert records_again[key].equals(table)
+
+    records_again["entities"]["score"] = 1.0
+    assert "score" not in builder.build_context(**params)[1]["entities"]
+
+
+def test_local_rows_are_rendered_once_when_loaded(data, token_encoder, monkeypatch):
+    builder = _local_builder(data, token_encoder, context_cache_size=0)
+    params = dict(query="query 1", data_max_tokens=3000)
+    expected = builder.build_context(**params)
+
+    counted: typing.List[str] = []
+    encode = token_encoder.encode
+    monkeypatch.setattr(token_encoder, "encode", lambda text, **kwargs: counted.append(text) or encode(text, **kwargs))
+
+    text, records = builder.build_context(**params)
+    assert text == expected[0]
+    assert {key: records[key].to_csv() for key in records} == {key: expected[1][key].to_csv() for key in expected[1]}
+    # only the section headers are tokenized, every row is looked up
+    assert counted and all(line.startswith("-----") for line in counted)
+
+    # other settings render their tables once, on first use
+    other = dict(params, column_delimiter=";", include_entity_rank=True)
+    first = builder.build_context(**other)
+    counted.clear()
+    assert builder.build_context(**other)[0] == first[0]
+    assert all(line.startswith("-----") for line in counted)
+    assert "|" not in first[0].split("-----Entities-----")[1].split("\n\n")[0]
@@ -0,0 +1,107 @@
+# Copyright (c) 2024 Microsoft Corporation.
+# Licensed under the MIT License.
+
+from __future__ import annotations
+
+import random
+
+import pandas as pd
+import pytest
+
+from graphrag_query import _utils
+from graphrag_query._search._context._builders._conversation_history import (
+    ConversationHistory,
+    ConversationRole,
+    QATurn,
+)
+
+CONTENTS = ["hi", "what is x?", 'a "quoted" word', "a|b", "a;b", "two\nlines", " leading space", "é ü", ""]
+
+
+def _history(seed: int, n: int = 12) -> ConversationHistory:
+    rng = random.Random(seed)
+    history = ConversationHistory()
+    for _ in range(n):
+        role = rng.choice([ConversationRole.USER, ConversationRole.USER, ConversationRole.ASSISTANT])
+        history.add_turn(role, rng.choice(CONTENTS) + str(rng.randrange(100)) * rng.randrange(3))
+    return history
+
+
+def _reference_context(
+    history: ConversationHistory,
+    token_encoder,
+    include_user_turns_only: bool,
+    max_qa_turns: int,
+    data_max_tokens: int,
+    recency_bias: bool,
+    column_delimiter: str,
+    context_name: str = "Conversation History",
+):
+    # the DataFrame/to_csv rendering that build_context replaced
+    qa_turns = history.to_qa_turns()
+    if include_user_turns_only:
+        qa_turns = [QATurn(user_query=qa_turn.user_query, assistant_answers=None) for qa_turn in qa_turns]
+    if recency_bias:
+        qa_turns = qa_turns[::-1]
+    if max_qa_turns and len(qa_turns) > max_qa_turns:
+        qa_turns = qa_turns[:max_qa_turns]
+    if not qa_turns:
+        return "", {context_name: pd.DataFrame()}
+    header = f"-----{context_name}-----" + "\n"
+    turn_list = []
+    current_context_df = pd.DataFrame()
+    for turn in qa_turns:
+        turn_list.append({"turn": str(ConversationRole.USER), "content": turn.user_query.content})
+        if turn.assistant_answers:
+            turn_list.append({"turn": str(ConversationRole.ASSISTANT), "content": turn.get_answer_text() or ""})
+        context_df = pd.DataFrame(turn_list)
+        context_text = header + context_df.to_csv(sep=column_delimiter, index=False)
+        if _utils.num_tokens(context_text, token_encoder) > data_max_tokens:
+            break
+        current_context_df = context_df
+    context_text = header + current_context_df.to_csv(sep=column_delimiter, index=False)
+    return context_text, {context_name.lower(): current_context_df}
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("include_user_turns_only", [True, False])
+@pytest.mark.parametrize("recency_bias", [True, False])
+@pytest.mark.parametrize("max_qa_turns", [0, 1, 3, 50])
+@pytest.mark.parametrize("column_delimiter", ["|", ";"])
+def test_build_context_matches_dataframe_rendering(
+    token_encoder, seed, include_user_turns_only, recency_bias, max_qa_turns, column_delimiter
+):
+    history = _history(seed)
+    settings = dict(
+        include_user_turns_only=include_user_turns_only,
+        max_qa_turns=max_qa_turns,
+        recency_bias=recency_bias,
+        column_delimiter=column_delimiter,
+    )
+    full_text, _ = _reference_context(history, token_encoder, data_max_tokens=10**9, **settings)
+    full_tokens = _utils.num_tokens(full_text, token_encoder)
+    # budgets below the header, at every cutoff and above the whole table
+    for data_max_tokens in [0, 10, *range(20, full_tokens + 2, 7), full_tokens, full_tokens + 1]:
+        expected_text, expected_records = _reference_context(
+            history, token_encoder, data_max_tokens=data_max_tokens, **settings
+        )
+        text, records = history.build_context(token_encoder=token_encoder, data_max_tokens=data_max_tokens, **settings)
+        assert text == expected_text, data_max_tokens
+        assert list(records) == list(expected_records)
+        for key, expected in expected_records.items():
+            pd.testing.assert_frame_equal(records[key], expected)
+
+
+def test_build_context_of_empty_history(token_encoder):
+    text, records = ConversationHistory().build_context(token_encoder=token_encoder)
+    assert text == ""
+    assert list(records) == ["Conversation History"]
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("limit", [-20, -3, -1, 0, 1, 2, 5, 50])
+def test_turn_getters_match_slicing(seed, limit):
+    history = _history(seed)
+    turns = history.to_dict()
+    assert history.get_all_turns(limit) == [turn["content"] for turn in turns][-limit:]
+    assert history.get_user_turns(limit) == [turn["content"] for turn in turns if turn["role"] == "user"][-limit:]
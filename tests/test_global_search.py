@@ -0,0 +1,345 @@
+# Copyright (c) 2024 Microsoft Corporation.
+# Licensed under the MIT License.
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+import typing
+
+import pytest
+
+from graphrag_query import _utils
+from graphrag_query._search import _defaults, _llm, _types
+from graphrag_query._search._context._builders._context_builders import GlobalContextBuilder
+from graphrag_query._search._engine import AsyncGlobalSearchEngine, GlobalSearchEngine
+from graphrag_query._search._engine._global import _group_key_points
+from tests._fakes import FakeAsyncChatLLM, FakeChatLLM, FakeLLMServer, HashEmbedding, chat_completion, make_index
+
+
+@pytest.fixture
+def context_builder(offline_tiktoken) -> GlobalContextBuilder:
+    entities, _, reports, _ = make_index()
+    return GlobalContextBuilder(community_reports=reports, entities=entities, token_encoder=offline_tiktoken)
+
+
+def _engines(context_builder: GlobalContextBuilder, **kwargs: typing.Any):
+    sync_llm, async_llm = FakeChatLLM(), FakeAsyncChatLLM()
+    sync_engine = GlobalSearchEngine(
+        chat_llm=sync_llm, embedding=HashEmbedding(), context_builder=context_builder, **kwargs
+    )
+    async_engine = AsyncGlobalSearchEngine(
+        chat_llm=async_llm, embedding=HashEmbedding(), context_builder=context_builder, **kwargs
+    )
+    return sync_engine, sync_llm, async_engine, async_llm
+
+
+SEARCH_KWARGS = dict(verbose=True, data_max_tokens=300)
+
+
+def _map_calls(llm) -> int:
+    return sum('"points"' in call["msg"][0]["content"] for call in llm.calls)
+
+
+@pytest.mark.parametrize("json_mode", [True, False])
+def test_map_cache_is_shared_between_sync_and_async_engines(context_builder, json_mode):
+    cache = _utils.LRUCache()
+    sync_engine, sync_llm, async_engine, async_llm = _engines(context_builder, map_cache=cache, json_mode=json_mode)
+
+    sync_engine.search("what happened?", **SEARCH_KWARGS)
+    batches = _map_calls(sync_llm)
+    assert batches > 1
+
+    asyncio.run(async_engine.asearch("what  happened? ", conversation_history=None, **SEARCH_KWARGS))
+    assert _map_calls(async_llm) == 0
+    assert cache.stats.hits == batches
+    assert all(
+        (call.get("response_format") == {"type": "json_object"}) == json_mode for call in sync_llm.calls[:batches]
+    )
+
+
+def test_map_cache_keys_json_mode(context_builder):
+    cache = _utils.LRUCache()
+    _, _, json_engine, json_llm = _engines(context_builder, map_cache=cache, json_mode=True)
+    _, _, text_engine, text_llm = _engines(context_builder, map_cache=cache, json_mode=False)
+
+    asyncio.run(json_engine.asearch("what happened?", conversation_history=None, **SEARCH_KWARGS))
+    asyncio.run(text_engine.asearch("what happened?", conversation_history=None, **SEARCH_KWARGS))
+    assert cache.stats.hits == 0
+    assert _map_calls(text_llm) == _map_calls(json_llm) > 0
+    # the async map requests follow json_mode like the sync ones
+    assert json_llm.calls[0]["response_format"] == {"type": "json_object"}
+    assert text_llm.calls[0]["response_format"] != {"type": "json_object"}
+
+
+def test_evaluate_prefilter_matches_between_engines(context_builder):
+    kwargs = dict(data_max_tokens=300, relevance_threshold=1.0, relevance_top_k=1, relevance_min_confidence=-1.0)
+    sync_engine, sync_llm, async_engine, async_llm = _engines(context_builder, community_prefilter=True)
+
+    sync_metrics = sync_engine.evaluate_prefilter("what happened?", **kwargs)
+    async_metrics = asyncio.run(async_engine.evaluate_prefilter("what happened?", **kwargs))
+    assert async_metrics == sync_metrics
+    assert sync_metrics["map_calls"] == _map_calls(async_llm) > 1
+    assert sync_metrics["prefiltered_map_calls"] == 1
+    assert 0 < sync_metrics["key_point_recall"] < 1
+
+
+def test_engines_share_reduce_concurrency_default(context_builder):
+    sync_engine, _, async_engine, _ = _engines(context_builder, map_workers=4)
+    assert sync_engine._reduce_concurrency == async_engine._reduce_concurrency == (
+        _defaults.DEFAULT__GLOBAL_SEARCH__REDUCE_CONCURRENCY
+    )
+
+
+class _SlowChatLLM(FakeChatLLM):
+    """Answers like FakeChatLLM after `latency` seconds, failing the map calls of the batches in `failing`."""
+
+    def __init__(self, latency: float, failing: typing.Collection[int]) -> None:
+        super().__init__()
+        self.latency = latency
+        self.failing = failing
+
+    def chat(self, msg, *, stream: bool, **kwargs: typing.Any):
+        time.sleep(self.latency)
+        if any(f"<batch {idx}>" in msg[0]["content"] for idx in self.failing):
+            raise RuntimeError("map call failed")
+        return super().chat(msg, stream=stream, **kwargs)
+
+
+def test_map_batches_keeps_batch_order_and_replaces_failed_batches(context_builder):
+    engine, _, _, _ = _engines(context_builder, map_workers=8)
+    llm = _SlowChatLLM(latency=0.2, failing={1})
+    context_chunks = [f"<batch {idx}>" for idx in range(8)]
+
+    start = time.perf_counter()
+    results = engine._map_batches(context_chunks=context_chunks, query="q", verbose=True, chat_llm=llm)
+    # the batches are mapped concurrently
+    assert time.perf_counter() - start < 0.2 * 4
+    assert len(llm.calls) == 7
+    assert [result.context_text for result in results] == context_chunks
+    assert [result.choice.finish_reason for result in results] == ["stop", "error", *["stop"] * 6]
+    assert results[1].choice.message.content == [{"answer": "", "score": 0}]
+
+    llm = _SlowChatLLM(latency=0.0, failing=range(8))
+    with pytest.raises(RuntimeError, match="map call failed"):
+        engine._map_batches(context_chunks=context_chunks, query="q", verbose=True, chat_llm=llm)
+
+
+@pytest.mark.parametrize(("tokens", "fan_in", "max_tokens", "expected"), [
+    ([10, 10, 10, 10, 10], 2, 100, [[0, 1], [2, 3], [4]]),
+    ([40, 40, 40, 10], 4, 100, [[0, 1], [2, 3]]),
+    ([150, 10, 10], 3, 100, [[0], [1, 2]]),
+    ([10, 150, 10], 3, 100, [[0], [1], [2]]),
+    ([], 2, 100, []),
+])
+def test_group_key_points(tokens, fan_in, max_tokens, expected):
+    assert _group_key_points(tokens, fan_in, max_tokens) == expected
+
+
+def _key_points(n: int, answer: str) -> typing.List[typing.Dict[str, typing.Any]]:
+    return [{"analyst": i, "answer": answer, "score": n - i} for i in range(n)]
+
+
+def _echo(msg) -> str:
+    """Answers an intermediate reduce call with as many, slightly longer, points as it was given."""
+    count = msg[0]["content"].count("----Analyst ")
+    return json.dumps({"points": [{"description": "y" * 120, "score": 50} for _ in range(count)]})
+
+
+class _EchoChatLLM(FakeChatLLM):
+    def chat(self, msg, *, stream: bool, **kwargs: typing.Any):
+        self.calls.append({"msg": msg, **kwargs})
+        return chat_completion(_echo(msg))
+
+
+class _EchoAsyncChatLLM(FakeAsyncChatLLM):
+    async def achat(self, msg, *, stream: bool, **kwargs: typing.Any):
+        self.calls.append({"msg": msg, **kwargs})
+        return chat_completion(_echo(msg))
+
+
+def test_tree_reduce_returns_points_that_fit_without_calls(context_builder):
+    sync_engine, sync_llm, async_engine, async_llm = _engines(context_builder, reduce_fan_in=2, max_data_tokens=10_000)
+    key_points = _key_points(8, "x" * 100)
+
+    assert sync_engine._tree_reduce(key_points=key_points, query="q", chat_llm=sync_llm) == (
+        key_points, _types.ReduceUsage()
+    )
+    assert asyncio.run(async_engine._tree_reduce(key_points=key_points, query="q", chat_llm=async_llm)) == (
+        key_points, _types.ReduceUsage()
+    )
+    assert sync_llm.calls == async_llm.calls == []
+
+
+def test_tree_reduce_stops_when_a_level_does_not_shrink(context_builder):
+    kwargs = dict(chat_llm=FakeChatLLM(), embedding=HashEmbedding(), context_builder=context_builder)
+    kwargs.update(reduce_fan_in=2, max_data_tokens=300)
+    sync_engine, sync_llm = GlobalSearchEngine(**kwargs), _EchoChatLLM()
+    async_engine, async_llm = AsyncGlobalSearchEngine(**kwargs), _EchoAsyncChatLLM()
+    key_points = _key_points(8, "x" * 100)
+
+    sync_points, sync_usage = sync_engine._tree_reduce(key_points=key_points, query="q", chat_llm=sync_llm)
+    async_points, async_usage = asyncio.run(
+        async_engine._tree_reduce(key_points=key_points, query="q", chat_llm=async_llm)
+    )
+    # one level of 4 calls grows the points, which ends the condensing
+    assert len(sync_llm.calls) == len(async_llm.calls) == 4
+    assert len(sync_points) == len(async_points) == 8
+    assert sync_usage == async_usage == _types.ReduceUsage(
+        levels=1, llm_calls=4, completion_tokens=20, prompt_tokens=40, total_tokens=60
+    )
+
+
+def test_verbose_result_counts_intermediate_reduce_calls(context_builder):
+    sync_engine, sync_llm, async_engine, async_llm = _engines(context_builder, reduce_fan_in=2, max_data_tokens=120)
+
+    results = [
+        sync_engine.search("what happened?", **SEARCH_KWARGS),
+        asyncio.run(async_engine.asearch("what happened?", conversation_history=None, **SEARCH_KWARGS)),
+    ]
+    for result, llm in zip(results, (sync_llm, async_llm)):
+        reduce_usage = result.reduce_usage
+        assert reduce_usage.levels >= 1 and reduce_usage.llm_calls >= 1
+        assert reduce_usage.total_tokens == 15 * reduce_usage.llm_calls
+        assert result.llm_calls == 1 + reduce_usage.llm_calls
+        assert len(llm.calls) == _map_calls(llm) + 1
+        assert _map_calls(llm) == len(result.map_result) + reduce_usage.llm_calls
+
+
+def _async_engine(context_builder: GlobalContextBuilder, latency: float, **kwargs: typing.Any):
+    llm = FakeAsyncChatLLM(latency=latency)
+    engine = AsyncGlobalSearchEngine(
+        chat_llm=llm, embedding=HashEmbedding(), context_builder=context_builder, **kwargs
+    )
+    return engine, llm
+
+
+def test_map_deadline_cancels_pending_map_calls(context_builder):
+    engine, llm = _async_engine(context_builder, latency=10.0, map_deadline=0.05)
+    context_chunks, _ = context_builder.build_context(data_max_tokens=300)
+
+    async def _main() -> typing.List[typing.Any]:
+        results = await engine._map_batches(
+            context_chunks=context_chunks, query="what happened?", verbose=False, chat_llm=llm
+        )
+        # nothing still runs in the background once the map phase returns
+        assert all(task.done() for task in asyncio.all_tasks() if task is not asyncio.current_task())
+        return results
+
+    start = time.monotonic()
+    assert asyncio.run(_main()) == []
+    assert time.monotonic() - start < 5.0
+    assert llm.started == len(context_chunks) > 1
+    assert llm.finished == 0
+
+
+class _ScoredAsyncChatLLM(FakeAsyncChatLLM):
+    """Answers the map call of batch `idx` with one long key point scored `scores[idx]` after `latencies[idx]`."""
+
+    def __init__(self, scores: typing.Sequence[int], latencies: typing.Sequence[float]) -> None:
+        super().__init__()
+        self.scores = scores
+        self.latencies = latencies
+
+    async def achat(self, msg, *, stream: bool, **kwargs: typing.Any):
+        idx = int(re.search(r"<batch (\d+)>", msg[0]["content"]).group(1))
+        self.calls.append({"msg": msg, **kwargs})
+        await asyncio.sleep(self.latencies[idx])
+        return chat_completion(json.dumps({"points": [{"description": "y" * 100, "score": self.scores[idx]}]}))
+
+
+@pytest.mark.parametrize(("fast_scores", "received"), [
+    # the three key points above the median fill the context
+    ([10, 20, 30, 40, 50, 60], 6),
+    # low-score key points of equal score do not stop the map phase
+    ([10, 10, 10, 10, 10, 10], 8),
+])
+def test_map_stops_when_the_better_key_points_fill_the_context(context_builder, fast_scores, received):
+    engine, _ = _async_engine(context_builder, latency=0.0, map_quorum=1.0, max_data_tokens=300)
+    llm = _ScoredAsyncChatLLM(
+        scores=[*fast_scores, 90, 90], latencies=[0.01 * idx for idx in range(6)] + [0.2, 0.2]
+    )
+    context_chunks = [f"<batch {idx}>" for idx in range(8)]
+
+    results = asyncio.run(
+        engine._map_batches(context_chunks=context_chunks, query="q", verbose=True, chat_llm=llm)
+    )
+    # the results of cancelled batches are left out
+    assert [result.context_text for result in results] == context_chunks[:received]
+
+
+def test_abandoned_search_stops_issuing_llm_calls(context_builder):
+    # fewer coroutines than batches, so some map calls wait for a slot
+    engine, llm = _async_engine(context_builder, latency=0.05, concurrent_coroutines=2)
+
+    async def _main() -> None:
+        search = asyncio.ensure_future(
+            engine.asearch("what happened?", conversation_history=None, **SEARCH_KWARGS)
+        )
+        while llm.started < 2:
+            await asyncio.sleep(0.01)
+        search.cancel()
+        await asyncio.gather(search, return_exceptions=True)
+        started = llm.started
+        await asyncio.sleep(0.3)
+        assert llm.started == started
+        assert search.cancelled()
+
+    asyncio.run(_main())
+    # the in-flight calls were cancelled rather than awaited, and the rest never started
+    assert llm.finished < llm.started == 2
+
+
+def _served_llm(server: FakeLLMServer) -> _llm.AsyncChatLLM:
+    return _llm.AsyncChatLLM(model="fake", api_key="fake", base_url=server.url, max_retries=0)
+
+
+def test_abandoned_search_stops_generating_tokens_upstream(context_builder):
+    async def _main() -> None:
+        async with FakeLLMServer(token_latency=0.02) as server:
+            llm = _served_llm(server)
+            engine = AsyncGlobalSearchEngine(
+                chat_llm=llm, embedding=HashEmbedding(), context_builder=context_builder, concurrent_coroutines=2
+            )
+            search = asyncio.ensure_future(engine.asearch("what happened?", conversation_history=None, **SEARCH_KWARGS))
+            while server.tokens_served < 3:
+                await asyncio.sleep(0.005)
+            search.cancel()
+            await asyncio.gather(search, return_exceptions=True)
+            served, requests = server.tokens_served, server.requests
+
+            await asyncio.sleep(0.3)
+            # at most the token in progress on each open connection is finished
+            assert server.tokens_served - served <= 2
+            assert server.requests == requests <= 2
+            assert server.active == 0
+            await llm.aclose()
+
+    asyncio.run(_main())
+
+
+def test_abandoned_answer_stream_stops_generating_tokens_upstream(context_builder):
+    async def _main() -> None:
+        async with FakeLLMServer(token_latency=0.005) as server:
+            llm = _served_llm(server)
+            engine = AsyncGlobalSearchEngine(chat_llm=llm, embedding=HashEmbedding(), context_builder=context_builder)
+            stream = await engine.asearch("what happened?", conversation_history=None, stream=True, **SEARCH_KWARGS)
+            map_tokens = server.tokens_served
+            chunks = 0
+            async for _ in stream:
+                chunks += 1
+                if chunks == 3:
+                    break
+            await stream.aclose()
+            served = server.tokens_served
+
+            await asyncio.sleep(0.2)
+            assert server.tokens_served - served <= 1
+            # the answer has 41 tokens, few of which were generated
+            assert served - map_tokens < 10
+            assert server.active == 0
+            await llm.aclose()
+
+    asyncio.run(_main())
@@ -0,0 +1,82 @@
+# Copyright (c) 2024 Microsoft Corporation.
+# Licensed under the MIT License.
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from graphrag_query._vector_stores import InMemoryVectorStore, VectorStoreDocument
+
+
+def _documents(n: int = 500, dim: int = 64, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim))
+    return [VectorStoreDocument(id=str(i), text=None, vector=vector.tolist()) for i, vector in enumerate(vectors)]
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_rerank_off_drops_float_vectors(quantization):
+    documents = _documents()
+    full = InMemoryVectorStore("test", quantization=quantization)
+    full.load_documents(documents)
+    compact = InMemoryVectorStore("test", quantization=quantization, rerank=False)
+    compact.load_documents(documents)
+
+    assert compact._vectors.size == 0
+    assert compact.nbytes == full.nbytes - full._vectors.nbytes
+
+    query = documents[7].vector
+    assert compact.similarity_search_by_vector(query, k=1)[0].document.id == "7"
+
+
+def test_rerank_off_scores_estimate_cosine():
+    documents = _documents()
+    store = InMemoryVectorStore("test", quantization="int8", rerank=False)
+    store.load_documents(documents)
+
+    results = store.similarity_search_by_vector(documents[3].vector, k=3)
+    assert results[0].score == pytest.approx(1.0, abs=0.02)
+    assert results[0].document.vector is not None
+    assert [r.score for r in results] == sorted((r.score for r in results), reverse=True)
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_rerank_off_append(quantization):
+    documents = _documents()
+    store = InMemoryVectorStore("test", quantization=quantization, rerank=False)
+    store.load_documents(documents[:300])
+    store.load_documents(documents[300:], overwrite=False)
+
+    assert store.similarity_search_by_vector(documents[400].vector, k=1)[0].document.id == "400"
+    assert store.similarity_search_by_vector(documents[10].vector, k=1)[0].document.id == "10"
+
+
+def test_evaluate_recall():
+    documents = _documents()
+    store = InMemoryVectorStore("test", quantization="int8")
+    store.load_documents(documents)
+    queries = [document.vector for document in documents[:20]]
+
+    assert store.evaluate(queries, k=5)["recall"] >= store.evaluate(queries, k=5, rerank=False)["recall"] >= 0.8
+
+    compact = InMemoryVectorStore("test", quantization="int8", rerank=False)
+    compact.load_documents(documents)
+    with pytest.raises(ValueError):
+        compact.evaluate(queries)
+
+
+def test_int8_scan_blocks_match_a_full_scan():
+    # 4096 dimensions make blocks of 64 rows, so 300 documents span several of them
+    documents = _documents(n=300, dim=4096)
+    store = InMemoryVectorStore("test", quantization="int8")
+    store.load_documents(documents)
+    query = store._normalize(documents[5].vector)
+
+    np.testing.assert_allclose(store._scan(query), store._decode() @ query, rtol=1e-4, atol=1e-5)
+
+
+@pytest.mark.parametrize("quantization, oversample_scaler", [("int8", 4), ("binary", 16), (None, 1)])
+def test_default_oversample_scaler(quantization, oversample_scaler):
+    assert InMemoryVectorStore("test", quantization=quantization).oversample_scaler == oversample_scaler
+    assert InMemoryVectorStore("test", quantization=quantization, oversample_scaler=3).oversample_scaler == 3
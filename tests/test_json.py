@@ -0,0 +1,80 @@
+# Copyright (c) 2024 Microsoft Corporation.
+# Licensed under the MIT License.
+
+from __future__ import annotations
+
+import warnings
+
+import pytest
+
+from graphrag_query._utils._utils import JSONParseStats, _extract_object, _salvage_points, deserialize_json
+
+POINT = '{"description": "a", "score": 1}'
+POINTS = {"points": [{"description": "a", "score": 1}]}
+
+CASES = [
+    pytest.param('{"points": []}', {"points": []}, "direct", id="valid"),
+    pytest.param(f'```json\n{{"points": [{POINT}]}}\n```', POINTS, "extracted", id="fenced"),
+    pytest.param(f'```\n{{"points": [{POINT}]}}\n```\nDone.', POINTS, "extracted", id="fenced-untagged"),
+    pytest.param('Here is the answer: {"a": 1} Hope this helps {"b": 2}', {"a": 1}, "extracted", id="prose"),
+    pytest.param('Note {x}\n```json\n{"a": 1}\n```', {"a": 1}, "extracted", id="prose-braces-then-fence"),
+    pytest.param(
+        f'{{"points": [{POINT}, {{"description": "b", "sco', POINTS, "salvaged", id="truncated-points"
+    ),
+    pytest.param(f'```json\n{{"points": [{POINT},', POINTS, "salvaged", id="truncated-fence"),
+    # the nested object of a broken one is not taken for the answer
+    pytest.param('{"a": {"b": 1}, oops', {"a": {"b": 1}}, "repaired", id="broken-outer-object"),
+    pytest.param("{'points': [{'description': 'a', 'score': 1}]}", POINTS, "repaired", id="single-quotes"),
+    pytest.param("no json here", {}, "failed", id="prose-only"),
+    pytest.param("[1, 2]", {}, "failed", id="array"),
+]
+
+
+@pytest.mark.parametrize(("text", "expected", "method"), CASES)
+def test_deserialize_json(text, expected, method):
+    stats = JSONParseStats()
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        assert deserialize_json(text, stats=stats) == expected
+    assert [type(warning.message) for warning in caught] == ([RuntimeWarning] if method == "failed" else [])
+    assert stats.parsed == 1
+    assert {
+        name: getattr(stats, name) for name in ("direct", "extracted", "salvaged", "repaired", "failed")
+    } == {name: int(name == method) for name in ("direct", "extracted", "salvaged", "repaired", "failed")}
+
+
+def test_parse_stats_accumulate():
+    stats = JSONParseStats()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for param in CASES:
+            deserialize_json(param.values[0], stats=stats)
+    assert stats.parsed == len(CASES)
+    assert (stats.direct, stats.extracted, stats.salvaged, stats.repaired, stats.failed) == (1, 4, 2, 2, 2)
+    assert stats.repair_rate == 2 / len(CASES)
+    assert stats.parse_time > 0
+    assert stats.mean_parse_time == stats.parse_time / len(CASES)
+    assert JSONParseStats().repair_rate == JSONParseStats().mean_parse_time == 0.0
+
+
+@pytest.mark.parametrize(("text", "expected"), [
+    ('{"a": 1} {"b": 2}', {"a": 1}),
+    ('[1, {"a": 1}]', {"a": 1}),
+    ('{"a": {"b": 1}, oops', None),
+    ('{"a": 1, oops {"b": 2}', {"b": 2}),
+    ('```json\n[1]\n```\n{"a": 1}', {"a": 1}),
+    ("no json", None),
+])
+def test_extract_object(text, expected):
+    assert _extract_object(text) == expected
+
+
+@pytest.mark.parametrize(("text", "expected"), [
+    (f'{{"points": [{POINT}, {POINT}]}}', {"points": [POINTS["points"][0]] * 2}),
+    (f'{{"points": [\n  {POINT},\n  {{"descr', POINTS),
+    ('{"points": []}', None),
+    ('{"points": [{"descr', None),
+    ('{"answer": 1}', None),
+])
+def test_salvage_points(text, expected):
+    assert _salvage_points(text) == expected
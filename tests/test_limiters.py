@@ -0,0 +1,179 @@
+# Copyright (c) 2024 Microsoft Corporation.
+# Licensed under the MIT License.
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from graphrag_query import _utils
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_rate_limiter_requests_per_minute():
+    clock = FakeClock()
+    limiter = _utils.RateLimiter(requests_per_minute=60, clock=clock)
+
+    # a full bucket lets a minute's worth of requests through at once
+    assert [limiter.reserve().delay for _ in range(60)] == [0.0] * 60
+    # then requests queue one second apart, in reservation order
+    assert [limiter.reserve().delay for _ in range(3)] == pytest.approx([1.0, 2.0, 3.0])
+    clock.now = 10.0
+    assert limiter.reserve().delay == pytest.approx(0.0)
+    assert limiter.stats.requests == 64
+
+
+def test_rate_limiter_tokens_per_minute():
+    clock = FakeClock()
+    limiter = _utils.RateLimiter(tokens_per_minute=600, clock=clock)
+
+    assert limiter.reserve(500).delay == 0.0
+    # 400 tokens in debt at 10 tokens per second
+    assert limiter.reserve(500).delay == pytest.approx(40.0)
+    clock.now = 20.0
+    assert limiter.reserve(100).delay == pytest.approx(30.0)
+    assert limiter.stats.waited == pytest.approx(70.0)
+
+
+def test_rate_limiter_caps_oversized_requests():
+    clock = FakeClock()
+    limiter = _utils.RateLimiter(tokens_per_minute=600, clock=clock)
+
+    assert limiter.reserve(5000).tokens == 600
+    # the oversized request emptied the bucket, the next one waits for a full minute's refill
+    assert limiter.reserve(600).delay == pytest.approx(60.0)
+
+
+def test_rate_limiter_reconcile():
+    clock = FakeClock()
+    limiter = _utils.RateLimiter(tokens_per_minute=600, clock=clock)
+
+    reservation = limiter.reserve(600)
+    limiter.reconcile(reservation, 300)
+    assert limiter.reserve(300).delay == 0.0
+    # using more than reserved puts the bucket into debt
+    reservation = limiter.reserve(0)
+    limiter.reconcile(reservation, 60)
+    assert limiter.reserve(0).delay == pytest.approx(6.0)
+
+    stats = limiter.stats
+    assert (stats.reserved_tokens, stats.used_tokens) == (900, 360)
+
+
+def test_rate_limiter_cancel_refunds_request_and_tokens():
+    clock = FakeClock()
+    limiter = _utils.RateLimiter(requests_per_minute=1, tokens_per_minute=100, clock=clock)
+
+    reservation = limiter.reserve(100)
+    assert limiter.reserve(100).delay == pytest.approx(60.0)
+    limiter.cancel(reservation)
+    limiter.cancel(reservation)
+    # the refunds never overfill the buckets
+    assert limiter.reserve(100).delay == pytest.approx(0.0)
+    assert limiter.reserve(0).delay == pytest.approx(60.0)
+
+
+def test_rate_limiter_acquire_sleeps_for_the_delay():
+    clock = FakeClock()
+    limiter = _utils.RateLimiter(requests_per_minute=60, clock=clock)
+    slept = []
+
+    for _ in range(61):
+        limiter.acquire(sleep=slept.append)
+    assert slept == pytest.approx([1.0])
+
+
+def test_cancelled_waiter_hands_its_wake_up_on():
+    async def _main() -> None:
+        limiter = _utils.AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+        await limiter.acquire()
+        first = asyncio.ensure_future(limiter.acquire())
+        second = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.stats.waiting == 2
+
+        # the freed slot wakes the first waiter, which is cancelled before it can take it
+        limiter.release()
+        first.cancel()
+        await asyncio.wait_for(second, timeout=1.0)
+        assert first.cancelled()
+        assert limiter.stats.in_flight == 1
+        assert limiter.stats.waiting == 0
+
+    asyncio.run(_main())
+
+
+def test_adaptive_limiter_additive_increase():
+    limiter = _utils.AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=6)
+
+    # about one more slot per round of `limit` successes
+    for _ in range(4):
+        limiter.on_success()
+    assert limiter.limit == 4
+    limiter.on_success()
+    assert limiter.limit == 5
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.limit == 6
+
+
+def test_adaptive_limiter_ignores_latency():
+    limiter = _utils.AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=64)
+    for _ in range(200):
+        limiter.on_success()
+    assert limiter.stats.decreases == 0
+    assert limiter.limit > 4
+
+
+def test_adaptive_limiter_multiplicative_decrease():
+    clock = FakeClock()
+    limiter = _utils.AdaptiveConcurrencyLimiter(initial_limit=16, min_limit=3, clock=clock)
+
+    limiter.on_rate_limited(sent_at=0.0)
+    assert limiter.limit == 8
+    clock.now = 2.0
+    limiter.on_timeout(sent_at=1.0)
+    assert limiter.limit == 4
+    clock.now = 4.0
+    limiter.on_rate_limited(sent_at=3.0)
+    assert limiter.limit == 3
+    assert limiter.stats.decreases == 3
+    assert limiter.stats.rate_limited == 2
+
+
+def test_adaptive_limiter_cuts_once_per_round():
+    clock = FakeClock()
+    limiter = _utils.AdaptiveConcurrencyLimiter(initial_limit=16, clock=clock)
+
+    clock.now = 1.0
+    # the requests of one round were all sent before the first failure is seen
+    for _ in range(5):
+        limiter.on_rate_limited(sent_at=0.5)
+    assert limiter.limit == 8
+    limiter.on_timeout(sent_at=1.0)
+    assert limiter.limit == 8
+    # a request sent after the cut is a new signal
+    clock.now = 2.0
+    limiter.on_rate_limited(sent_at=1.5)
+    assert limiter.limit == 4
+    assert limiter.stats.rate_limited == 6
+
+
+def test_adaptive_limiter_retry_after_pauses_new_requests():
+    async def _main() -> float:
+        limiter = _utils.AdaptiveConcurrencyLimiter(initial_limit=4)
+        limiter.on_rate_limited(0.1)
+        start = time.monotonic()
+        async with limiter:
+            return time.monotonic() - start
+
+    assert asyncio.run(_main()) >= 0.09
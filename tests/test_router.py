@@ -0,0 +1,131 @@
+# Copyright (c) 2024 Microsoft Corporation.
+# Licensed under the MIT License.
+
+from __future__ import annotations
+
+import asyncio
+import types
+import typing
+
+import anyio
+import pytest
+
+# the server dependencies come with the dev (or openai-server) extra: pip install -e ".[dev]"
+for _module in ("fastapi", "loguru", "tabulate"):
+    pytest.importorskip(_module, reason=f"{_module} is missing, install the dev extra")
+
+from server import router  # noqa: E402
+from server.common import const, errors  # noqa: E402
+
+
+class StubRequest:
+    """Stands in for fastapi.Request, disconnecting after `polls` calls to is_disconnected."""
+
+    def __init__(self, polls: float = float("inf")) -> None:
+        self.polls = polls
+        self.calls = 0
+
+    async def is_disconnected(self) -> bool:
+        self.calls += 1
+        return self.calls > self.polls
+
+
+class Search:
+    def __init__(self, duration: float) -> None:
+        self.duration = duration
+        self.cancelled = False
+
+    async def __call__(self) -> str:
+        try:
+            await asyncio.sleep(self.duration)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return "answer"
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(const.Constants, "DISCONNECT_POLL_INTERVAL", 0.01)
+
+
+def test_returns_the_search_result():
+    search = Search(0.05)
+    assert asyncio.run(router._until_disconnected(search(), StubRequest(), timeout=5.0)) == "answer"
+    assert not search.cancelled
+
+
+def test_client_disconnect_cancels_the_search_with_499():
+    search, request = Search(10.0), StubRequest(polls=2)
+    with pytest.raises(errors.ClientClosedRequestError) as exc_info:
+        asyncio.run(router._until_disconnected(search(), request))
+    assert exc_info.value.status_code == 499
+    assert search.cancelled
+    assert request.calls == 3
+
+
+def test_timeout_cancels_the_search_with_504():
+    search = Search(10.0)
+    with pytest.raises(errors.GatewayTimeoutError) as exc_info:
+        asyncio.run(router._until_disconnected(search(), StubRequest(), timeout=0.05))
+    assert exc_info.value.status_code == 504
+    assert search.cancelled
+
+
+class Upstream:
+    """A slow answer stream, recording when it is closed."""
+
+    def __init__(self) -> None:
+        self.yielded = 0
+        self.closed = False
+
+    async def __call__(self) -> typing.AsyncIterator[typing.Any]:
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                self.yielded += 1
+                yield types.SimpleNamespace(
+                    choice=types.SimpleNamespace(
+                        finish_reason=None, delta=types.SimpleNamespace(content="token", refusal=None)
+                    ),
+                    created=0, model="fake", system_fingerprint=None, usage=None,
+                )
+        finally:
+            self.closed = True
+
+
+def test_cancelled_stream_response_closes_upstream():
+    upstream = Upstream()
+    received = []
+
+    async def _consume(stream: typing.AsyncIterator[str]) -> None:
+        async for data in stream:
+            received.append(data)
+
+    async def _main() -> None:
+        # as Starlette does when its disconnect listener fires
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(_consume, router._parse_stream_response(upstream()))
+            while len(received) < 3:
+                await asyncio.sleep(0.005)
+            task_group.cancel_scope.cancel()
+
+    asyncio.run(_main())
+    assert upstream.closed
+    assert upstream.yielded == len(received)
+    assert all(data.startswith("data: ") for data in received)
+
+
+def test_closed_stream_response_closes_upstream():
+    upstream = Upstream()
+
+    async def _main() -> None:
+        # as when Starlette drops the generator after a send fails because the client is gone
+        stream = router._parse_stream_response(upstream())
+        for _ in range(3):
+            await stream.__anext__()
+        await typing.cast(typing.AsyncGenerator, stream).aclose()
+
+    asyncio.run(_main())
+    assert upstream.closed
+    assert upstream.yielded == 3